@@ -1,9 +1,14 @@
+from django.utils.decorators import method_decorator
 from django.views.generic.base import TemplateView
 
+from core.http import conditional_page, template_validators
 
+
+@method_decorator(conditional_page(template_validators), name='dispatch')
 class AboutAuthorView(TemplateView):
     template_name = 'about/author.html'
 
 
+@method_decorator(conditional_page(template_validators), name='dispatch')
 class AboutTechView(TemplateView):
     template_name = 'about/tech.html'
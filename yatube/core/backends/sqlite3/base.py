@@ -0,0 +1,49 @@
+"""
+SQLite с настройками соединения из OPTIONS.
+
+    'ENGINE': 'core.backends.sqlite3',
+    'OPTIONS': {
+        'pragmas': {'journal_mode': 'wal', 'synchronous': 'normal'},
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 5,
+    }
+
+pragmas выполняются для каждого нового соединения. При
+transaction_mode = 'IMMEDIATE' транзакции сразу берут блокировку
+записи: иначе транзакция, которая сначала читает, а потом пишет,
+получает «database is locked» без ожидания busy_timeout.
+"""
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+def apply_pragmas(connection, pragmas):
+    for name, value in pragmas.items():
+        connection.execute(f'PRAGMA {name} = {value}')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        options = self.settings_dict['OPTIONS']
+        self.pragmas = options.get('pragmas', {})
+        self.transaction_mode = options.get('transaction_mode', 'DEFERRED')
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ValueError(
+                f'Неизвестный transaction_mode: {self.transaction_mode}'
+            )
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        apply_pragmas(connection, self.pragmas)
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -0,0 +1,7 @@
+"""
+Бэкенды кэша для нескольких процессов.
+
+RedisCache — общий кэш по протоколу Redis (RESP) с пулом соединений,
+TieredCache — локальный LRU перед общим кэшем с инвалидацией через
+pub/sub. Настраиваются строкой CACHE_URL, см. core.cache.url.
+"""
@@ -0,0 +1,360 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .resp import Connection, ConnectionPool, ResponseError
+
+# Django создаёт экземпляр бэкенда в каждом потоке, а пулы соединений,
+# локальный уровень и подписка на инвалидацию должны быть общими на
+# весь процесс.
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared(key, factory):
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = factory()
+        return _shared[key]
+
+
+def dumps(value):
+    # Целые числа хранятся строкой, чтобы работал INCRBY.
+    if type(value) is int:
+        return str(value).encode()
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def loads(raw):
+    try:
+        return int(raw)
+    except ValueError:
+        return pickle.loads(raw)
+
+
+class RedisCache(BaseCache):
+    """
+    Общий кэш на сервере с протоколом Redis.
+
+        'BACKEND': 'core.cache.backends.RedisCache',
+        'LOCATION': '127.0.0.1:6379',
+        'OPTIONS': {'DB': 0, 'MAX_CONNECTIONS': 50, 'SOCKET_TIMEOUT': 5},
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        host, _, port = server.rpartition(':')
+        self.host = host or '127.0.0.1'
+        self.port = int(port or 6379)
+        self.db = options.get('DB', 0)
+        self.socket_timeout = options.get('SOCKET_TIMEOUT', 5)
+        self.pool = shared(
+            ('pool', self.host, self.port, self.db),
+            lambda: ConnectionPool(
+                self.host, self.port, self.db,
+                max_connections=options.get('MAX_CONNECTIONS', 50),
+                timeout=self.socket_timeout,
+            ),
+        )
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expiry(self, timeout):
+        """Аргументы SET для срока жизни; None — ключ бессрочный."""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return []
+        return ['PX', max(int(timeout * 1000), 1)]
+
+    def _expired(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return timeout is not None and timeout <= 0
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        if self._expired(timeout):
+            return False
+        reply = self.pool.execute(
+            'SET', key, dumps(value), *self._expiry(timeout), 'NX'
+        )
+        return reply == 'OK'
+
+    def get(self, key, default=None, version=None):
+        raw = self.pool.execute('GET', self._key(key, version))
+        return default if raw is None else loads(raw)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        if self._expired(timeout):
+            self.pool.execute('DEL', key)
+            return
+        self.pool.execute('SET', key, dumps(value), *self._expiry(timeout))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if not expiry:
+            return bool(self.pool.execute('EXISTS', key))
+        return bool(self.pool.execute('PEXPIRE', key, expiry[1]))
+
+    def delete(self, key, version=None):
+        self.pool.execute('DEL', self._key(key, version))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        made = [self._key(key, version) for key in keys]
+        values = self.pool.execute('MGET', *made)
+        return {
+            key: loads(raw)
+            for key, raw in zip(keys, values) if raw is not None
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if self._expired(timeout):
+            self.delete_many(data, version)
+            return []
+        expiry = self._expiry(timeout)
+        self.pool.pipeline([
+            ('SET', self._key(key, version), dumps(value), *expiry)
+            for key, value in data.items()
+        ])
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self.pool.execute('DEL', *keys)
+
+    def has_key(self, key, version=None):
+        return bool(self.pool.execute('EXISTS', self._key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        made = self._key(key, version)
+        if not self.pool.execute('EXISTS', made):
+            raise ValueError(f"Key '{key}' not found")
+        try:
+            return self.pool.execute('INCRBY', made, delta)
+        except ResponseError as error:
+            raise ValueError(str(error))
+
+    def clear(self):
+        """Очищает всю базу сервера, а не только ключи с префиксом."""
+        self.pool.execute('FLUSHDB')
+
+    def close(self, **kwargs):
+        # Соединения остаются в пуле до конца процесса.
+        pass
+
+
+class LocalTier:
+    """
+    LRU в памяти процесса: ключ — сырое значение из общего кэша.
+
+    generation растёт при каждой инвалидации. Значение, прочитанное
+    из общего кэша, сохраняется, только если за время чтения не было
+    инвалидаций, иначе можно закрепить уже устаревшую копию.
+    """
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.generation = 0
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return None
+            expires, raw = item
+            if expires < time.monotonic():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return raw
+
+    def set(self, key, raw, generation):
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.data[key] = (time.monotonic() + self.timeout, raw)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_entries:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.generation += 1
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.data.clear()
+
+
+class Subscriber(threading.Thread):
+    """
+    Фоновая подписка на канал инвалидации. Пока подписка не
+    установлена (или после обрыва), локальный уровень не используется
+    и очищается, чтобы не отдать пропущенное изменение.
+    """
+
+    CLEAR_ALL = b'*'
+
+    def __init__(self, cache, channel, local):
+        super().__init__(name='cache-invalidation', daemon=True)
+        self.cache = cache
+        self.channel = channel
+        self.local = local
+        self.ready = threading.Event()
+
+    def run(self):
+        while True:
+            try:
+                self.listen()
+            except (OSError, ConnectionError, ResponseError):
+                pass
+            self.ready.clear()
+            self.local.clear()
+            time.sleep(1)
+
+    def listen(self):
+        connection = Connection(self.cache.host, self.cache.port)
+        try:
+            connection.execute('SUBSCRIBE', self.channel)
+            # Сообщения приходят без запросов, таймаут чтения не нужен.
+            connection.sock.settimeout(None)
+            self.local.clear()
+            self.ready.set()
+            while True:
+                kind, _, payload = connection.read()
+                if kind != b'message':
+                    continue
+                if payload == self.CLEAR_ALL:
+                    self.local.clear()
+                else:
+                    self.local.delete(payload.decode())
+        finally:
+            connection.close()
+
+
+class TieredCache(RedisCache):
+    """
+    Двухуровневый кэш: LRU в памяти процесса перед общим сервером.
+
+    Запись идёт в общий кэш и публикует имя ключа в канал
+    инвалидации; подписчики во всех процессах вычёркивают ключ из
+    своего локального уровня. LOCAL_TIMEOUT ограничивает, сколько
+    локальная копия может пережить потерянное сообщение.
+
+        'OPTIONS': {'LOCAL_MAX_ENTRIES': 5000, 'LOCAL_TIMEOUT': 30,
+                    'CHANNEL': 'yatube:cache:invalidate'}
+    """
+
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        options = params.get('OPTIONS', {})
+        self.channel = options.get('CHANNEL', 'yatube:cache:invalidate')
+        scope = (self.host, self.port, self.db, self.channel)
+        self.local = shared(('local',) + scope, lambda: LocalTier(
+            options.get('LOCAL_MAX_ENTRIES', 5000),
+            options.get('LOCAL_TIMEOUT', 30),
+        ))
+        self.subscriber = shared(('subscriber',) + scope, self._subscribe)
+
+    def _subscribe(self):
+        subscriber = Subscriber(self, self.channel, self.local)
+        subscriber.start()
+        return subscriber
+
+    def _invalidate(self, keys):
+        for key in keys:
+            self.local.delete(key)
+        self.pool.pipeline([
+            ('PUBLISH', self.channel, key) for key in keys
+        ])
+
+    def get(self, key, default=None, version=None):
+        made = self._key(key, version)
+        use_local = self.subscriber.ready.is_set()
+        raw = self.local.get(made) if use_local else None
+        if raw is None:
+            generation = self.local.generation
+            raw = self.pool.execute('GET', made)
+            if raw is None:
+                return default
+            if use_local:
+                self.local.set(made, raw, generation)
+        return loads(raw)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        made = {self._key(key, version): key for key in keys}
+        use_local = self.subscriber.ready.is_set()
+        found = {}
+        if use_local:
+            for key in made:
+                raw = self.local.get(key)
+                if raw is not None:
+                    found[key] = raw
+        missing = [key for key in made if key not in found]
+        if missing:
+            generation = self.local.generation
+            for key, raw in zip(missing, self.pool.execute('MGET', *missing)):
+                if raw is not None:
+                    found[key] = raw
+                    if use_local:
+                        self.local.set(key, raw, generation)
+        return {made[key]: loads(raw) for key, raw in found.items()}
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = super().add(key, value, timeout, version)
+        if added:
+            self._invalidate([self._key(key, version)])
+        return added
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        super().set(key, value, timeout, version)
+        self._invalidate([self._key(key, version)])
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        touched = super().touch(key, timeout, version)
+        self._invalidate([self._key(key, version)])
+        return touched
+
+    def delete(self, key, version=None):
+        super().delete(key, version)
+        self._invalidate([self._key(key, version)])
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = super().set_many(data, timeout, version)
+        self._invalidate([self._key(key, version) for key in data])
+        return failed
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        super().delete_many(keys, version)
+        self._invalidate([self._key(key, version) for key in keys])
+
+    def incr(self, key, delta=1, version=None):
+        value = super().incr(key, delta, version)
+        self._invalidate([self._key(key, version)])
+        return value
+
+    def clear(self):
+        super().clear()
+        self.local.clear()
+        self.pool.execute('PUBLISH', self.channel, Subscriber.CLEAR_ALL)
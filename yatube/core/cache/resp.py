@@ -0,0 +1,145 @@
+"""Минимальный клиент протокола Redis (RESP2) с пулом соединений."""
+import queue
+import socket
+from contextlib import contextmanager
+
+
+class ResponseError(Exception):
+    """Ошибка, которую вернул сервер."""
+
+
+def encode_command(args):
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        elif isinstance(arg, (int, float)):
+            arg = str(arg).encode()
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+def read_reply(stream):
+    line = stream.readline()
+    if not line.endswith(b'\r\n'):
+        raise ConnectionError('Соединение с сервером кэша закрыто')
+    kind, payload = line[:1], line[1:-2]
+    if kind == b'+':
+        return payload.decode()
+    if kind == b'-':
+        raise ResponseError(payload.decode())
+    if kind == b':':
+        return int(payload)
+    if kind == b'$':
+        length = int(payload)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        if len(data) != length + 2:
+            raise ConnectionError('Соединение с сервером кэша закрыто')
+        return data[:-2]
+    if kind == b'*':
+        length = int(payload)
+        if length < 0:
+            return None
+        return [read_reply(stream) for _ in range(length)]
+    raise ConnectionError(f'Непонятный ответ сервера: {line!r}')
+
+
+class Connection:
+    def __init__(self, host, port, db=0, timeout=None):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stream = self.sock.makefile('rb')
+        if db:
+            self.execute('SELECT', db)
+
+    def send(self, *args):
+        self.sock.sendall(encode_command(args))
+
+    def read(self):
+        return read_reply(self.stream)
+
+    def execute(self, *args):
+        self.send(*args)
+        return self.read()
+
+    def close(self):
+        try:
+            self.stream.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class ConnectionPool:
+    """
+    Пул соединений одного процесса. Свободные соединения хранятся в
+    очереди. После ошибки сервера (ResponseError) ответ прочитан
+    целиком, и соединение возвращается в пул; при любой другой
+    ошибке в соединении могли остаться непрочитанные данные, поэтому
+    оно закрывается.
+    """
+
+    def __init__(self, host, port, db=0, max_connections=50, timeout=None):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.timeout = timeout
+        self.idle = queue.LifoQueue(max_connections)
+
+    def new_connection(self):
+        return Connection(self.host, self.port, self.db, self.timeout)
+
+    @contextmanager
+    def connection(self):
+        try:
+            connection = self.idle.get_nowait()
+        except queue.Empty:
+            connection = self.new_connection()
+        try:
+            yield connection
+        except ResponseError:
+            self.release(connection)
+            raise
+        except BaseException:
+            connection.close()
+            raise
+        self.release(connection)
+
+    def release(self, connection):
+        try:
+            self.idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def execute(self, *args):
+        with self.connection() as connection:
+            return connection.execute(*args)
+
+    def pipeline(self, commands):
+        """
+        Отправляет команды одним пакетом и читает все ответы. Ошибка
+        сервера возвращается на месте ответа, чтобы не оставить
+        непрочитанные ответы в соединении.
+        """
+        if not commands:
+            return []
+        with self.connection() as connection:
+            connection.sock.sendall(
+                b''.join(encode_command(args) for args in commands)
+            )
+            replies = []
+            for _ in commands:
+                try:
+                    replies.append(connection.read())
+                except ResponseError as error:
+                    replies.append(error)
+            return replies
+
+    def disconnect(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
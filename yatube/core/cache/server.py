@@ -0,0 +1,228 @@
+"""
+Локальная замена Redis для тестов и разработки.
+
+Понимает только команды, которые нужны бэкендам из core.cache:
+строки с истечением срока, INCRBY, MGET и pub/sub. Данные живут в
+памяти процесса.
+
+    server = StandInServer()
+    server.start()
+    ... 'LOCATION': server.location ...
+    server.stop()
+"""
+import socketserver
+import threading
+import time
+from collections import defaultdict
+
+from .resp import ResponseError, read_reply
+
+
+class SimpleString(str):
+    """Ответ +OK вместо bulk-строки."""
+
+
+OK = SimpleString('OK')
+# Команда уже ответила сама (SUBSCRIBE отвечает на каждый канал).
+NO_REPLY = object()
+
+
+def encode_reply(value):
+    if isinstance(value, SimpleString):
+        return b'+%s\r\n' % value.encode()
+    if isinstance(value, ResponseError):
+        return b'-ERR %s\r\n' % str(value).encode()
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, list):
+        return b'*%d\r\n' % len(value) + b''.join(map(encode_reply, value))
+    if isinstance(value, str):
+        value = value.encode()
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.db = 0
+        self.write_lock = threading.Lock()
+        self.server.stand_in.connections += 1
+
+    def reply(self, value):
+        with self.write_lock:
+            self.wfile.write(encode_reply(value))
+
+    def handle(self):
+        stand_in = self.server.stand_in
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            name, args = command[0].decode().upper(), command[1:]
+            method = getattr(stand_in, f'command_{name.lower()}', None)
+            if method is None:
+                self.reply(ResponseError(f"unknown command '{name}'"))
+                continue
+            try:
+                result = method(self, *args)
+            except ResponseError as error:
+                self.reply(error)
+            except (TypeError, ValueError, IndexError):
+                self.reply(ResponseError(f"wrong arguments for '{name}'"))
+            else:
+                if result is not NO_REPLY:
+                    self.reply(result)
+
+    def finish(self):
+        self.server.stand_in.unsubscribe(self)
+        super().finish()
+
+
+class TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class StandInServer:
+    def __init__(self, host='127.0.0.1', port=0):
+        self.dbs = defaultdict(dict)
+        self.subscribers = defaultdict(set)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.commands = 0
+        self.server = TCPServer((host, port), Handler)
+        self.server.stand_in = self
+        self.thread = None
+
+    @property
+    def location(self):
+        host, port = self.server.server_address[:2]
+        return f'{host}:{port}'
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.serve_forever, daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _data(self, handler):
+        self.commands += 1
+        return self.dbs[handler.db]
+
+    def _get(self, data, key):
+        item = data.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and expires <= time.monotonic():
+            del data[key]
+            return None
+        return value
+
+    def command_ping(self, handler):
+        return SimpleString('PONG')
+
+    def command_select(self, handler, db):
+        handler.db = int(db)
+        return OK
+
+    def command_get(self, handler, key):
+        with self.lock:
+            return self._get(self._data(handler), key)
+
+    def command_mget(self, handler, *keys):
+        with self.lock:
+            data = self._data(handler)
+            return [self._get(data, key) for key in keys]
+
+    def command_set(self, handler, key, value, *options):
+        options = [option.decode().upper() for option in options]
+        expires = None
+        if 'PX' in options:
+            expires = int(options[options.index('PX') + 1]) / 1000
+        elif 'EX' in options:
+            expires = int(options[options.index('EX') + 1])
+        with self.lock:
+            data = self._data(handler)
+            if 'NX' in options and self._get(data, key) is not None:
+                return None
+            if expires is not None:
+                expires += time.monotonic()
+            data[key] = (value, expires)
+            return OK
+
+    def command_del(self, handler, *keys):
+        with self.lock:
+            data = self._data(handler)
+            removed = 0
+            for key in keys:
+                if self._get(data, key) is not None:
+                    del data[key]
+                    removed += 1
+            return removed
+
+    def command_exists(self, handler, *keys):
+        with self.lock:
+            data = self._data(handler)
+            return sum(self._get(data, key) is not None for key in keys)
+
+    def command_incrby(self, handler, key, delta):
+        with self.lock:
+            data = self._data(handler)
+            current = self._get(data, key)
+            try:
+                value = int(current or 0) + int(delta)
+            except ValueError:
+                raise ResponseError('value is not an integer')
+            expires = data[key][1] if current is not None else None
+            data[key] = (str(value).encode(), expires)
+            return value
+
+    def command_pexpire(self, handler, key, milliseconds):
+        with self.lock:
+            data = self._data(handler)
+            value = self._get(data, key)
+            if value is None:
+                return 0
+            data[key] = (value, time.monotonic() + int(milliseconds) / 1000)
+            return 1
+
+    def command_flushdb(self, handler):
+        with self.lock:
+            self._data(handler).clear()
+            return OK
+
+    def command_subscribe(self, handler, *channels):
+        with self.lock:
+            for number, channel in enumerate(channels, start=1):
+                self.subscribers[channel].add(handler)
+                handler.reply([b'subscribe', channel, number])
+        return NO_REPLY
+
+    def command_publish(self, handler, channel, message):
+        with self.lock:
+            receivers = list(self.subscribers.get(channel, ()))
+        for receiver in receivers:
+            try:
+                receiver.reply([b'message', channel, message])
+            except OSError:
+                pass
+        return len(receivers)
+
+    def unsubscribe(self, handler):
+        with self.lock:
+            for receivers in self.subscribers.values():
+                receivers.discard(handler)
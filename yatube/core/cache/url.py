@@ -0,0 +1,52 @@
+from urllib.parse import parse_qs, urlsplit
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'dummy': 'django.core.cache.backends.dummy.DummyCache',
+    'redis': 'core.cache.backends.RedisCache',
+    'tiered+redis': 'core.cache.backends.TieredCache',
+    'memcached': 'django.core.cache.backends.memcached.PyLibMCCache',
+}
+
+# Кэши, которые видят все процессы сервера.
+SHARED = ('redis', 'tiered+redis', 'memcached')
+
+# Параметры строки запроса, которые передаются в OPTIONS как числа.
+INT_OPTIONS = ('max_connections', 'local_max_entries')
+FLOAT_OPTIONS = ('socket_timeout', 'local_timeout')
+
+
+def cache_config(url):
+    """
+    Настройки CACHES['default'] из строки вида
+
+        locmem://
+        redis://127.0.0.1:6379/0?max_connections=50
+        tiered+redis://127.0.0.1:6379/0?local_max_entries=5000
+        memcached://127.0.0.1:11211
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in BACKENDS:
+        raise ValueError(f'Неизвестный кэш: {url}')
+    config = {'BACKEND': BACKENDS[parts.scheme]}
+    if parts.scheme in ('locmem', 'dummy'):
+        return config
+    config['LOCATION'] = parts.netloc
+    options = {}
+    for name, values in parse_qs(parts.query).items():
+        value = values[-1]
+        if name in INT_OPTIONS:
+            value = int(value)
+        elif name in FLOAT_OPTIONS:
+            value = float(value)
+        options[name.upper()] = value
+    if parts.scheme != 'memcached':
+        options['DB'] = int(parts.path.strip('/') or 0)
+    if options:
+        config['OPTIONS'] = options
+    return config
+
+
+def cache_is_shared(url):
+    """Виден ли кэш из CACHE_URL всем процессам сервера."""
+    return urlsplit(url).scheme in SHARED
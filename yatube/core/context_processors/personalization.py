@@ -0,0 +1,11 @@
+from django.conf import settings
+
+
+def hydrate(request):
+    """
+    При PERSONALIZATION = 'client' шаблоны не читают пользователя:
+    его части страницы заполняет static/js/hydrate.js.
+    """
+    return {
+        'hydrate': settings.PERSONALIZATION == 'client'
+    }
@@ -0,0 +1,239 @@
+"""
+Отдача статики и загруженных картинок без обратного прокси.
+
+FileServer оборачивает WSGI-приложение и отвечает на запросы к
+STATIC_URL и MEDIA_URL сам, не заходя в Django: без middleware,
+сессий и разбора URL. Тело отдаётся через wsgi.file_wrapper —
+gunicorn передаёт файл системным вызовом sendfile, не копируя его
+через Python.
+
+Файлы с хэшем содержимого в имени (их создаёт collectstatic)
+кэшируются навсегда, остальные — FILES_MAX_AGE секунд с проверкой
+ETag и Last-Modified. Для статики выбирается заранее сжатая копия
+.br или .gz, если клиент её принимает (core/staticfiles.py).
+Поддерживается один диапазон Range: bytes=a-b.
+"""
+import mimetypes
+import os
+import re
+import stat
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+# Имя с хэшем от ManifestStaticFilesStorage: name.<12 hex>.ext
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+BLOCK_SIZE = 64 * 1024
+RANGE = re.compile(r'bytes=(\d*)-(\d*)')
+
+
+def byte_range(header, size):
+    """
+    Пара (первый, последний байт) из заголовка Range.
+
+    None — заголовок не разобран или диапазонов несколько, тогда
+    отдаётся весь файл; False — диапазон за пределами файла (416).
+    """
+    match = RANGE.fullmatch(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        suffix = int(last)
+        if not suffix or not size:
+            return False
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        return False
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме запрещённых через q=0."""
+    accepted = set()
+    for item in header.split(','):
+        name, _, params = item.partition(';')
+        quality = params.strip().replace(' ', '')
+        if quality in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class _Slice:
+    """Часть файла от текущей позиции длиной length."""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+class FileServer:
+    """
+    WSGI-обёртка, отдающая файлы из STATIC_ROOT и MEDIA_ROOT.
+
+        application = FileServer(get_wsgi_application())
+
+    Запросы к отсутствующим файлам и не GET/HEAD уходят в Django.
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.mounts = [
+            (settings.STATIC_URL, os.path.realpath(settings.STATIC_ROOT),
+             True),
+            (settings.MEDIA_URL, os.path.realpath(settings.MEDIA_ROOT),
+             False),
+        ]
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if environ.get('REQUEST_METHOD') in ('GET', 'HEAD'):
+            for prefix, root, static in self.mounts:
+                if path.startswith(prefix):
+                    response = self.serve(
+                        environ, start_response, root,
+                        path[len(prefix):], static,
+                    )
+                    if response is not None:
+                        return response
+                    break
+        return self.application(environ, start_response)
+
+    def serve(self, environ, start_response, root, name, static):
+        path, info = _resolve(root, name)
+        if path is None:
+            return None
+
+        content_type, _ = mimetypes.guess_type(path)
+        headers = [
+            ('Cache-Control', (
+                IMMUTABLE if static and HASHED_NAME.search(name)
+                else f'public, max-age={settings.FILES_MAX_AGE}'
+            )),
+            ('Last-Modified', http_date(info.st_mtime)),
+        ]
+        if static:
+            headers.append(('Vary', 'Accept-Encoding'))
+
+        range_header = environ.get('HTTP_RANGE')
+        encoding = None
+        if static and not range_header:
+            encoding, path, info = _precompressed(
+                path, info, environ.get('HTTP_ACCEPT_ENCODING', '')
+            )
+        etag = f'"{info.st_size:x}-{int(info.st_mtime):x}'
+        etag += f'-{encoding}"' if encoding else '"'
+        headers.append(('ETag', etag))
+
+        if _not_modified(environ, etag, info.st_mtime):
+            start_response('304 Not Modified', headers)
+            return []
+
+        size = info.st_size
+        requested = _requested_range(environ, etag, info)
+        if requested is False:
+            headers.append(('Content-Range', f'bytes */{size}'))
+            start_response('416 Range Not Satisfiable', headers)
+            return []
+        if requested is None:
+            status, start, end = '200 OK', 0, size - 1
+        else:
+            status, (start, end) = '206 Partial Content', requested
+            headers.append(('Content-Range', f'bytes {start}-{end}/{size}'))
+        headers += [
+            ('Content-Type', content_type or 'application/octet-stream'),
+            ('Content-Length', str(end - start + 1)),
+            ('Accept-Ranges', 'bytes'),
+            ('X-Content-Type-Options', 'nosniff'),
+        ]
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+
+        start_response(status, headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        file = open(path, 'rb')
+        file.seek(start)
+        # До конца файла отдаётся сам файл: file_wrapper сервера
+        # отправит его через sendfile с текущей позиции. Диапазон
+        # в середине читается обычным образом, ограниченный длиной.
+        body = file if end == size - 1 else _Slice(file, end - start + 1)
+        file_wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return file_wrapper(body, BLOCK_SIZE)
+
+
+def _resolve(root, name):
+    """Путь и os.stat() обычного файла внутри root или (None, None)."""
+    # PATH_INFO по PEP 3333 — байты в latin-1.
+    try:
+        name = name.encode('latin-1').decode()
+    except UnicodeError:
+        return None, None
+    path = os.path.realpath(os.path.join(root, name))
+    if not path.startswith(root + os.sep):
+        return None, None
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None, None
+    if not stat.S_ISREG(info.st_mode):
+        return None, None
+    return path, info
+
+
+def _precompressed(path, info, accept_encoding):
+    accepted = accepted_encodings(accept_encoding)
+    for encoding, suffix in ENCODINGS:
+        if encoding not in accepted:
+            continue
+        try:
+            return encoding, path + suffix, os.stat(path + suffix)
+        except OSError:
+            continue
+    return None, path, info
+
+
+def _not_modified(environ, etag, mtime):
+    if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        return if_none_match.strip() == '*' or etag in parse_etags(
+            if_none_match
+        )
+    since = parse_http_date_safe(environ.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return since is not None and int(mtime) <= since
+
+
+def _requested_range(environ, etag, info):
+    """
+    Диапазон из Range как в byte_range(). Range учитывается, только
+    если If-Range не задан или совпал с ETag или Last-Modified.
+    """
+    range_header = environ.get('HTTP_RANGE')
+    if not range_header:
+        return None
+    if_range = environ.get('HTTP_IF_RANGE')
+    if if_range:
+        if if_range.startswith(('"', 'W/')):
+            matched = if_range == etag
+        else:
+            matched = parse_http_date_safe(if_range) == int(info.st_mtime)
+        if not matched:
+            return None
+    return byte_range(range_header, info.st_size)
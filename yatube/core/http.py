@@ -0,0 +1,129 @@
+"""
+HTTP-кэширование HTML-страниц: условные ответы и Cache-Control.
+"""
+import datetime as dt
+import hashlib
+import os
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from . import routers
+
+
+def conditional_page(get_validators):
+    """
+    Условные ответы для HTML-страницы.
+
+    get_validators(request, *args, **kwargs) возвращает пару (ключ,
+    время последнего изменения) и должна быть дешёвой: при совпавшем
+    If-None-Match или If-Modified-Since представление не вызывается
+    и клиент получает 304. В ETag входят адрес, пользователь (в
+    шапке страницы его имя) и cookie CSRF: формы страницы несут токен,
+    а после входа и выхода секрет меняется, и старая копия страницы
+    отправила бы форму с устаревшим токеном.
+
+    Ответы анонимам можно хранить в общих кэшах PUBLIC_PAGE_MAX_AGE
+    секунд, остальные — только в браузере с проверкой при каждом
+    переходе. Все ответы помечаются Vary: Cookie.
+
+    При PERSONALIZATION = 'client' страница одна на всех: пользователь
+    не читается, а ответ публичный и без Vary: Cookie.
+
+    Страница, прочитанная с реплики, уходит без ETag и Last-Modified:
+    ключ описывает текущие данные, а реплика может отставать.
+    """
+    def decorator(view_func):
+        def validators(request, *args, **kwargs):
+            if not hasattr(request, '_page_validators'):
+                key, last_modified = get_validators(request, *args, **kwargs)
+                raw = '|'.join([
+                    request.get_full_path(), str(_user_pk(request)),
+                    _csrf_cookie(request), key,
+                ])
+                request._page_validators = (
+                    hashlib.md5(raw.encode()).hexdigest(), last_modified
+                )
+            return request._page_validators
+
+        conditional_view = condition(
+            etag_func=lambda *args, **kwargs: validators(*args, **kwargs)[0],
+            last_modified_func=(
+                lambda *args, **kwargs: validators(*args, **kwargs)[1]
+            ),
+        )(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            with routers.replica_reads() as reads:
+                response = conditional_view(request, *args, **kwargs)
+            if reads.versioned:
+                drop_validators(response)
+            if request.method in ('GET', 'HEAD'):
+                _patch_caching(request, response)
+            return response
+        return wrapper
+    return decorator
+
+
+def drop_validators(response):
+    """Убирает ETag и Last-Modified, чтобы клиент не получал по ним 304."""
+    del response['ETag']
+    del response['Last-Modified']
+
+
+def _user_pk(request):
+    if settings.PERSONALIZATION == 'client':
+        return 0
+    return request.user.pk or 0
+
+
+def _csrf_cookie(request):
+    # При PERSONALIZATION = 'client' токен подставляет скрипт страницы.
+    if settings.PERSONALIZATION == 'client':
+        return ''
+    return request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+
+
+def _patch_caching(request, response):
+    if settings.PERSONALIZATION == 'client':
+        if response.status_code in (200, 304):
+            patch_cache_control(
+                response, public=True, max_age=settings.PUBLIC_PAGE_MAX_AGE
+            )
+        return
+    patch_vary_headers(response, ('Cookie',))
+    if response.status_code not in (200, 304):
+        return
+    # Страница с CSRF-токеном ставит cookie и не должна попасть
+    # в общий кэш.
+    shared = not (
+        request.user.is_authenticated or request.META.get('CSRF_COOKIE_USED')
+    )
+    if shared:
+        patch_cache_control(
+            response, public=True, max_age=settings.PUBLIC_PAGE_MAX_AGE
+        )
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+
+
+@lru_cache(maxsize=None)
+def _templates_modified():
+    newest = max(
+        os.path.getmtime(os.path.join(root, name))
+        for root, _, names in os.walk(settings.TEMPLATES_DIR)
+        for name in names
+    )
+    return dt.datetime.fromtimestamp(int(newest), tz=dt.timezone.utc)
+
+
+def template_validators(request, *args, **kwargs):
+    """
+    Валидаторы страниц без данных из базы: время последнего изменения
+    шаблонов проекта, считанное один раз за жизнь процесса.
+    """
+    modified = _templates_modified()
+    return modified.isoformat(), modified
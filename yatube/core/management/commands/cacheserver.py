@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core.cache.server import StandInServer
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает локальную замену Redis, чтобы проверить общий кэш '
+        'с несколькими процессами без настоящего сервера.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=6379)
+
+    def handle(self, *args, **options):
+        server = StandInServer(options['host'], options['port'])
+        self.stdout.write(f'Кэш слушает {server.location}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.stop()
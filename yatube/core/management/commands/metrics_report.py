@@ -0,0 +1,92 @@
+import json
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.metrics import histogram_from_dict, registry
+
+COLUMNS = (
+    'view', 'n', 'p50 ms', 'p95 ms', 'queries', 'db ms', 'render ms',
+    'cache hit %', 'KB',
+)
+
+
+def report_rows(snapshot):
+    """Строки отчёта по snapshot() реестра, самые медленные сверху."""
+    rows = []
+    for view_name, view in snapshot.items():
+        wall = histogram_from_dict('request_seconds', view['request_seconds'])
+        if not wall.count:
+            continue
+        means = {
+            name: histogram_from_dict(name, view[name]).mean()
+            for name in (
+                'db_queries', 'db_seconds', 'render_seconds', 'response_bytes'
+            )
+        }
+        lookups = view['cache_hits'] + view['cache_misses']
+        rows.append((
+            view_name,
+            wall.count,
+            wall.quantile(0.5) * 1000,
+            wall.quantile(0.95) * 1000,
+            means['db_queries'],
+            means['db_seconds'] * 1000,
+            means['render_seconds'] * 1000,
+            view['cache_hits'] * 100 / lookups if lookups else None,
+            means['response_bytes'] / 1024,
+        ))
+    rows.sort(key=lambda row: row[3], reverse=True)
+    return rows
+
+
+def format_cell(value):
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return f'{value:.1f}'
+    return str(value)
+
+
+class Command(BaseCommand):
+    help = (
+        'Печатает отчёт по метрикам запросов, собранным '
+        'MetricsMiddleware. Без --url берёт метрики текущего '
+        'процесса, с --url — у запущенного сервера.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='Адрес /metrics/ сервера, например '
+                 'http://127.0.0.1:8000/metrics/',
+        )
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Вывести сырые гистограммы в JSON.',
+        )
+
+    def handle(self, *args, **options):
+        if options['url']:
+            try:
+                with urlopen(f"{options['url']}?format=json") as response:
+                    snapshot = json.load(response)
+            except (OSError, ValueError) as error:
+                raise CommandError(f'Не удалось получить метрики: {error}')
+        else:
+            snapshot = registry.snapshot()
+        if options['json']:
+            self.stdout.write(json.dumps(snapshot, indent=2))
+            return
+        rows = [COLUMNS] + [
+            tuple(map(format_cell, row)) for row in report_rows(snapshot)
+        ]
+        if len(rows) == 1:
+            self.stdout.write('Замеров нет.')
+            return
+        widths = [max(map(len, column)) for column in zip(*rows)]
+        for row in rows:
+            self.stdout.write('  '.join(
+                cell.ljust(width) if i == 0 else cell.rjust(width)
+                for i, (cell, width) in enumerate(zip(row, widths))
+            ))
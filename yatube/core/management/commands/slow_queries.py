@@ -0,0 +1,50 @@
+import json
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.slowlog import registry
+
+
+class Command(BaseCommand):
+    help = (
+        'Печатает сводку журнала медленных запросов по отпечаткам: '
+        'суммарное время, число повторов за страницу и места вызова. '
+        'Без --url берёт сводку текущего процесса, с --url — у '
+        'запущенного сервера.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='Адрес /metrics/slow-queries/ сервера, например '
+                 'http://127.0.0.1:8000/metrics/slow-queries/',
+        )
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if options['url']:
+            try:
+                with urlopen(options['url']) as response:
+                    entries = json.load(response)['queries']
+            except (OSError, ValueError, KeyError) as error:
+                raise CommandError(f'Не удалось получить сводку: {error}')
+        else:
+            entries = registry.top()
+        entries = entries[:options['limit']]
+        if not entries:
+            self.stdout.write('Медленных и повторяющихся запросов нет.')
+            return
+        for entry in entries:
+            self.stdout.write(self.style.WARNING(
+                f"[{entry['fingerprint']}] медленных: {entry['slow']}, "
+                f"всего {entry['total_ms']:.1f} мс, "
+                f"макс. {entry['max_ms']:.1f} мс, "
+                f"повторов за страницу: {entry['max_repeats']}"
+            ))
+            self.stdout.write(f"    {entry['sql']}")
+            for where in entry['where']:
+                self.stdout.write(
+                    f"    view={where['view']} "
+                    f"template={where['template']} code={where['code']}"
+                )
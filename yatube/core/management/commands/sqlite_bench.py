@@ -0,0 +1,170 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.backends.sqlite3.base import apply_pragmas
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, author_id INTEGER, '
+    'text TEXT, pub_date REAL, comments_count INTEGER DEFAULT 0)',
+    'CREATE INDEX post_pub_date ON post (pub_date DESC)',
+    'CREATE TABLE comment (id INTEGER PRIMARY KEY, post_id INTEGER, '
+    'text TEXT, created REAL)',
+    'CREATE INDEX comment_post ON comment (post_id, created)',
+)
+READ_SQL = (
+    'SELECT id, author_id, text, comments_count FROM post '
+    'ORDER BY pub_date DESC LIMIT 10 OFFSET ?'
+)
+
+
+class Worker(threading.Thread):
+    """
+    Смешанная нагрузка: чтение страницы ленты или запись комментария
+    (проверка поста, INSERT и UPDATE счётчика в одной транзакции —
+    как add_comment с сигналами).
+    """
+
+    def __init__(self, path, options, reuse, write_ratio, deadline, seed):
+        super().__init__()
+        self.path = path
+        self.pragmas = options.get('pragmas', {})
+        self.mode = options.get('transaction_mode', 'DEFERRED')
+        self.timeout = options.get('timeout', 5)
+        self.reuse = reuse
+        self.write_ratio = write_ratio
+        self.deadline = deadline
+        self.rnd = random.Random(seed)
+        self.reads = self.writes = self.errors = 0
+        self.connection = None
+
+    def connect(self):
+        if self.reuse and self.connection is not None:
+            return self.connection
+        connection = sqlite3.connect(
+            self.path, timeout=self.timeout, isolation_level=None
+        )
+        apply_pragmas(connection, self.pragmas)
+        self.connection = connection
+        return connection
+
+    def release(self, connection):
+        if not self.reuse:
+            connection.close()
+
+    def read(self, connection):
+        connection.execute(READ_SQL, [self.rnd.randrange(100)]).fetchall()
+        self.reads += 1
+
+    def write(self, connection):
+        post_id = self.rnd.randrange(1, 1001)
+        connection.execute(f'BEGIN {self.mode}')
+        try:
+            connection.execute(
+                'SELECT id FROM post WHERE id = ?', [post_id]
+            ).fetchone()
+            connection.execute(
+                'INSERT INTO comment (post_id, text, created) '
+                'VALUES (?, ?, ?)', [post_id, 'comment', time.time()]
+            )
+            connection.execute(
+                'UPDATE post SET comments_count = comments_count + 1 '
+                'WHERE id = ?', [post_id]
+            )
+            connection.execute('COMMIT')
+        except sqlite3.OperationalError:
+            connection.execute('ROLLBACK')
+            raise
+        self.writes += 1
+
+    def run(self):
+        while time.monotonic() < self.deadline:
+            connection = self.connect()
+            try:
+                if self.rnd.random() < self.write_ratio:
+                    self.write(connection)
+                else:
+                    self.read(connection)
+            except sqlite3.OperationalError:
+                # «database is locked»: запрос пользователя упал бы с 500.
+                self.errors += 1
+            finally:
+                self.release(connection)
+        if self.connection is not None:
+            self.connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность профилей SQLite из '
+        'SQLITE_PROFILES на смешанной нагрузке чтения и записи. '
+        'Профиль plain открывает соединение на каждую операцию, как '
+        'при CONN_MAX_AGE = 0, остальные держат соединение в потоке.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=5.0)
+        parser.add_argument('--write-ratio', type=float, default=0.2)
+        parser.add_argument(
+            '--profiles', nargs='+', default=list(settings.SQLITE_PROFILES)
+        )
+
+    def handle(self, *args, **options):
+        results = {}
+        for name in options['profiles']:
+            results[name] = self.run_profile(
+                name, settings.SQLITE_PROFILES[name], options
+            )
+            ops, reads, writes, errors = results[name]
+            self.stdout.write(
+                f'{name}: {ops:.0f} оп/с, чтений {reads}, записей {writes}, '
+                f'ошибок блокировки {errors}'
+            )
+        baseline = results.get('plain')
+        for name, (ops, *_) in results.items():
+            if baseline and name != 'plain' and baseline[0]:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{name} быстрее plain в {ops / baseline[0]:.1f} раза'
+                ))
+
+    def prepare(self, path, options):
+        connection = sqlite3.connect(path, isolation_level=None)
+        apply_pragmas(connection, options.get('pragmas', {}))
+        for statement in SCHEMA:
+            connection.execute(statement)
+        now = time.time()
+        connection.executemany(
+            'INSERT INTO post (author_id, text, pub_date) VALUES (?, ?, ?)',
+            [(i % 50, 'text ' * 20, now - i) for i in range(1000)],
+        )
+        connection.close()
+
+    def run_profile(self, name, profile, options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.sqlite3')
+            self.prepare(path, profile)
+            deadline = time.monotonic() + options['duration']
+            workers = [
+                Worker(
+                    path, profile, name != 'plain', options['write_ratio'],
+                    deadline, seed,
+                )
+                for seed in range(options['threads'])
+            ]
+            start = time.monotonic()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.monotonic() - start
+        reads = sum(worker.reads for worker in workers)
+        writes = sum(worker.writes for worker in workers)
+        errors = sum(worker.errors for worker in workers)
+        return (reads + writes) / elapsed, reads, writes, errors
@@ -0,0 +1,29 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файлы реплик из '
+        'DATABASE_REPLICAS. Заменяет репликацию при локальной '
+        'разработке: между запусками реплики отстают от основной базы.'
+    )
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError(
+                'Реплики не-SQLite баз заполняет репликация самой СУБД.'
+            )
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            name = settings.DATABASES[alias]['NAME']
+            replica = sqlite3.connect(name)
+            try:
+                primary.connection.backup(replica)
+            finally:
+                replica.close()
+            self.stdout.write(f'{alias}: {name}')
@@ -0,0 +1,169 @@
+import bisect
+import threading
+from collections import defaultdict
+
+# Границы корзин гистограмм. Последняя корзина (+Inf) добавляется сама.
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES = (1, 2, 3, 5, 10, 20, 50, 100)
+BYTES = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Имя метрики, границы корзин и описание для Prometheus.
+HISTOGRAMS = (
+    ('request_seconds', SECONDS, 'Время обработки запроса'),
+    ('db_queries', QUERIES, 'Число SQL-запросов'),
+    ('db_seconds', SECONDS, 'Время в базе данных'),
+    ('render_seconds', SECONDS, 'Время рендеринга шаблонов'),
+    ('response_bytes', BYTES, 'Размер ответа'),
+)
+COUNTERS = (
+    ('cache_hits', 'Попадания в кэш'),
+    ('cache_misses', 'Промахи кэша'),
+)
+PREFIX = 'yatube_'
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами, как в Prometheus."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """Пары (граница, число наблюдений не больше неё)."""
+        total = 0
+        for bound, count in zip(self.bounds + (float('inf'),), self.buckets):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        """Оценка квантиля линейной интерполяцией внутри корзины."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        lower, seen = 0.0, 0
+        for bound, total in self.cumulative():
+            if total >= rank:
+                if bound == float('inf'):
+                    return lower
+                inside = total - seen
+                return lower + (bound - lower) * (rank - seen) / inside
+            lower, seen = bound, total
+        return lower
+
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def as_dict(self):
+        return {
+            'buckets': list(self.buckets),
+            'count': self.count,
+            'sum': self.sum,
+        }
+
+
+class Registry:
+    """
+    Метрики запросов, сгруппированные по имени представления.
+
+    Живут в памяти процесса: при нескольких процессах сервера у
+    каждого свои гистограммы, их складывает сборщик Prometheus.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.views = defaultdict(self._new_view)
+
+    @staticmethod
+    def _new_view():
+        view = {
+            name: Histogram(bounds) for name, bounds, _ in HISTOGRAMS
+        }
+        view.update({name: 0 for name, _ in COUNTERS})
+        return view
+
+    def observe(self, view_name, **values):
+        """Записывает замер одного запроса: значения метрик по именам."""
+        with self.lock:
+            view = self.views[view_name]
+            for name, value in values.items():
+                if isinstance(view[name], Histogram):
+                    view[name].observe(value)
+                else:
+                    view[name] += value
+
+    def snapshot(self):
+        """Копия всех метрик в виде словарей и чисел."""
+        with self.lock:
+            return {
+                view_name: {
+                    name: (
+                        value.as_dict() if isinstance(value, Histogram)
+                        else value
+                    )
+                    for name, value in view.items()
+                }
+                for view_name, view in self.views.items()
+            }
+
+    def prometheus(self):
+        """Текстовый формат экспозиции Prometheus 0.0.4."""
+        with self.lock:
+            views = sorted(self.views.items())
+            lines = []
+            for name, _, help_text in HISTOGRAMS:
+                metric = PREFIX + name
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} histogram')
+                for view_name, view in views:
+                    histogram = view[name]
+                    label = f'view="{_escape(view_name)}"'
+                    for bound, total in histogram.cumulative():
+                        le = '+Inf' if bound == float('inf') else bound
+                        lines.append(
+                            f'{metric}_bucket{{{label},le="{le}"}} {total}'
+                        )
+                    lines.append(f'{metric}_sum{{{label}}} {histogram.sum}')
+                    lines.append(
+                        f'{metric}_count{{{label}}} {histogram.count}'
+                    )
+            for name, help_text in COUNTERS:
+                metric = f'{PREFIX}{name}_total'
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} counter')
+                for view_name, view in views:
+                    label = f'view="{_escape(view_name)}"'
+                    lines.append(f'{metric}{{{label}}} {view[name]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return (
+        value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    )
+
+
+def histogram_from_dict(name, data):
+    """Восстанавливает гистограмму из snapshot() (например, из JSON)."""
+    bounds = dict(
+        (metric, metric_bounds) for metric, metric_bounds, _ in HISTOGRAMS
+    )[name]
+    histogram = Histogram(bounds)
+    histogram.buckets = list(data['buckets'])
+    histogram.count = data['count']
+    histogram.sum = data['sum']
+    return histogram
+
+
+registry = Registry()
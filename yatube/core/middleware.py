@@ -0,0 +1,132 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import routers, slowlog
+from .metrics import registry
+from .probes import Probe
+
+
+class ReplicaMiddleware:
+    """
+    Отправляет чтение безопасных запросов (GET, HEAD) на реплики.
+
+    Запрос, который что-то записал в основную базу, ставит cookie
+    на REPLICA_STICKY_SECONDS: пока она жива, все чтения этого
+    клиента идут в основную базу и он видит свои изменения, даже
+    если реплика отстаёт.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned_until = request.COOKIES.get(settings.REPLICA_STICKY_COOKIE)
+        try:
+            pinned = float(pinned_until) > time.time()
+        except (TypeError, ValueError):
+            pinned = False
+        routers.use_replicas(
+            request.method in ('GET', 'HEAD') and not pinned
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.wrote_to_primary()
+            routers.use_replicas(False)
+        if wrote:
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE,
+                str(time.time() + settings.REPLICA_STICKY_SECONDS),
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Замеряет долю METRICS_SAMPLE_RATE запросов и складывает
+    результаты в гистограммы core.metrics по имени представления.
+
+    Остальные запросы проходят без замера, а при нулевой доле
+    Django выключает middleware целиком. У потоковых ответов
+    размер и работа, сделанная при отдаче, учитываются, когда
+    ответ отдан до конца.
+    """
+
+    def __init__(self, get_response):
+        if settings.METRICS_SAMPLE_RATE <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return self.get_response(request)
+        with Probe() as probe:
+            response = self.get_response(request)
+        match = request.resolver_match
+        view_name = match.view_name if match else '<unresolved>'
+        if response.streaming:
+            response.streaming_content = self._observe_streaming(
+                view_name, probe, response.streaming_content
+            )
+        else:
+            self._observe(view_name, probe, len(response.content))
+        return response
+
+    def _observe_streaming(self, view_name, probe, chunks):
+        size = 0
+        with Probe() as tail:
+            for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+        for name in ('wall_time', 'queries', 'db_time', 'render_time',
+                     'cache_hits', 'cache_misses'):
+            setattr(probe, name, getattr(probe, name) + getattr(tail, name))
+        self._observe(view_name, probe, size)
+
+    def _observe(self, view_name, probe, size):
+        registry.observe(
+            view_name,
+            request_seconds=probe.wall_time,
+            db_queries=probe.queries,
+            db_seconds=probe.db_time,
+            render_seconds=probe.render_time,
+            response_bytes=size,
+            cache_hits=probe.cache_hits,
+            cache_misses=probe.cache_misses,
+        )
+
+
+class SlowQueryMiddleware:
+    """
+    Пишет в журнал core.slowlog запросы дольше SLOW_QUERY_MS и
+    запросы, повторённые за один HTTP-запрос SLOW_QUERY_REPEAT раз.
+    При нулевом пороге Django выключает middleware целиком.
+    """
+
+    def __init__(self, get_response):
+        if settings.SLOW_QUERY_MS <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        capture = slowlog.Capture(request)
+        with capture.watch():
+            response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = self._watch_streaming(
+                capture, response.streaming_content
+            )
+        else:
+            capture.report_repeats()
+        return response
+
+    def _watch_streaming(self, capture, chunks):
+        with capture.watch():
+            yield from chunks
+        capture.report_repeats()
@@ -0,0 +1,141 @@
+import threading
+import time
+import tracemalloc
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template import base
+
+_state = threading.local()
+_original_render = base.Template.render
+_MISSING = object()
+
+
+def _timed_render(self, context):
+    """Template.render, который учитывает время активного замера."""
+    probe = getattr(_state, 'probe', None)
+    if probe is None or probe._render_depth:
+        return _original_render(self, context)
+    probe._render_depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        probe.render_time += time.perf_counter() - start
+        probe._render_depth -= 1
+
+
+def _counted_get(original):
+    def get(self, key, default=None, version=None):
+        probe = getattr(_state, 'probe', None)
+        if probe is None or probe._cache_depth:
+            return original(self, key, default, version)
+        probe._cache_depth += 1
+        try:
+            value = original(self, key, _MISSING, version)
+        finally:
+            probe._cache_depth -= 1
+        if value is _MISSING:
+            probe.cache_misses += 1
+            return default
+        probe.cache_hits += 1
+        return value
+    get.counted = True
+    return get
+
+
+def _counted_get_many(original):
+    def get_many(self, keys, version=None):
+        probe = getattr(_state, 'probe', None)
+        if probe is None or probe._cache_depth:
+            return original(self, keys, version)
+        keys = list(keys)
+        probe._cache_depth += 1
+        try:
+            found = original(self, keys, version)
+        finally:
+            probe._cache_depth -= 1
+        probe.cache_hits += len(found)
+        probe.cache_misses += len(keys) - len(found)
+        return found
+    get_many.counted = True
+    return get_many
+
+
+def install():
+    """
+    Подключает учёт времени шаблонов и обращений к кэшам.
+    Повторный вызов безопасен.
+    """
+    base.Template.render = _timed_render
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        if not getattr(backend.get, 'counted', False):
+            backend.get = _counted_get(backend.get)
+        if not getattr(backend.get_many, 'counted', False):
+            backend.get_many = _counted_get_many(backend.get_many)
+
+
+class Probe:
+    """
+    Замер одного фрагмента кода: число SQL-запросов, время в базе,
+    время рендеринга шаблонов, попадания и промахи кэша и пик
+    потребления памяти.
+
+        with Probe(memory=True) as probe:
+            client.get('/')
+        probe.queries, probe.db_time, probe.render_time, probe.peak_memory
+    """
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.wall_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.peak_memory = 0
+        self._render_depth = 0
+        self._cache_depth = 0
+        self._stack = None
+
+    def _execute(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+    def __enter__(self):
+        install()
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(
+                connection.execute_wrapper(self._execute)
+            )
+        self._outer = getattr(_state, 'probe', None)
+        _state.probe = self
+        if self.memory:
+            self._tracing = tracemalloc.is_tracing()
+            if not self._tracing:
+                tracemalloc.start()
+            self._memory_start = tracemalloc.get_traced_memory()[0]
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wall_time = time.perf_counter() - self._start
+        if self.memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            self.peak_memory = max(peak - self._memory_start, 0)
+            if not self._tracing:
+                tracemalloc.stop()
+        _state.probe = self._outer
+        self._stack.close()
+        return False
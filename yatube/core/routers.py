@@ -0,0 +1,92 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = threading.local()
+
+
+def use_replicas(enabled):
+    """Разрешает или запрещает чтение с реплик в текущем потоке."""
+    _state.use_replicas = enabled
+    _state.wrote = False
+
+
+def wrote_to_primary():
+    return getattr(_state, 'wrote', False)
+
+
+class ReplicaReads:
+    """Приложения, модели которых читались с реплики."""
+
+    def __init__(self):
+        self.apps = set()
+
+    @property
+    def versioned(self):
+        """
+        Читались ли с реплики данные, изменения которых отмечают версии
+        кэша (REPLICA_VERSIONED_APPS). Реплика может ещё не видеть
+        изменений, о которых версии уже знают, поэтому такую страницу
+        нельзя класть в кэш и помечать ETag по этим версиям.
+        """
+        return bool(self.apps.intersection(settings.REPLICA_VERSIONED_APPS))
+
+
+def _watchers():
+    if not hasattr(_state, 'watchers'):
+        _state.watchers = []
+    return _state.watchers
+
+
+@contextmanager
+def replica_reads():
+    """
+    Следит за чтениями в блоке:
+
+        with replica_reads() as reads:
+            response = view(request)
+        if not reads.versioned:
+            cache.set(key, response.content)
+    """
+    reads = ReplicaReads()
+    watchers = _watchers()
+    watchers.append(reads)
+    try:
+        yield reads
+    finally:
+        watchers.remove(reads)
+
+
+class ReplicaRouter:
+    """
+    Чтение — с одной из реплик из DATABASE_REPLICAS, запись — в
+    основную базу. Реплики используются, только если их разрешил
+    ReplicaMiddleware для текущего запроса, и не используются внутри
+    транзакции, чтобы она видела свои же изменения. Чтения с реплик
+    отмечаются в открытых replica_reads().
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or not getattr(_state, 'use_replicas', False):
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        for reads in _watchers():
+            reads.apps.add(model._meta.app_label)
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик приходит вместе с данными основной базы.
+        return db not in settings.DATABASE_REPLICAS
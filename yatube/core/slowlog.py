@@ -0,0 +1,186 @@
+"""
+Журнал медленных SQL-запросов с привязкой к месту вызова.
+
+Каждый запрос дольше SLOW_QUERY_MS пишется в логгер core.slowlog
+вместе с отпечатком (текст запроса без значений), представлением
+и строкой шаблона, рендеринг которой вызвал ленивый запрос.
+Запросы с одинаковым отпечатком, повторённые за один HTTP-запрос
+не меньше SLOW_QUERY_REPEAT раз, отмечаются как N+1.
+"""
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connections
+from django.template import base
+
+logger = logging.getLogger(__name__)
+
+_THIS_FILE = os.path.normcase(__file__)
+_PROJECT_DIR = os.path.normcase(settings.BASE_DIR) + os.sep
+_RENDER_ANNOTATED = base.Node.render_annotated.__code__
+
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDERS = re.compile(r'%s|\?')
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACES = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql):
+    """
+    Текст запроса без значений и его короткий хэш.
+
+    Числа, строки и плейсхолдеры заменяются на ?, списки IN (?, ?, ?)
+    сворачиваются, поэтому запросы N+1 с разными id совпадают.
+    """
+    text = _STRINGS.sub('?', sql)
+    text = _NUMBERS.sub('?', text)
+    text = _PLACEHOLDERS.sub('?', text)
+    text = _LISTS.sub('(...)', text)
+    text = _SPACES.sub(' ', text).strip()
+    return hashlib.sha1(text.encode()).hexdigest()[:12], text
+
+
+def origin():
+    """
+    Откуда выполнен запрос: строка шаблона, узел которого
+    рендерился, и ближайшая строка кода проекта.
+    """
+    template = code = None
+    frame = sys._getframe(2)
+    while frame is not None and (template is None or code is None):
+        node = frame.f_locals.get('self')
+        if (template is None and frame.f_code is _RENDER_ANNOTATED
+                and isinstance(node, base.Node) and node.token):
+            name = getattr(node.origin, 'template_name', None)
+            template = f'{name or node.origin.name}:{node.token.lineno}'
+        filename = os.path.normcase(frame.f_code.co_filename)
+        if (code is None and filename.startswith(_PROJECT_DIR)
+                and filename != _THIS_FILE):
+            relative = os.path.relpath(filename, settings.BASE_DIR)
+            code = f'{relative}:{frame.f_lineno}'
+        frame = frame.f_back
+    return template, code
+
+
+class SlowQueries:
+    """Сводка по отпечаткам за время жизни процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.entries = {}
+
+    def add(self, key, text, duration=0.0, repeats=0, **where):
+        with self.lock:
+            entry = self.entries.setdefault(key, {
+                'fingerprint': key,
+                'sql': text,
+                'slow': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'max_repeats': 0,
+                'where': [],
+            })
+            if duration:
+                entry['slow'] += 1
+                entry['total_ms'] += duration * 1000
+                entry['max_ms'] = max(entry['max_ms'], duration * 1000)
+            entry['max_repeats'] = max(entry['max_repeats'], repeats)
+            if where not in entry['where'] and len(entry['where']) < 5:
+                entry['where'].append(where)
+
+    def top(self, limit=20):
+        """Отпечатки по суммарному времени, затем по числу повторов."""
+        with self.lock:
+            entries = [dict(entry) for entry in self.entries.values()]
+        entries.sort(
+            key=lambda entry: (entry['total_ms'], entry['max_repeats']),
+            reverse=True,
+        )
+        return entries[:limit]
+
+
+registry = SlowQueries()
+
+
+class Capture:
+    """
+    Обёртка execute для соединений на время одного HTTP-запроса.
+
+        capture = Capture(request)
+        with capture.watch():
+            response = get_response(request)
+        capture.report_repeats()
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.threshold = settings.SLOW_QUERY_MS / 1000
+        self.counts = {}
+        self.first_seen = {}
+
+    @property
+    def view_name(self):
+        # URL разбирается уже после входа в middleware.
+        match = self.request.resolver_match
+        return match.view_name if match else self.request.path
+
+    @contextmanager
+    def watch(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, time.perf_counter() - start)
+
+    def record(self, sql, duration):
+        key, text = fingerprint(sql)
+        count = self.counts.get(key, 0) + 1
+        self.counts[key] = count
+        slow = duration >= self.threshold
+        if not slow and count > 1:
+            return
+        template, code = origin()
+        where = {'view': self.view_name, 'template': template, 'code': code}
+        if count == 1:
+            self.first_seen[key] = (text, where)
+        if slow:
+            registry.add(key, text, duration=duration, **where)
+            logger.warning(
+                'Медленный запрос %.1f мс [%s] view=%s template=%s '
+                'code=%s: %s',
+                duration * 1000, key, where['view'], template, code, text,
+            )
+
+    def report_repeats(self):
+        """Отмечает отпечатки, повторённые за запрос слишком часто."""
+        for key, count in self.counts.items():
+            if count < settings.SLOW_QUERY_REPEAT:
+                continue
+            text, where = self.first_seen[key]
+            registry.add(key, text, repeats=count, **where)
+            logger.warning(
+                'Запрос повторён %d раз (N+1?) [%s] view=%s template=%s '
+                'code=%s: %s',
+                count, key, where['view'], where['template'],
+                where['code'], text,
+            )
@@ -0,0 +1,68 @@
+"""
+Хранилище статики для collectstatic.
+
+Файлы копируются в STATIC_ROOT с хэшем содержимого в имени
+(js/hydrate.3f2a9c1b7e4d.js), ссылки {% static %} берутся из
+staticfiles.json. Рядом с текстовыми файлами кладутся сжатые копии
+.gz и, если установлен brotli, .br — core/files.py отдаёт их без
+сжатия на лету.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (
+    '.css', '.js', '.map', '.json', '.svg', '.txt', '.html', '.xml', '.ico',
+)
+# Файлы меньше этого размера помещаются в один пакет и без сжатия.
+MIN_SIZE = 256
+
+
+def _packers():
+    yield '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data, quality=11)
+
+
+def compress(path):
+    """
+    Пишет path.gz и path.br, если они хотя бы на 5% меньше исходного
+    файла. Возвращает пути созданных копий.
+    """
+    with open(path, 'rb') as source:
+        data = source.read()
+    if len(data) < MIN_SIZE:
+        return []
+    created = []
+    for suffix, pack in _packers():
+        packed = pack(data)
+        if len(packed) > len(data) * 0.95:
+            continue
+        with open(path + suffix, 'wb') as target:
+            target.write(packed)
+        created.append(path + suffix)
+    return created
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE) and self.exists(name):
+                compress(self.path(name))
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # collectstatic не запускался (разработка, тесты) или файла
+            # нет в STATICFILES_DIRS: ссылка без хэша, как при DEBUG.
+            return name
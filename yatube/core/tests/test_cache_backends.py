@@ -0,0 +1,169 @@
+import time
+
+from django.test import SimpleTestCase
+
+from core.cache.backends import RedisCache, TieredCache
+from core.cache.resp import ConnectionPool, ResponseError
+from core.cache.server import StandInServer
+from core.cache.url import cache_config, cache_is_shared
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class StandInServerMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = StandInServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def make_cache(self, backend=RedisCache, **options):
+        return backend(self.server.location, {'OPTIONS': options})
+
+
+class RedisCacheTest(StandInServerMixin, SimpleTestCase):
+    def setUp(self):
+        self.cache = self.make_cache()
+        self.cache.clear()
+
+    def test_basic_operations(self):
+        """Бэкенд поддерживает операции Django-кэша"""
+        cache = self.cache
+        cache.set('text', {'a': [1, 2]})
+        self.assertEqual(cache.get('text'), {'a': [1, 2]})
+        self.assertIsNone(cache.get('missing'))
+        self.assertFalse(cache.add('text', 'other'))
+        self.assertTrue(cache.add('new', 'value'))
+        cache.set_many({'one': 1, 'two': b'2'})
+        self.assertEqual(
+            cache.get_many(['one', 'two', 'missing']), {'one': 1, 'two': b'2'}
+        )
+        self.assertEqual(cache.incr('one', 5), 6)
+        self.assertEqual(cache.get('one'), 6)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+        cache.delete_many(['one', 'two'])
+        self.assertFalse(cache.has_key('one'))
+        cache.delete('text')
+        self.assertIsNone(cache.get('text'))
+
+    def test_expiry(self):
+        """Ключи истекают по timeout"""
+        self.cache.set('short', 'value', timeout=0.05)
+        self.cache.set('forever', 'value', timeout=None)
+        self.cache.set('expired', 'value', timeout=0)
+        self.assertIsNone(self.cache.get('expired'))
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertEqual(self.cache.get('forever'), 'value')
+
+    def test_connections_are_pooled(self):
+        """Запросы из разных экземпляров идут через общий пул"""
+        connections = self.server.connections
+        for _ in range(20):
+            self.make_cache().get('key')
+        self.assertLessEqual(self.server.connections - connections, 1)
+
+
+class ConnectionPoolTest(StandInServerMixin, SimpleTestCase):
+    def setUp(self):
+        host, port = self.server.location.split(':')
+        self.pool = ConnectionPool(host, int(port))
+        self.addCleanup(self.pool.disconnect)
+
+    def test_server_error_keeps_connection(self):
+        """После ошибки сервера соединение возвращается в пул"""
+        with self.assertRaises(ResponseError):
+            self.pool.execute('NOSUCHCOMMAND')
+        self.assertEqual(self.pool.idle.qsize(), 1)
+        connection = self.pool.idle.queue[0]
+        self.assertEqual(self.pool.execute('PING'), 'PONG')
+        self.assertIs(self.pool.idle.queue[0], connection)
+
+    def test_other_errors_close_connection(self):
+        """При других ошибках соединение закрывается, а не возвращается"""
+        with self.assertRaises(ValueError):
+            with self.pool.connection() as connection:
+                connection.send('PING')
+                raise ValueError
+        self.assertEqual(self.pool.idle.qsize(), 0)
+        self.assertTrue(connection.sock._closed)
+        self.assertEqual(self.pool.execute('PING'), 'PONG')
+
+
+class TieredCacheTest(StandInServerMixin, SimpleTestCase):
+    def setUp(self):
+        self.cache = self.make_cache(TieredCache)
+        self.cache.clear()
+        self.assertTrue(wait_for(self.cache.subscriber.ready.is_set))
+
+    def test_repeated_reads_are_local(self):
+        """Повторное чтение не обращается к общему кэшу"""
+        key = self.cache.make_key('key')
+        self.cache.set('key', 'value')
+        self.assertTrue(wait_for(
+            lambda: self.cache.get('key') == 'value'
+            and self.cache.local.get(key) is not None
+        ))
+        commands = self.server.commands
+        for _ in range(10):
+            self.assertEqual(self.cache.get('key'), 'value')
+            self.assertEqual(self.cache.get_many(['key']), {'key': 'value'})
+        self.assertEqual(self.server.commands, commands)
+
+    def test_writes_invalidate_other_processes(self):
+        """Сообщение из канала вычёркивает локальную копию ключа"""
+        key = self.cache.make_key('version')
+        self.cache.set('version', 1)
+        self.assertTrue(wait_for(
+            lambda: self.cache.get('version') == 1
+            and self.cache.local.get(key) is not None
+        ))
+        # Запись мимо локального уровня, как из другого процесса.
+        RedisCache(self.server.location, {}).set('version', 2)
+        self.assertEqual(self.cache.get('version'), 1)
+        self.cache.pool.execute('PUBLISH', self.cache.channel, key)
+        self.assertTrue(wait_for(lambda: self.cache.get('version') == 2))
+
+    def test_clear_reaches_local_tiers(self):
+        """clear() очищает и локальные уровни"""
+        self.cache.set('key', 'value')
+        self.cache.get('key')
+        self.make_cache(TieredCache).clear()
+        self.assertTrue(wait_for(lambda: self.cache.get('key') is None))
+
+
+class CacheConfigTest(SimpleTestCase):
+    def test_urls(self):
+        """CACHE_URL превращается в настройки CACHES"""
+        self.assertEqual(
+            cache_config('locmem://')['BACKEND'],
+            'django.core.cache.backends.locmem.LocMemCache',
+        )
+        self.assertEqual(
+            cache_config('tiered+redis://cache:6380/2?local_timeout=5'),
+            {
+                'BACKEND': 'core.cache.backends.TieredCache',
+                'LOCATION': 'cache:6380',
+                'OPTIONS': {'DB': 2, 'LOCAL_TIMEOUT': 5.0},
+            },
+        )
+        with self.assertRaises(ValueError):
+            cache_config('ftp://cache')
+
+    def test_shared(self):
+        """Общими считаются только кэши вне процесса"""
+        self.assertFalse(cache_is_shared('locmem://'))
+        self.assertTrue(cache_is_shared('redis://cache:6379/0'))
+        self.assertTrue(cache_is_shared('tiered+redis://cache:6379/0'))
@@ -0,0 +1,171 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from core.files import FileServer, byte_range
+
+TEMP_STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class ByteRangeTest(SimpleTestCase):
+    def test_ranges(self):
+        """Range разбирается по RFC 7233"""
+        cases = {
+            'bytes=0-99': (0, 99),
+            'bytes=10-': (10, 999),
+            'bytes=-100': (900, 999),
+            'bytes=-5000': (0, 999),
+            'bytes=990-5000': (990, 999),
+            'bytes=1000-': False,
+            'bytes=-0': False,
+            'bytes=5-1': None,
+            'bytes=0-1,5-6': None,
+            'items=0-1': None,
+        }
+        for header, expected in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(byte_range(header, 1000), expected)
+
+
+@override_settings(
+    STATIC_ROOT=TEMP_STATIC_ROOT, MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    FILES_MAX_AGE=3600,
+)
+class FileServerTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, stdout=StringIO())
+        cls.hashed = staticfiles_storage.stored_name('js/hydrate.js')
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'))
+        cls.image = bytes(range(256)) * 40
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'posts', 'a.jpg'), 'wb') as f:
+            f.write(cls.image)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def get(self, path, method='GET', **headers):
+        environ = {'PATH_INFO': path, 'REQUEST_METHOD': method}
+        environ.update(
+            (f'HTTP_{name.upper()}', value) for name, value in headers.items()
+        )
+        setup_testing_defaults(environ)
+        result = {}
+
+        def start_response(status, response_headers):
+            result['status'] = int(status.split()[0])
+            result['headers'] = dict(response_headers)
+
+        def django(environ, start_response):
+            start_response('404 Not Found', [])
+            return [b'django']
+
+        body = FileServer(django)(environ, start_response)
+        result['body'] = b''.join(body)
+        if hasattr(body, 'close'):
+            body.close()
+        return result
+
+    def test_collectstatic_hashes_and_compresses(self):
+        """collectstatic пишет имена с хэшем и копии .gz"""
+        self.assertRegex(self.hashed, r'^js/hydrate\.[0-9a-f]{12}\.js$')
+        path = os.path.join(TEMP_STATIC_ROOT, self.hashed)
+        with open(path, 'rb') as original, open(path + '.gz', 'rb') as packed:
+            self.assertEqual(gzip.decompress(packed.read()), original.read())
+        self.assertIn(
+            f'/static/{self.hashed}',
+            Template("{% load static %}{% static 'js/hydrate.js' %}").render(
+                Context()
+            ),
+        )
+
+    def test_hashed_static_is_immutable(self):
+        """Файл с хэшем кэшируется навсегда, без хэша — FILES_MAX_AGE"""
+        response = self.get(f'/static/{self.hashed}')
+        self.assertEqual(response['status'], 200)
+        self.assertEqual(
+            response['headers']['Cache-Control'],
+            'public, max-age=31536000, immutable',
+        )
+        response = self.get('/static/js/hydrate.js')
+        self.assertEqual(
+            response['headers']['Cache-Control'], 'public, max-age=3600'
+        )
+
+    def test_precompressed_variant(self):
+        """Клиенту с gzip отдаётся заранее сжатая копия"""
+        plain = self.get(f'/static/{self.hashed}')
+        packed = self.get(
+            f'/static/{self.hashed}', accept_encoding='br;q=0, gzip'
+        )
+        self.assertEqual(packed['headers']['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            packed['headers']['Content-Type'],
+            plain['headers']['Content-Type'],
+        )
+        self.assertEqual(packed['headers']['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(packed['body']), plain['body'])
+        self.assertNotEqual(
+            packed['headers']['ETag'], plain['headers']['ETag']
+        )
+
+    def test_not_modified(self):
+        """Совпавший ETag даёт 304 без тела"""
+        etag = self.get('/media/posts/a.jpg')['headers']['ETag']
+        response = self.get('/media/posts/a.jpg', if_none_match=etag)
+        self.assertEqual(response['status'], 304)
+        self.assertEqual(response['body'], b'')
+
+    def test_range(self):
+        """Range отдаёт часть файла, If-Range с чужим ETag — весь"""
+        response = self.get('/media/posts/a.jpg', range='bytes=100-199')
+        self.assertEqual(response['status'], 206)
+        self.assertEqual(response['body'], self.image[100:200])
+        self.assertEqual(
+            response['headers']['Content-Range'],
+            f'bytes 100-199/{len(self.image)}',
+        )
+        self.assertEqual(response['headers']['Content-Length'], '100')
+        response = self.get('/media/posts/a.jpg', range='bytes=-10')
+        self.assertEqual(response['body'], self.image[-10:])
+        response = self.get(
+            '/media/posts/a.jpg', range='bytes=0-9', if_range='"other"'
+        )
+        self.assertEqual(response['status'], 200)
+        self.assertEqual(response['body'], self.image)
+        response = self.get('/media/posts/a.jpg', range='bytes=99999-')
+        self.assertEqual(response['status'], 416)
+
+    def test_head(self):
+        """HEAD возвращает заголовки без тела"""
+        response = self.get('/media/posts/a.jpg', method='HEAD')
+        self.assertEqual(response['status'], 200)
+        self.assertEqual(
+            response['headers']['Content-Length'], str(len(self.image))
+        )
+        self.assertEqual(response['body'], b'')
+
+    def test_other_requests_reach_django(self):
+        """Чужие пути, отсутствующие файлы и выход из каталога — в Django"""
+        for path in (
+            '/', '/media/posts/missing.jpg', '/media/posts',
+            '/media/../manage.py', '/static/../../yatube/settings.py',
+        ):
+            with self.subTest(path=path):
+                self.assertEqual(self.get(path)['body'], b'django')
+        response = self.get('/media/posts/a.jpg', method='POST')
+        self.assertEqual(response['body'], b'django')
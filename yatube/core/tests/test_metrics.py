@@ -0,0 +1,98 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import SECONDS, Histogram, registry
+
+
+@override_settings(METRICS_SAMPLE_RATE=1.0)
+class MetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        registry.reset()
+        cache.clear()
+        self.client = Client()
+
+    def test_request_is_recorded_under_view_name(self):
+        """Замер попадает в гистограммы представления"""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        view = registry.snapshot()['posts:index']
+        self.assertEqual(view['request_seconds']['count'], 2)
+        self.assertGreater(view['db_queries']['sum'], 0)
+        self.assertGreater(view['response_bytes']['sum'], 0)
+        # Вторая страница взята из кэша.
+        self.assertGreater(view['cache_hits'], 0)
+        self.assertGreater(view['cache_misses'], 0)
+
+    @override_settings(FEED_RENDERING='streaming')
+    def test_streaming_response_is_recorded_when_sent(self):
+        """Потоковый ответ учитывается, когда отдан целиком"""
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(registry.snapshot(), {})
+        size = len(b''.join(response.streaming_content))
+        view = registry.snapshot()['posts:index']
+        self.assertEqual(view['response_bytes']['sum'], size)
+        self.assertGreater(view['db_queries']['sum'], 0)
+
+    @override_settings(METRICS_SAMPLE_RATE=0.0)
+    def test_disabled_by_default(self):
+        """При нулевой доле замеров нет, а /metrics/ не отдаётся"""
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(registry.snapshot(), {})
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 404)
+
+    def test_prometheus_endpoint(self):
+        """/metrics/ отдаёт гистограммы в формате Prometheus"""
+        self.client.get(reverse('posts:index'))
+        with self.settings(METRICS_TOKEN='secret'):
+            response = self.client.get(
+                reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret'
+            )
+        text = response.content.decode()
+        self.assertIn('# TYPE yatube_request_seconds histogram', text)
+        self.assertIn(
+            'yatube_request_seconds_count{view="posts:index"} 1', text
+        )
+        self.assertIn(
+            'yatube_db_queries_bucket{view="posts:index",le="+Inf"} 1', text
+        )
+
+    @override_settings(SLOW_QUERY_MS=100)
+    def test_endpoints_require_token(self):
+        """Без верного токена служебные адреса не видны даже с 127.0.0.1"""
+        for name in ('metrics', 'slow_queries'):
+            url = reverse(name)
+            with self.subTest(name=name):
+                self.assertEqual(self.client.get(url).status_code, 404)
+                with self.settings(METRICS_TOKEN='secret'):
+                    for header in ('', 'Bearer other', 'secret'):
+                        response = self.client.get(
+                            url, HTTP_AUTHORIZATION=header
+                        )
+                        self.assertEqual(response.status_code, 404)
+                    response = self.client.get(
+                        url, HTTP_AUTHORIZATION='Bearer secret'
+                    )
+                    self.assertEqual(response.status_code, 200)
+
+    def test_report_command(self):
+        """Команда печатает строку на каждое представление"""
+        self.client.get(reverse('posts:index'))
+        out = StringIO()
+        call_command('metrics_report', stdout=out)
+        self.assertIn('posts:index', out.getvalue())
+
+
+class HistogramTest(TestCase):
+    def test_quantile_interpolates_inside_bucket(self):
+        """Квантиль оценивается внутри корзины, как histogram_quantile"""
+        histogram = Histogram(SECONDS)
+        for value in (0.002, 0.004, 0.02, 0.03):
+            histogram.observe(value)
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.005)
+        self.assertAlmostEqual(histogram.quantile(1.0), 0.05)
+        self.assertIsNone(Histogram(SECONDS).quantile(0.5))
@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import tempfile
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+
+from core.middleware import ReplicaMiddleware
+from core.routers import ReplicaRouter, replica_reads
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTest(TransactionTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, request, write=False):
+        """Через какую базу прочитал бы Post запрос request."""
+        def view(request):
+            if write:
+                self.router.db_for_write(Post)
+            response = HttpResponse()
+            response.read_db = self.router.db_for_read(Post)
+            return response
+        return ReplicaMiddleware(view)(request)
+
+    def test_safe_requests_read_from_replica(self):
+        """GET читает с реплики, POST — из основной базы"""
+        self.assertEqual(
+            self.route(self.factory.get('/')).read_db, 'replica1'
+        )
+        self.assertEqual(
+            self.route(self.factory.post('/')).read_db, 'default'
+        )
+
+    def test_writes_go_to_primary(self):
+        """Запись всегда идёт в основную базу"""
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_reads_outside_request_use_primary(self):
+        """Вне запроса (команды, фоновые потоки) реплики не используются"""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_write_pins_client_to_primary(self):
+        """После записи клиент читает из основной базы, пока жива cookie"""
+        response = self.route(self.factory.get('/'), write=True)
+        cookie = response.cookies[settings.REPLICA_STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_STICKY_SECONDS)
+        request = self.factory.get('/')
+        request.COOKIES[settings.REPLICA_STICKY_COOKIE] = cookie.value
+        self.assertEqual(self.route(request).read_db, 'default')
+        request.COOKIES[settings.REPLICA_STICKY_COOKIE] = str(time.time())
+        self.assertEqual(self.route(request).read_db, 'replica1')
+
+    def test_reads_without_writes_set_no_cookie(self):
+        """Запрос без записи не привязывает клиента к основной базе"""
+        response = self.route(self.factory.get('/'))
+        self.assertNotIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+
+    def test_transaction_reads_from_primary(self):
+        """Внутри транзакции чтение видит её же изменения"""
+        def view(request):
+            with transaction.atomic():
+                return HttpResponse(self.router.db_for_read(Post))
+        response = ReplicaMiddleware(view)(self.factory.get('/'))
+        self.assertEqual(response.content, b'default')
+
+    def test_replica_reads_are_recorded(self):
+        """replica_reads() отмечает приложения, прочитанные с реплики"""
+        def view(request):
+            with replica_reads() as outer:
+                self.router.db_for_read(User)
+                with replica_reads() as inner:
+                    self.router.db_for_read(Post)
+            return HttpResponse(
+                f'{sorted(outer.apps)} {inner.apps} {inner.versioned}'
+            )
+        response = ReplicaMiddleware(view)(self.factory.get('/'))
+        self.assertEqual(
+            response.content, b"['auth', 'posts'] {'posts'} True"
+        )
+        with replica_reads() as reads:
+            self.router.db_for_read(Post)
+        self.assertFalse(reads.versioned)
+
+
+class SyncReplicasTest(TransactionTestCase):
+    def test_copies_primary_into_replicas(self):
+        """sync_replicas копирует основную базу в файлы реплик"""
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Текст')
+        with tempfile.TemporaryDirectory() as directory:
+            name = os.path.join(directory, 'replica.sqlite3')
+            databases = {**settings.DATABASES, 'replica1': {'NAME': name}}
+            with override_settings(
+                DATABASES=databases, DATABASE_REPLICAS=['replica1']
+            ):
+                call_command('sync_replicas', stdout=StringIO())
+            replica = sqlite3.connect(name)
+            try:
+                count, = replica.execute(
+                    'SELECT count(*) FROM posts_post'
+                ).fetchone()
+            finally:
+                replica.close()
+        self.assertEqual(count, 1)
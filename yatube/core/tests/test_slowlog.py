@@ -0,0 +1,82 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.middleware import SlowQueryMiddleware
+from core.slowlog import fingerprint, registry
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class FingerprintTest(TestCase):
+    def test_values_are_removed(self):
+        """Отпечаток не зависит от значений и длины списка IN"""
+        first = fingerprint(
+            'SELECT * FROM "posts_post" WHERE "id" IN (%s, %s) LIMIT 10'
+        )
+        second = fingerprint(
+            "SELECT * FROM  \"posts_post\" WHERE \"id\" IN (%s) LIMIT 20"
+        )
+        self.assertEqual(first, second)
+        self.assertEqual(
+            first[1], 'SELECT * FROM "posts_post" WHERE "id" IN (...) LIMIT ?'
+        )
+
+
+@override_settings(SLOW_QUERY_MS=0.000001, SLOW_QUERY_REPEAT=3)
+class SlowQueryMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.user, text='text')
+        Comment.objects.create(post=cls.post, author=cls.user, text='text')
+
+    def setUp(self):
+        registry.reset()
+        cache.clear()
+        self.client = Client()
+
+    def places(self, table):
+        return [
+            place for entry in registry.top()
+            if entry['sql'].startswith(f'SELECT "{table}"."id"')
+            for place in entry['where']
+        ]
+
+    def test_query_is_attributed_to_view_and_template(self):
+        """Запись журнала указывает представление, код и строку шаблона"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        with self.assertLogs('core.slowlog', 'WARNING') as logs:
+            self.client.get(url)
+        self.assertTrue(any(
+            'view=posts:post_detail' in line for line in logs.output
+        ))
+        post, = self.places('posts_post')
+        self.assertIsNone(post['template'])
+        self.assertTrue(post['code'].startswith('posts/views.py:'))
+        # Комментарии выбираются лениво, при рендеринге цикла.
+        comments, = self.places('posts_comment')
+        self.assertTrue(comments['template'].startswith(
+            'posts/includes/add_comments.html:'
+        ))
+
+    def test_repeated_queries_are_reported(self):
+        """Одинаковые запросы за одну страницу отмечаются как N+1"""
+        def view(request):
+            for _ in range(4):
+                User.objects.filter(pk=self.user.pk).exists()
+            return HttpResponse()
+
+        with self.assertLogs('core.slowlog', 'WARNING') as logs:
+            SlowQueryMiddleware(view)(RequestFactory().get('/n-plus-one/'))
+        self.assertTrue(any('повторён 4 раз' in line for line in logs.output))
+        out = StringIO()
+        call_command('slow_queries', stdout=out)
+        self.assertIn('повторов за страницу: 4', out.getvalue())
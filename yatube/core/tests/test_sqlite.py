@@ -0,0 +1,39 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+
+class SqliteProfileTest(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied(self):
+        """Новое соединение получает pragma из профиля"""
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('cache_size'), -64 * 1024)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('temp_store'), 2)
+
+    def test_transactions_take_write_lock(self):
+        """Транзакции начинаются с BEGIN IMMEDIATE"""
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+
+class SqliteBenchTest(SimpleTestCase):
+    @override_settings(SQLITE_PROFILES={
+        'plain': {},
+        'tuned': {'pragmas': {'journal_mode': 'wal'},
+                  'transaction_mode': 'IMMEDIATE'},
+    })
+    def test_bench_compares_profiles(self):
+        """Бенчмарк прогоняет все профили и сравнивает их с plain"""
+        out = StringIO()
+        call_command(
+            'sqlite_bench', duration=0.2, threads=2, stdout=out
+        )
+        self.assertIn('plain:', out.getvalue())
+        self.assertIn('tuned быстрее plain', out.getvalue())
@@ -1,4 +1,10 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+
+from . import slowlog
+from .metrics import registry
 
 
 def page_not_found(request, exception):
@@ -11,3 +17,31 @@ def csrf_failure(request, reason=''):
 
 def page_error(request):
     return render(request, 'core/500.html')
+
+
+def _token_only(request):
+    """Служебные адреса видны только с токеном METRICS_TOKEN."""
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if not token or not constant_time_compare(header, f'Bearer {token}'):
+        raise Http404
+
+
+def metrics(request):
+    """Метрики запросов в формате Prometheus или JSON (?format=json)."""
+    _token_only(request)
+    if settings.METRICS_SAMPLE_RATE <= 0:
+        raise Http404
+    if request.GET.get('format') == 'json':
+        return JsonResponse(registry.snapshot())
+    return HttpResponse(
+        registry.prometheus(), content_type='text/plain; version=0.0.4'
+    )
+
+
+def slow_queries(request):
+    """Сводка журнала медленных запросов по отпечаткам."""
+    _token_only(request)
+    if settings.SLOW_QUERY_MS <= 0:
+        raise Http404
+    return JsonResponse({'queries': slowlog.registry.top()})
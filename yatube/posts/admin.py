@@ -1,4 +1,5 @@
 from django.contrib import admin
+from . import search
 from .models import Post, Group, Comment, Follow
 
 
@@ -16,6 +17,15 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по полнотекстовому индексу вместо LIKE '%...%'.
+        matching = search.matching_ids(search_term)
+        if matching is None:
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(id__in=matching), False
+
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
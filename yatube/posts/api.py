@@ -0,0 +1,279 @@
+"""
+JSON API только для чтения: ленты и страница поста.
+
+Ответы помечаются сильным ETag из версий областей кэша (они
+меняются при любой правке постов, групп и комментариев) и времени
+последней публикации или комментария, а Last-Modified — этим
+временем. Повторный запрос с совпавшим If-None-Match или
+If-Modified-Since получает 304 без выборки постов и сериализации.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Max
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.middleware.csrf import get_token
+from django.urls import reverse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import condition, require_safe
+from django.views.decorators.vary import vary_on_cookie
+
+from core import routers
+from core.http import drop_validators
+
+from . import caching
+from .counters import user_stats
+from .feed import follow_feed, page_posts
+from .models import Follow, Group, Post, User
+from .utils import KeysetPaginator, paginate_comments
+
+FIELDS = {
+    'id': lambda post: post.id,
+    'text': lambda post: post.text,
+    'pub_date': lambda post: post.pub_date.isoformat(),
+    'author': lambda post: post.author.username,
+    'group': lambda post: post.group.slug if post.group else None,
+    'image': lambda post: post.image.url if post.image else None,
+    'image_width': lambda post: post.image_width if post.image else None,
+    'image_height': lambda post: post.image_height if post.image else None,
+    'thumbnail': lambda post: post.thumbnail or None,
+    'url': lambda post: reverse(
+        'posts:post_detail', kwargs={'post_id': post.id}
+    ),
+}
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def requested_fields(request):
+    """Поля из ?fields=id,text; без параметра отдаются все."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(FIELDS)
+    names = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = sorted(set(names) - set(FIELDS))
+    if unknown:
+        raise FieldsError(f'Неизвестные поля: {", ".join(unknown)}')
+    return names
+
+
+def serialize(post, fields):
+    return {name: FIELDS[name](post) for name in fields}
+
+
+def newest(queryset):
+    return queryset.aggregate(newest=Max('pub_date'))['newest']
+
+
+def conditional(get_scopes, get_last_modified):
+    """
+    Обёртка над condition(): ETag и Last-Modified считаются один раз
+    на запрос из версий областей и времени последнего изменения.
+    Ответ, прочитанный с реплики, уходит без них: реплика может
+    отставать от версий.
+    """
+    def validators(request, *args, **kwargs):
+        if not hasattr(request, '_api_validators'):
+            last_modified = get_last_modified(request, *args, **kwargs)
+            versions = caching.get_versions(
+                get_scopes(request, *args, **kwargs)
+            )
+            raw = '|'.join([
+                request.get_full_path(),
+                last_modified.isoformat() if last_modified else '',
+                *map(str, versions),
+            ])
+            request._api_validators = (
+                hashlib.md5(raw.encode()).hexdigest(), last_modified
+            )
+        return request._api_validators
+
+    def decorator(view_func):
+        conditional_view = condition(
+            etag_func=lambda *args, **kwargs: validators(*args, **kwargs)[0],
+            last_modified_func=(
+                lambda *args, **kwargs: validators(*args, **kwargs)[1]
+            ),
+        )(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            with routers.replica_reads() as reads:
+                response = conditional_view(request, *args, **kwargs)
+            if reads.versioned:
+                drop_validators(response)
+            return response
+        return wrapper
+    return decorator
+
+
+def login_required_json(view_func):
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse(
+                {'error': 'Требуется авторизация'}, status=401
+            )
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def feed_response(request, posts, key='id', **extra):
+    try:
+        fields = requested_fields(request)
+    except FieldsError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    paginator = KeysetPaginator(posts, settings.PAGE_CONST, key)
+    page = page_posts(paginator.get_page(request.GET.get('cursor')))
+    return JsonResponse({
+        **extra,
+        'results': [serialize(post, fields) for post in page],
+        'next_cursor': page.next_cursor(),
+        'previous_cursor': page.previous_cursor(),
+    })
+
+
+@require_safe
+@conditional(
+    caching.index_scopes,
+    lambda request: newest(Post.objects.all()),
+)
+def index(request):
+    """Все посты, как на главной."""
+    return feed_response(
+        request, Post.objects.select_related('author', 'group')
+    )
+
+
+@require_safe
+@conditional(
+    caching.group_scopes,
+    lambda request, slug: newest(Post.objects.filter(group__slug=slug)),
+)
+def group_posts(request, slug):
+    """Посты группы."""
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(
+        request,
+        group.group_posts.select_related('author', 'group'),
+        group={
+            'title': group.title,
+            'slug': group.slug,
+            'description': group.description,
+        },
+    )
+
+
+@require_safe
+@conditional(
+    caching.profile_scopes,
+    lambda request, username: newest(
+        Post.objects.filter(author__username=username)
+    ),
+)
+def profile(request, username):
+    """Посты автора."""
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    stats = user_stats(author)
+    return feed_response(
+        request,
+        author.author_posts.select_related('author', 'group'),
+        author={
+            'username': author.username,
+            'full_name': author.get_full_name(),
+            'posts_count': stats.posts_count,
+            'followers_count': stats.followers_count,
+        },
+    )
+
+
+def post_last_modified(request, post_id):
+    dates = Post.objects.filter(id=post_id).aggregate(
+        published=Max('pub_date'), commented=Max('comments__created')
+    )
+    dates = [date for date in dates.values() if date is not None]
+    return max(dates) if dates else None
+
+
+@require_safe
+@conditional(
+    lambda request, post_id: [f'post:{post_id}', 'groups'],
+    post_last_modified,
+)
+def post_detail(request, post_id):
+    """Пост со страницей комментариев."""
+    try:
+        fields = requested_fields(request)
+    except FieldsError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), id=post_id
+    )
+    comments = paginate_comments(
+        request,
+        post.comments.select_related('author').order_by('created'),
+        count=post.comments_count,
+    )
+    return JsonResponse({
+        'post': serialize(post, fields),
+        'comments': [
+            {
+                'id': comment.id,
+                'author': comment.author.username,
+                'text': comment.text,
+                'created': comment.created.isoformat(),
+            }
+            for comment in comments
+        ],
+        'comments_count': post.comments_count,
+        'comments_page': comments.number,
+        'comments_pages': comments.paginator.num_pages,
+    })
+
+
+@require_safe
+@vary_on_cookie
+@login_required_json
+@conditional(
+    caching.follow_scopes,
+    lambda request: newest(follow_feed(request.user)[0]),
+)
+def follow_index(request):
+    """Лента подписок текущего пользователя."""
+    feed, key = follow_feed(request.user)
+    return feed_response(request, feed, key)
+
+
+@require_safe
+@never_cache
+def viewer(request):
+    """
+    Части страницы, зависящие от пользователя, для страниц,
+    собранных без него: имя, CSRF-токен и подписки на авторов
+    из ?follow=a,b.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({
+            'authenticated': False,
+            'username': None,
+            'csrf_token': None,
+            'following': [],
+        })
+    usernames = [
+        name for name in request.GET.get('follow', '').split(',') if name
+    ][:settings.PAGE_CONST]
+    following = Follow.objects.filter(
+        user=request.user, author__username__in=usernames
+    ).values_list('author__username', flat=True) if usernames else []
+    return JsonResponse({
+        'authenticated': True,
+        'username': request.user.username,
+        'csrf_token': get_token(request),
+        'following': list(following),
+    })
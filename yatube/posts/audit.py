@@ -0,0 +1,82 @@
+"""
+Страницы приложений posts, users и about для замеров и аудита.
+
+seed() заполняет базу командой seed_yatube, url_cases() строит URL
+каждой страницы из urlconf. Ими пользуются харнесс бюджета
+(posts/tests/perf.py) и команда check_query_plans.
+"""
+import datetime as dt
+import os
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management import call_command
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlencode, urlsafe_base64_encode
+
+from .models import Group, Post
+
+User = get_user_model()
+
+URLCONFS = ('posts.urls', 'users.urls', 'about.urls')
+SEED_END = dt.date(2022, 6, 1)
+# Ленты собираются за весь год публикаций: на базе харнесса это быстро,
+# а страница подписок должна читать FeedEntry, как на живом сайте.
+FEED_DAYS = 366
+# Страницы, которые без GET-параметров ничего не делают.
+SEARCH_VIEWS = ('posts:search', 'posts:search_api')
+
+
+def seed(posts=None, users=None, seed_value=0):
+    """Заполняет базу и возвращает объекты, нужные для построения URL."""
+    posts = posts or int(os.getenv('PERF_POSTS', 200))
+    users = users or int(os.getenv('PERF_USERS', 20))
+    call_command(
+        'seed_yatube',
+        posts=posts,
+        users=users,
+        groups=max(users // 10, 1),
+        follows=10,
+        feed_days=FEED_DAYS,
+        seed=seed_value,
+        end=SEED_END,
+        verbosity=0,
+    )
+    return sample_objects()
+
+
+def sample_objects():
+    """Самые нагруженные объекты базы: по ним строятся URL страниц."""
+    return {
+        'user': User.objects.order_by('-stats__following_count').first(),
+        'author': User.objects.order_by('-stats__posts_count').first(),
+        'group': Group.objects.first(),
+        'post': Post.objects.order_by('-comments_count').first(),
+    }
+
+
+def url_cases(objects):
+    """Пары (имя представления, URL) для всех страниц приложений."""
+    user = objects['user']
+    query = urlencode({'q': objects['post'].text.split()[0]})
+    values = {
+        'slug': objects['group'].slug,
+        'username': objects['author'].username,
+        'post_id': objects['post'].id,
+        'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': default_token_generator.make_token(user),
+    }
+    for resolver in get_resolver().url_patterns:
+        if not isinstance(resolver, URLResolver):
+            continue
+        module = getattr(resolver.urlconf_name, '__name__', None)
+        if module not in URLCONFS:
+            continue
+        for pattern in resolver.url_patterns:
+            name = f'{resolver.namespace}:{pattern.name}'
+            kwargs = {key: values[key] for key in pattern.pattern.converters}
+            url = reverse(name, kwargs=kwargs)
+            if name in SEARCH_VIEWS:
+                url = f'{url}?{query}'
+            yield name, url
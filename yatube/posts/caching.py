@@ -0,0 +1,193 @@
+import datetime as dt
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from core import routers
+
+from .models import Follow, Group
+
+VERSION_KEY = 'version:{}'
+MODIFIED_KEY = 'modified:{}'
+PAGE_KEY = 'page:{view}:{user}:{url}:{versions}'
+
+
+def _initial_version():
+    # Время в миллисекундах: если ключ версии вытеснят из кэша или
+    # истечёт VERSION_TIMEOUT, новая версия всё равно окажется
+    # больше старой.
+    return int(time.time() * 1000)
+
+
+def get_versions(scopes):
+    """Текущие версии областей данных, недостающие заводятся заново."""
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: _initial_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, settings.VERSION_TIMEOUT)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump(*scopes):
+    """Делает устаревшими все страницы, зависящие от областей."""
+    scopes = set(scopes)
+    for scope in scopes:
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), settings.VERSION_TIMEOUT)
+    now = time.time()
+    cache.set_many(
+        {MODIFIED_KEY.format(scope): now for scope in scopes},
+        settings.VERSION_TIMEOUT,
+    )
+
+
+def validators(scopes, *extra):
+    """
+    Ключ для ETag и время для Last-Modified страницы без запросов
+    к базе: версии областей и время их последнего изменения.
+
+    Время изменения записывает bump(), то есть сигналы публикации,
+    правки и удаления постов, комментариев, групп и подписок. Если
+    время вытеснили из кэша, страница считается изменённой сейчас.
+    """
+    version_keys = [VERSION_KEY.format(scope) for scope in scopes]
+    modified_keys = [MODIFIED_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(version_keys + modified_keys)
+    now = time.time()
+    missing = {key: _initial_version() for key in version_keys}
+    missing.update({key: now for key in modified_keys})
+    missing = {
+        key: value for key, value in missing.items() if key not in found
+    }
+    if missing:
+        cache.set_many(missing, settings.VERSION_TIMEOUT)
+        found.update(missing)
+    parts = [str(found[key]) for key in version_keys] + list(map(str, extra))
+    last_modified = dt.datetime.fromtimestamp(
+        int(max(found[key] for key in modified_keys)), tz=dt.timezone.utc
+    )
+    return '|'.join(parts), last_modified
+
+
+def invalidate_post(post, old_group_id=None):
+    """Сбрасывает все страницы, на которых виден пост."""
+    slugs = Group.objects.filter(
+        pk__in={post.group_id, old_group_id} - {None}
+    ).values_list('slug', flat=True)
+    scopes = ['posts', f'post:{post.pk}']
+    scopes += [f'group:{slug}' for slug in slugs]
+    if post.author_id is not None:
+        scopes += [
+            f'author:{post.author_id}',
+            f'profile:{post.author.username}',
+        ]
+    bump(*scopes)
+
+
+def index_scopes(request):
+    return ['posts', 'groups']
+
+
+def group_index_scopes(request):
+    # Счётчики групп меняются с каждым постом.
+    return ['posts', 'groups']
+
+
+def group_scopes(request, slug):
+    return [f'group:{slug}', 'groups']
+
+
+def profile_scopes(request, username):
+    return [f'profile:{username}', 'groups']
+
+
+def post_scopes(request, post_id):
+    # Число постов автора на странице меняется с любым его постом.
+    return ['posts', f'post:{post_id}', 'groups']
+
+
+def follow_scopes(request):
+    authors = Follow.objects.filter(
+        user=request.user
+    ).values_list('author_id', flat=True)
+    return (
+        [f'follow:{request.user.pk}', 'groups']
+        + [f'author:{author_id}' for author_id in authors]
+    )
+
+
+def page_key(request, scopes, shared=False):
+    url = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return PAGE_KEY.format(
+        view=request.resolver_match.view_name,
+        user=0 if shared else request.user.pk or 0,
+        url=url,
+        versions='.'.join(map(str, get_versions(scopes))),
+    )
+
+
+def cache_when_sent(key, chunks, content_type):
+    """Кэширует потоковую страницу, когда она отдана целиком."""
+    sent = []
+    for chunk in chunks:
+        sent.append(chunk)
+        yield chunk
+    cache.set(
+        key, (b''.join(sent), content_type), settings.PAGE_CACHE_TIMEOUT
+    )
+
+
+def versioned_cache_page(get_scopes, public=False):
+    """
+    Кэширует страницу до изменения данных, от которых она зависит.
+
+    Ключ страницы содержит версии областей данных, возвращаемых
+    get_scopes; сигналы моделей увеличивают версии, и старые
+    записи кэша перестают находиться.
+
+    public=True — страница без личных данных: при PERSONALIZATION =
+    'client' одна копия в кэше служит всем пользователям.
+
+    Страница, прочитавшая посты с реплики, в кэш не кладётся:
+    отставшая реплика положила бы под новые версии старое содержимое.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            key = page_key(
+                request,
+                get_scopes(request, *args, **kwargs),
+                shared=public and settings.PERSONALIZATION == 'client',
+            )
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+            with routers.replica_reads() as reads:
+                response = view_func(request, *args, **kwargs)
+            if response.status_code != 200 or reads.versioned:
+                return response
+            if response.streaming:
+                response.streaming_content = cache_when_sent(
+                    key, response.streaming_content, response['Content-Type']
+                )
+            else:
+                cache.set(
+                    key,
+                    (response.content, response['Content-Type']),
+                    settings.PAGE_CACHE_TIMEOUT,
+                )
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+
+@register()
+def batched_comments_need_shared_cache(app_configs, **kwargs):
+    """
+    Ожидающие комментарии лежат в кэше, а следующий запрос автора
+    может обслужить другой процесс сервера.
+    """
+    if settings.COMMENT_INGESTION != 'batched' or settings.CACHE_SHARED:
+        return []
+    return [Error(
+        "COMMENT_INGESTION = 'batched' требует общего кэша.",
+        hint='Задайте CACHE_URL=redis://... или memcached://... '
+             'либо COMMENT_INGESTION=sync.',
+        id='posts.E001',
+    )]
@@ -0,0 +1,131 @@
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def shift(queryset, field, delta):
+    """Атомарно меняет счётчик в базе, не читая его."""
+    queryset.update(**{field: F(field) + delta})
+
+
+def _count_of(model, field):
+    """Подзапрос «сколько строк model ссылается на текущую через field»."""
+    rows = (
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(rows), 0)
+
+
+def recount(apps=global_apps):
+    """Пересчитывает все денормализованные счётчики с нуля."""
+    recount_users(apps)
+    recount_groups(apps)
+
+
+def recount_users(apps=global_apps):
+    """Счётчики пользователей и комментариев к постам."""
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk) for pk in User.objects.filter(
+            stats__isnull=True
+        ).values_list('pk', flat=True).iterator()),
+        batch_size=500,
+    )
+    UserStats.objects.update(
+        posts_count=_count_of(Post, 'author'),
+        followers_count=_count_of(Follow, 'author'),
+        following_count=_count_of(Follow, 'user'),
+    )
+    Post.objects.update(comments_count=_count_of(Comment, 'post'))
+
+
+def recount_groups(apps=global_apps):
+    """Счётчики групп и число постов каждого автора в группе."""
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    GroupAuthorStats = apps.get_model('posts', 'GroupAuthorStats')
+    GroupStats.objects.bulk_create(
+        (GroupStats(group_id=pk) for pk in Group.objects.filter(
+            stats__isnull=True
+        ).values_list('pk', flat=True).iterator()),
+        batch_size=500,
+    )
+    latest = Post.objects.filter(
+        group=OuterRef('pk')
+    ).order_by('-pub_date').values('pub_date')[:1]
+    GroupStats.objects.update(
+        posts_count=_count_of(Post, 'group'),
+        last_post_date=Subquery(latest),
+    )
+    GroupAuthorStats.objects.all().delete()
+    GroupAuthorStats.objects.bulk_create(
+        (GroupAuthorStats(
+            group_id=row['group'], author_id=row['author'],
+            posts_count=row['total'],
+        ) for row in Post.objects.filter(
+            group__isnull=False, author__isnull=False
+        ).order_by().values('group', 'author').annotate(
+            total=Count('pk')
+        ).iterator()),
+        batch_size=500,
+    )
+
+
+def user_stats(user):
+    """
+    Счётчики пользователя. Пользователь, созданный без сигналов
+    (bulk_create, loaddata), строки не имеет: она заводится с
+    подсчётом его постов и подписок.
+    """
+    try:
+        return user.stats
+    except ObjectDoesNotExist:
+        pass
+    Post = global_apps.get_model('posts', 'Post')
+    Follow = global_apps.get_model('posts', 'Follow')
+    UserStats = global_apps.get_model('posts', 'UserStats')
+    stats, _ = UserStats.objects.get_or_create(user=user, defaults={
+        'posts_count': Post.objects.filter(author=user).count(),
+        'followers_count': Follow.objects.filter(author=user).count(),
+        'following_count': Follow.objects.filter(user=user).count(),
+    })
+    user.stats = stats
+    return stats
+
+
+def group_stats(group):
+    """Счётчики группы, недостающая строка заводится как в user_stats."""
+    try:
+        return group.stats
+    except ObjectDoesNotExist:
+        pass
+    Post = global_apps.get_model('posts', 'Post')
+    GroupStats = global_apps.get_model('posts', 'GroupStats')
+    GroupAuthorStats = global_apps.get_model('posts', 'GroupAuthorStats')
+    posts = Post.objects.filter(group=group)
+    stats, created = GroupStats.objects.get_or_create(
+        group=group,
+        defaults=posts.aggregate(
+            posts_count=Count('pk'), last_post_date=Max('pub_date')
+        ),
+    )
+    if created:
+        GroupAuthorStats.objects.bulk_create(
+            (GroupAuthorStats(
+                group=group, author_id=row['author'],
+                posts_count=row['total'],
+            ) for row in posts.filter(author__isnull=False).order_by()
+                .values('author').annotate(total=Count('pk'))),
+            ignore_conflicts=True,
+        )
+    group.stats = stats
+    return stats
@@ -0,0 +1,158 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from .models import FeedEntry, Follow, Post, UserStats
+
+BATCH_SIZE = 500
+
+
+def _bulk_insert(entries):
+    FeedEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def is_celebrity(author_id):
+    """Автор со слишком большим числом подписчиков читается на лету."""
+    return UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.FEED_FANOUT_LIMIT,
+    ).exists()
+
+
+def celebrity_ids(user):
+    """Авторы из подписок пользователя, посты которых не разносятся."""
+    followed = Follow.objects.filter(user=user).values('author_id')
+    return list(
+        UserStats.objects.filter(
+            user_id__in=followed,
+            followers_count__gt=settings.FEED_FANOUT_LIMIT,
+        ).values_list('user_id', flat=True)
+    )
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if post.author_id is None or is_celebrity(post.author_id):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _bulk_insert([
+        FeedEntry(follower_id=follower_id, post=post, pub_date=post.pub_date)
+        for follower_id in follower_ids.iterator()
+    ])
+
+
+def backfill(follow):
+    """Добавляет посты автора в ленту нового подписчика."""
+    if is_celebrity(follow.author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=follow.author_id
+    ).values_list('id', 'pub_date')
+    _bulk_insert([
+        FeedEntry(follower_id=follow.user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts.iterator()
+    ])
+
+
+def fan_out_author(author_id):
+    """
+    Разносит все посты автора по лентам всех его подписчиков.
+
+    Пока у автора больше FEED_FANOUT_LIMIT подписчиков, его новые
+    посты не разносятся, а новым подписчикам не делается backfill.
+    Когда подписчиков снова становится не больше предела, лента
+    перестаёт подмешивать его посты при чтении, и недостающие записи
+    нужно добавить, иначе эти посты пропадут из лент.
+    """
+    ops = connection.ops
+    sql = (
+        '{insert} {entry} (follower_id, post_id, pub_date) '
+        'SELECT follow.user_id, post.id, post.pub_date '
+        'FROM {follow} follow '
+        'JOIN {post} post ON post.author_id = follow.author_id '
+        'WHERE follow.author_id = %s {suffix}'
+    ).format(
+        insert=ops.insert_statement(ignore_conflicts=True),
+        entry=FeedEntry._meta.db_table,
+        follow=Follow._meta.db_table,
+        post=Post._meta.db_table,
+        suffix=ops.ignore_conflicts_suffix_sql(ignore_conflicts=True),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [author_id])
+
+
+def retract(follow):
+    """Убирает посты автора из ленты отписавшегося читателя."""
+    FeedEntry.objects.filter(
+        follower_id=follow.user_id,
+        post__author_id=follow.author_id,
+    ).delete()
+
+
+def follow_feed(user):
+    """
+    Лента подписок пользователя и поле для курсора пагинации.
+
+    Без знаменитостей в подписках это записи FeedEntry читателя:
+    страница читается одним проходом по индексу (follower, -pub_date,
+    -post), посты подтягиваются JOIN, а на странице их заменяет
+    page_posts(). Посты знаменитостей в FeedEntry не разносятся,
+    поэтому с ними лента — запрос к Post.
+    """
+    celebrities = celebrity_ids(user)
+    if not celebrities:
+        entries = FeedEntry.objects.filter(follower=user).select_related(
+            'post__author', 'post__group'
+        ).order_by('-pub_date', '-post_id')
+        return entries, 'post_id'
+    entries = FeedEntry.objects.filter(follower=user).values('post_id')
+    posts = Post.objects.select_related('author', 'group').filter(
+        Q(id__in=entries) | Q(author_id__in=celebrities)
+    )
+    return posts, 'id'
+
+
+def page_posts(page):
+    """Заменяет записи FeedEntry на странице ленты их постами."""
+    page.object_list = [
+        item.post if isinstance(item, FeedEntry) else item
+        for item in page.object_list
+    ]
+    return page
+
+
+def rebuild(since=None):
+    """
+    Собирает ленты заново, например после bulk_create подписок.
+
+    since — самая ранняя дата поста в лентах. Записей в FeedEntry
+    столько же, сколько пар (подписка, пост автора), поэтому на
+    большой базе лента за всё время занимает гигабайты; более старые
+    посты в ленты не попадут.
+    """
+    FeedEntry.objects.all().delete()
+    # Один INSERT ... SELECT вместо построчного backfill по подпискам.
+    sql = (
+        'INSERT INTO {entry} (follower_id, post_id, pub_date) '
+        'SELECT follow.user_id, post.id, post.pub_date '
+        'FROM {follow} follow '
+        'JOIN {post} post ON post.author_id = follow.author_id '
+        'JOIN {stats} stats ON stats.user_id = follow.author_id '
+        'WHERE stats.followers_count <= %s{recent}'
+    ).format(
+        entry=FeedEntry._meta.db_table,
+        follow=Follow._meta.db_table,
+        post=Post._meta.db_table,
+        stats=UserStats._meta.db_table,
+        recent=' AND post.pub_date >= %s' if since else '',
+    )
+    params = [settings.FEED_FANOUT_LIMIT]
+    if since:
+        params.append(connection.ops.adapt_datetimefield_value(since))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
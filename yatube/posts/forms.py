@@ -1,4 +1,9 @@
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
+
+from . import images
 from .models import Post, Comment
 
 
@@ -7,6 +12,26 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        self.image_size = (None, None)
+        if not isinstance(image, UploadedFile):
+            return image
+        if image.size > settings.POST_IMAGE_MAX_BYTES:
+            raise forms.ValidationError(
+                'Картинка не должна быть больше '
+                f'{filesizeformat(settings.POST_IMAGE_MAX_BYTES)}'
+            )
+        image, *self.image_size = images.normalize_upload(image)
+        return image
+
+    def save(self, commit=True):
+        if 'image' in self.changed_data:
+            self.instance.image_width, self.instance.image_height = (
+                self.image_size
+            )
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
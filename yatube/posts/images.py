@@ -0,0 +1,61 @@
+import io
+import os
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps, features
+
+# Сборка Pillow может не уметь WebP, тогда остаётся только JPEG.
+WEBP_SUPPORTED = features.check('webp')
+
+ENCODERS = {
+    'jpg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+}
+
+
+def output_formats():
+    """Расширения, в которых сохраняются производные картинки."""
+    return ('webp', 'jpg') if WEBP_SUPPORTED else ('jpg',)
+
+
+def flatten(image):
+    """Переводит картинку в RGB, прозрачность заливает белым."""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def encode(image, extension):
+    """Кодирует картинку без метаданных: EXIF в save() не передаётся."""
+    image_format, options = ENCODERS[extension]
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def normalize_upload(upload):
+    """
+    Ограничивает размер загруженной картинки и перекодирует её в JPEG
+    без метаданных. GIF в пределах POST_IMAGE_MAX_SIZE оставляется как
+    есть, чтобы не потерять анимацию; от большего GIF остаётся первый
+    кадр, уменьшенный как обычная картинка. Возвращает файл, ширину и
+    высоту.
+    """
+    max_width, max_height = settings.POST_IMAGE_MAX_SIZE
+    with Image.open(upload) as image:
+        if (
+            image.format == 'GIF'
+            and image.width <= max_width and image.height <= max_height
+        ):
+            upload.seek(0)
+            return upload, image.width, image.height
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(settings.POST_IMAGE_MAX_SIZE, Image.LANCZOS)
+        image = flatten(image)
+    name = os.path.splitext(os.path.basename(upload.name))[0] + '.jpg'
+    content = SimpleUploadedFile(name, encode(image, 'jpg'), 'image/jpeg')
+    return content, image.width, image.height
@@ -0,0 +1,188 @@
+"""
+Отложенная пакетная запись комментариев.
+
+При COMMENT_INGESTION = 'batched' представление только проверяет
+форму и кладёт комментарий в очередь процесса. Фоновый поток раз в
+COMMENT_BATCH_INTERVAL секунд записывает накопившиеся комментарии
+одним bulk_create в одной транзакции, поэтому во время наплыва
+комментариев база получает одну запись на пакет, а не на каждый
+комментарий.
+
+Пока комментарий в очереди, он лежит в кэше как «ожидающий» и
+показывается автору на странице поста. Следующий запрос автора может
+попасть в другой процесс сервера, поэтому режим требует общего кэша
+(CACHE_SHARED, проверка posts.E001). Каждый ожидающий комментарий —
+отдельный ключ с номером из cache.incr: параллельные запросы автора
+не перезаписывают комментарии друг друга. Очередь живёт в памяти:
+при штатной остановке процесса она дописывается, при аварийной
+последние миллисекунды комментариев теряются.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from . import caching, search
+from .counters import shift
+from .models import Comment, Post
+
+logger = logging.getLogger(__name__)
+
+# Счётчик номеров ожидающих комментариев автора к посту; сами
+# комментарии лежат в ключах '<счётчик>:<номер>'.
+PENDING_KEY = 'comments:pending:{post_id}:{user_id}'
+# Ожидающий комментарий заведомо успевает записаться за это время.
+PENDING_TIMEOUT = 60
+
+_queue = queue.Queue()
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def _start_flusher():
+    global _flusher
+    with _flusher_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(
+                target=_run, name='comments', daemon=True
+            )
+            _flusher.start()
+
+
+def submit(post_id, author, text):
+    """Ставит комментарий в очередь и показывает его автору."""
+    created = timezone.now()
+    comment = Comment(
+        post_id=post_id, author_id=author.pk, text=text, created=created
+    )
+    key = PENDING_KEY.format(post_id=post_id, user_id=author.pk)
+    comment.pending_key = f'{key}:{_next_slot(key)}'
+    cache.set(
+        comment.pending_key,
+        {'text': text, 'created': created},
+        PENDING_TIMEOUT,
+    )
+    # Счётчик живёт дольше своих комментариев, номера не повторяются.
+    cache.touch(key, PENDING_TIMEOUT)
+    _queue.put(comment)
+    _start_flusher()
+
+
+def _next_slot(key):
+    while True:
+        try:
+            return cache.incr(key)
+        except ValueError:
+            cache.add(key, 0, PENDING_TIMEOUT)
+
+
+def _pending(post_id, user):
+    if not user.is_authenticated:
+        return []
+    key = PENDING_KEY.format(post_id=post_id, user_id=user.pk)
+    slots = [f'{key}:{slot}' for slot in range(1, (cache.get(key) or 0) + 1)]
+    found = cache.get_many(slots)
+    return [found[slot] for slot in slots if slot in found]
+
+
+def pending_count(post_id, user):
+    """Сколько комментариев пользователя к посту ещё в очереди."""
+    return len(_pending(post_id, user))
+
+
+def pending_for(post, user):
+    """Ещё не записанные комментарии пользователя к посту."""
+    return [
+        Comment(post=post, author=user, text=item['text'],
+                created=item['created'])
+        for item in _pending(post.pk, user)
+    ]
+
+
+def _take_batch(first):
+    batch = [first]
+    deadline = time.monotonic() + settings.COMMENT_BATCH_INTERVAL
+    while len(batch) < settings.COMMENT_BATCH_SIZE:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(_queue.get(timeout=timeout))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _run():
+    while True:
+        batch = _take_batch(_queue.get())
+        close_old_connections()
+        try:
+            flush(batch)
+        except Exception:
+            logger.exception('Не удалось записать %s комментариев', len(batch))
+        finally:
+            close_old_connections()
+
+
+def _insert(batch):
+    with transaction.atomic():
+        Comment.objects.bulk_create(batch)
+        per_post = Counter(comment.post_id for comment in batch)
+        for post_id, count in per_post.items():
+            shift(Post.objects.filter(pk=post_id), 'comments_count', count)
+
+
+def _existing(batch):
+    """Отбрасывает комментарии к постам, удалённым за время ожидания."""
+    existing = set(Post.objects.filter(
+        pk__in={comment.post_id for comment in batch}
+    ).values_list('pk', flat=True))
+    return [comment for comment in batch if comment.post_id in existing]
+
+
+def flush(batch):
+    """
+    Записывает пакет и делает то, что для одиночного комментария
+    делают сигналы: счётчики, сброс кэша страниц и поисковый индекс.
+    """
+    written = _existing(batch)
+    try:
+        _insert(written)
+    except IntegrityError:
+        # Пост удалили между проверкой и записью.
+        written = _existing(written)
+        _insert(written)
+    post_ids = {comment.post_id for comment in written}
+    caching.bump(*(f'post:{post_id}' for post_id in post_ids))
+    if written:
+        search.index_recent_comments(
+            post_ids, min(comment.created for comment in written)
+        )
+    _forget_pending(batch)
+
+
+def _forget_pending(batch):
+    cache.delete_many([comment.pending_key for comment in batch])
+
+
+def flush_pending():
+    """Записывает всё, что осталось в очереди, в текущем потоке."""
+    batch = []
+    while True:
+        try:
+            batch.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    if batch:
+        flush(batch)
+
+
+atexit.register(flush_pending)
@@ -0,0 +1,117 @@
+import re
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from posts.audit import sample_objects, seed, url_cases
+from posts.models import Post
+
+FULL_SCAN = re.compile(
+    r'^SCAN (TABLE )?(?P<table>\w+)\b(?! USING| VIRTUAL TABLE)'
+)
+# Сортировка всех отобранных строк; «RIGHT PART OF ORDER BY» —
+# досортировка строк с равным началом ключа — ошибкой не считается.
+TEMP_SORT = re.compile(r'^USE TEMP B-TREE FOR ORDER BY')
+TABLE = re.compile(r'^(?:SCAN|SEARCH) (?:TABLE )?(?P<table>\w+)')
+SEED_POSTS = 200
+# Запросы, которым полный просмотр или сортировка нужны по смыслу:
+# (представление, таблица) и причина.
+ALLOWED = {
+    ('posts:post_create', 'posts_group'): 'выбор группы в форме поста',
+    ('posts:post_edit', 'posts_group'): 'выбор группы в форме поста',
+    ('posts:search', 'posts_search'): 'ранжирование всех совпадений',
+    ('posts:search_api', 'posts_search'): 'ранжирование всех совпадений',
+}
+
+
+def capture(objects):
+    """
+    SELECT-запросы каждой страницы: (имя представления, алиас базы,
+    SQL). Страницы запрашиваются тестовым клиентом без кэша, как их
+    видит пользователь из objects['user'].
+    """
+    for name, url in url_cases(objects):
+        client = Client()
+        client.force_login(objects['user'])
+        with ExitStack() as stack:
+            captures = [
+                stack.enter_context(CaptureQueriesContext(connection))
+                for connection in connections.all()
+            ]
+            client.get(url)
+        for context in captures:
+            for query in context.captured_queries:
+                if query['sql'].startswith('SELECT'):
+                    yield name, context.connection.alias, query['sql']
+
+
+def explain(alias, sql):
+    with connections[alias].cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def problems(name, plan):
+    """Строки плана с полным просмотром таблицы или сортировкой всего."""
+    tables = {
+        match.group('table') for match in map(TABLE.match, plan) if match
+    }
+    if any((name, table) in ALLOWED for table in tables):
+        return []
+    return [
+        line for line in plan
+        if (FULL_SCAN.match(line) and not line.startswith('SCAN CONSTANT'))
+        or TEMP_SORT.match(line)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Запрашивает каждую страницу posts, users и about тестовым '
+        'клиентом, выполняет EXPLAIN QUERY PLAN для всех её '
+        'запросов и завершается с ошибкой, если какой-то из них '
+        'читает таблицу целиком или сортирует все отобранные строки. '
+        'Пустая база на время проверки заполняется seed_yatube; все '
+        'изменения откатываются.'
+    )
+
+    def handle(self, *args, **options):
+        if any(connection.vendor != 'sqlite'
+               for connection in connections.all()):
+            raise CommandError('Команда поддерживает только SQLite.')
+        failures = []
+        dummy = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            CACHES={'default': dummy},
+        ), transaction.atomic():
+            if Post.objects.exists():
+                objects = sample_objects()
+            else:
+                objects = seed(posts=SEED_POSTS)
+            seen = set()
+            for name, alias, sql in capture(objects):
+                if (name, sql) in seen:
+                    continue
+                seen.add((name, sql))
+                plan = explain(alias, sql)
+                bad = problems(name, plan)
+                if options['verbosity'] > 1 or bad:
+                    self.stdout.write(f'{name}: {sql}')
+                    for line in plan:
+                        self.stdout.write(f'    {line}')
+                if bad:
+                    failures.append(name)
+            transaction.set_rollback(True)
+        if failures:
+            raise CommandError(
+                'Полный просмотр или сортировка всей выборки: '
+                + ', '.join(sorted(set(failures)))
+            )
+        self.stdout.write(
+            self.style.SUCCESS('Все запросы используют индексы.')
+        )
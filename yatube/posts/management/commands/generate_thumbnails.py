@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт миниатюры постов с картинкой, у которых их нет: '
+        'загруженных до появления миниатюр или потерянных фоновой очередью.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересоздать миниатюры всех постов с картинкой.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(thumbnail='')
+        done = 0
+        for post_id, image_name in posts.values_list('pk', 'image').iterator():
+            thumbnails.generate(post_id, image_name)
+            done += 1
+        missing = Post.objects.exclude(image='').filter(thumbnail='').count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюры созданы: {done}, без миниатюры осталось: {missing}.'
+        ))
@@ -0,0 +1,280 @@
+import datetime as dt
+import io
+import itertools
+import random
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from posts import feed, search, thumbnails
+from posts.counters import recount
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+SEED_PASSWORD = 'yatube-seed'
+TEXT_POOL_SIZE = 2000
+SEED_IMAGE_SIZE = (960, 640)
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+@contextmanager
+def manual_dates(*fields):
+    """Разрешает задавать значения полям с auto_now_add."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками для нагрузочного тестирования.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument(
+            '--comments', type=int, default=None,
+            help='Всего комментариев, по умолчанию вдвое больше постов.'
+        )
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя.'
+        )
+        parser.add_argument(
+            '--images', type=int, default=0,
+            help='Сколько разных картинок сгенерировать для постов.'
+        )
+        parser.add_argument(
+            '--image-ratio', type=float, default=0.3,
+            help='Доля постов с картинкой, если картинки включены.'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней до --end распределить публикации.'
+        )
+        parser.add_argument(
+            '--end', type=dt.date.fromisoformat, default=None,
+            help='Дата последней публикации, по умолчанию сегодня.'
+        )
+        parser.add_argument(
+            '--feed-days', type=int, default=0,
+            help=(
+                'Собрать ленты подписок из постов за столько дней до '
+                '--end, по умолчанию ленты не собираются. Каждая пара '
+                '(подписчик, пост) — строка FeedEntry, см. README.'
+            )
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        self.rnd = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.batch_size = options['batch_size']
+        end = options['end'] or timezone.now().date()
+        self.end = timezone.make_aware(
+            dt.datetime.combine(end, dt.time.min), dt.timezone.utc
+        )
+        self.span = dt.timedelta(days=options['days']).total_seconds()
+        self.texts = [
+            self.fake.paragraph(nb_sentences=3)
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+        comments = options['comments']
+        if comments is None:
+            comments = options['posts'] * 2
+        with transaction.atomic():
+            user_ids = self.create_users(options['users'])
+            popularity = self.popularity(user_ids)
+            group_ids = self.create_groups(options['groups'])
+            images = self.create_images(options['images'])
+            with manual_dates(
+                Post._meta.get_field('pub_date'),
+                Comment._meta.get_field('created'),
+            ):
+                self.create_posts(
+                    options['posts'], user_ids, popularity, group_ids,
+                    images, options['image_ratio'],
+                )
+                self.create_comments(comments, user_ids)
+            self.create_follows(user_ids, popularity, options['follows'])
+            self.log('Пересчёт счётчиков')
+            recount()
+            if options['feed_days']:
+                self.log(f'Ленты подписок: {options["feed_days"]} дней')
+                feed.rebuild(
+                    since=self.end - dt.timedelta(days=options['feed_days'])
+                )
+            self.log('Сборка поискового индекса')
+            search.rebuild()
+        self.log(self.style.SUCCESS('База заполнена.'))
+
+    def log(self, message):
+        if self.verbosity:
+            self.stdout.write(message)
+
+    def insert(self, model, objects):
+        for chunk in chunks(objects, self.batch_size):
+            model.objects.bulk_create(chunk)
+
+    def create_users(self, count):
+        self.log(f'Пользователи: {count}')
+        password = make_password(SEED_PASSWORD)
+        start = User.objects.count()
+        self.insert(User, (
+            User(
+                username=f'{self.fake.user_name()}_{start + i}',
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                password=password,
+            ) for i in range(count)
+        ))
+        return list(User.objects.values_list('id', flat=True))
+
+    def popularity(self, user_ids):
+        """Накопленные веса авторов по степенному закону."""
+        weights = [self.rnd.paretovariate(1.2) for _ in user_ids]
+        return list(itertools.accumulate(weights))
+
+    def create_groups(self, count):
+        self.log(f'Группы: {count}')
+        start = Group.objects.count()
+        self.insert(Group, (
+            Group(
+                title=self.fake.catch_phrase()[:200],
+                slug=f'group-{start + i}',
+                description=self.rnd.choice(self.texts),
+            ) for i in range(count)
+        ))
+        return list(Group.objects.values_list('id', flat=True))
+
+    def create_images(self, count):
+        """Поля картинки для постов: файл, миниатюра и размеры."""
+        self.log(f'Картинки: {count}')
+        images = []
+        for i in range(count):
+            color = tuple(self.rnd.randrange(256) for _ in range(3))
+            buffer = io.BytesIO()
+            Image.new('RGB', SEED_IMAGE_SIZE, color).save(buffer, 'JPEG')
+            name = default_storage.save(
+                f'posts/seed_{i}.jpg', ContentFile(buffer.getvalue())
+            )
+            buffer.seek(0)
+            width, height = SEED_IMAGE_SIZE
+            images.append({
+                'image': name,
+                'thumbnail': thumbnails.save_card(buffer, name),
+                'image_width': width,
+                'image_height': height,
+            })
+        return images
+
+    def bursts(self, count, user_ids, popularity):
+        """
+        Моменты публикаций сериями: автор пишет несколько постов
+        подряд с интервалом в минуты, между сериями — дни.
+        """
+        produced = 0
+        while produced < count:
+            author_id = self.rnd.choices(user_ids, cum_weights=popularity)[0]
+            moment = self.end - dt.timedelta(
+                seconds=self.rnd.uniform(0, self.span)
+            )
+            size = min(int(self.rnd.expovariate(1 / 4)) + 1, count - produced)
+            for _ in range(size):
+                yield author_id, moment
+                moment += dt.timedelta(seconds=self.rnd.expovariate(1 / 300))
+            produced += size
+
+    def create_posts(self, count, user_ids, popularity, group_ids, images,
+                     image_ratio):
+        self.log(f'Посты: {count}')
+        groups = group_ids + [None] * len(group_ids)
+        self.insert(Post, (
+            Post(
+                text=self.rnd.choice(self.texts),
+                author_id=author_id,
+                group_id=self.rnd.choice(groups) if groups else None,
+                pub_date=pub_date,
+                **image,
+            ) for (author_id, pub_date), image in zip(
+                self.bursts(count, user_ids, popularity),
+                self.post_images(images, image_ratio),
+            )
+        ))
+
+    def post_images(self, images, ratio):
+        while True:
+            if images and self.rnd.random() < ratio:
+                yield self.rnd.choice(images)
+            else:
+                yield {}
+
+    def create_comments(self, count, user_ids):
+        self.log(f'Комментарии: {count}')
+        posts = list(Post.objects.values_list('id', 'pub_date'))
+        if not posts:
+            return
+        # Обсуждают в основном свежие посты.
+        posts.sort(key=lambda post: post[1], reverse=True)
+
+        def comments():
+            for _ in range(count):
+                index = min(
+                    int(self.rnd.expovariate(10 / len(posts))), len(posts) - 1
+                )
+                post_id, pub_date = posts[index]
+                yield Comment(
+                    post_id=post_id,
+                    author_id=self.rnd.choice(user_ids),
+                    text=self.rnd.choice(self.texts)[:200],
+                    created=pub_date + dt.timedelta(
+                        seconds=self.rnd.expovariate(1 / 3600)
+                    ),
+                )
+        self.insert(Comment, comments())
+
+    def create_follows(self, user_ids, popularity, average):
+        self.log(f'Подписки: в среднем {average} на пользователя')
+        existing = set(Follow.objects.values_list('user_id', 'author_id'))
+
+        def follows():
+            for user_id in user_ids:
+                wanted = min(
+                    int(self.rnd.expovariate(1 / average)) if average else 0,
+                    len(user_ids) - 1,
+                )
+                authors = set(self.rnd.choices(
+                    user_ids, cum_weights=popularity, k=wanted
+                ))
+                authors.discard(user_id)
+                for author_id in authors:
+                    if (user_id, author_id) not in existing:
+                        yield Follow(user_id=user_id, author_id=author_id)
+        self.insert(Follow, follows())
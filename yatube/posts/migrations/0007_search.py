@@ -0,0 +1,44 @@
+from django.db import migrations
+
+# Схема индекса posts.search на момент миграции. Код приложения
+# меняется, поэтому SQL скопирован сюда, а не импортирован.
+TABLE = 'posts_search'
+RANK = 'bm25(10.0, 2.0, 5.0)'
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {TABLE} USING fts5("
+        "text, comments, group_title, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        f"INSERT INTO {TABLE}({TABLE}, rank) VALUES ('rank', %s)", [RANK]
+    )
+    schema_editor.execute(
+        f'INSERT INTO {TABLE} (rowid, text, comments, group_title) '
+        'SELECT post.id, post.text, '
+        "COALESCE((SELECT group_concat(comment.text, ' ') "
+        'FROM posts_comment comment WHERE comment.post_id = post.id), \'\'), '
+        "COALESCE(grp.title, '') "
+        'FROM posts_post post '
+        'LEFT JOIN posts_group grp ON grp.id = post.group_id'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_post_image_size'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
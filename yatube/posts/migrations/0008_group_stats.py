@@ -0,0 +1,90 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:41
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+# Копия posts.counters на момент миграции.
+def fill_group_stats(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    GroupAuthorStats = apps.get_model('posts', 'GroupAuthorStats')
+    GroupStats.objects.bulk_create(
+        (GroupStats(group_id=pk) for pk in Group.objects.filter(
+            stats__isnull=True
+        ).values_list('pk', flat=True).iterator()),
+        batch_size=500,
+    )
+    counts = (
+        Post.objects.filter(group=OuterRef('pk'))
+        .order_by().values('group').annotate(total=Count('pk'))
+        .values('total')
+    )
+    latest = Post.objects.filter(
+        group=OuterRef('pk')
+    ).order_by('-pub_date').values('pub_date')[:1]
+    GroupStats.objects.update(
+        posts_count=Coalesce(Subquery(counts), 0),
+        last_post_date=Subquery(latest),
+    )
+    GroupAuthorStats.objects.all().delete()
+    GroupAuthorStats.objects.bulk_create(
+        (GroupAuthorStats(
+            group_id=row['group'], author_id=row['author'],
+            posts_count=row['total'],
+        ) for row in Post.objects.filter(
+            group__isnull=False, author__isnull=False
+        ).order_by().values('group', 'author').annotate(
+            total=Count('pk')
+        ).iterator()),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0007_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group')),
+                ('posts_count', models.IntegerField(default=0, verbose_name='Число постов')),
+                ('last_post_date', models.DateTimeField(blank=True, null=True, verbose_name='Дата последнего поста')),
+            ],
+            options={
+                'verbose_name': 'Счётчики группы',
+                'verbose_name_plural': 'Счётчики групп',
+            },
+        ),
+        migrations.CreateModel(
+            name='GroupAuthorStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.IntegerField(default=0, verbose_name='Число постов')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='group_stats', to=settings.AUTH_USER_MODEL)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='author_stats', to='posts.Group')),
+            ],
+            options={
+                'verbose_name': 'Счётчики автора в группе',
+                'verbose_name_plural': 'Счётчики авторов в группах',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='groupauthorstats',
+            index=models.Index(fields=['group', '-posts_count'], name='group_top_authors_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='groupauthorstats',
+            constraint=models.UniqueConstraint(fields=('group', 'author'), name='unique_group_author'),
+        ),
+        migrations.RunPython(fill_group_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+from django.db import migrations
+
+# Схемы индекса posts.search до и после миграции. Код приложения
+# меняется, поэтому SQL скопирован сюда, а не импортирован.
+TABLE = 'posts_search'
+OPTIONS = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+RANK = 'bm25(10.0, 2.0, 5.0, 0.0)'
+OLD_RANK = 'bm25(10.0, 2.0, 5.0)'
+
+
+def _create(schema_editor, columns, rank):
+    schema_editor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE {TABLE} USING fts5({columns}, {OPTIONS})'
+    )
+    schema_editor.execute(
+        f"INSERT INTO {TABLE}({TABLE}, rank) VALUES ('rank', %s)", [rank]
+    )
+
+
+def split_comments(apps, schema_editor):
+    """Документ на каждый комментарий вместо склейки в документе поста."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    _create(
+        schema_editor,
+        'text, comments, group_title, post_id UNINDEXED',
+        RANK,
+    )
+    schema_editor.execute(
+        f'INSERT INTO {TABLE} (rowid, text, comments, group_title, post_id) '
+        "SELECT post.id, post.text, '', COALESCE(grp.title, ''), post.id "
+        'FROM posts_post post '
+        'LEFT JOIN posts_group grp ON grp.id = post.group_id'
+    )
+    schema_editor.execute(
+        f'INSERT INTO {TABLE} (rowid, text, comments, group_title, post_id) '
+        "SELECT -comment.id, '', comment.text, '', comment.post_id "
+        'FROM posts_comment comment'
+    )
+
+
+def join_comments(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    _create(schema_editor, 'text, comments, group_title', OLD_RANK)
+    schema_editor.execute(
+        f'INSERT INTO {TABLE} (rowid, text, comments, group_title) '
+        'SELECT post.id, post.text, '
+        "COALESCE((SELECT group_concat(comment.text, ' ') "
+        'FROM posts_comment comment WHERE comment.post_id = post.id), \'\'), '
+        "COALESCE(grp.title, '') "
+        'FROM posts_post post '
+        'LEFT JOIN posts_group grp ON grp.id = post.group_id'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_group_title_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_comments, join_comments),
+    ]
@@ -3,12 +3,21 @@ from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# Поля, которые обновляются в обход save(): счётчики и фоновые задачи.
+DERIVED_FIELDS = ('comments_count', 'thumbnail')
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
 
+    class Meta:
+        indexes = (
+            # Каталог групп идёт по названию без сортировки.
+            models.Index(fields=('title',), name='group_title_idx'),
+        )
+
     def __str__(self):
         return (f'Группа: "{self.title}"')
 
@@ -42,15 +51,63 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    thumbnail = models.CharField(
+        'Миниатюра',
+        max_length=255,
+        blank=True,
+        editable=False
+    )
+    comments_count = models.IntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = (
+            # id в конце индексов — для курсоров (pub_date, id)
+            # и сортировки без временного B-дерева.
+            models.Index(
+                fields=('-pub_date', '-id'), name='post_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_pub_date_id_idx'
+            ),
+        )
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        # Производные поля меняются только через update(),
+        # обычное сохранение поста не должно их перезаписывать.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in DERIVED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -68,6 +125,14 @@ class Comment(models.Model):
         auto_now_add=True,
     )
 
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('post', 'created'),
+                name='comment_post_created_idx'
+            ),
+        )
+
     def __str__(self):
         return self.text[:15]
 
@@ -83,3 +148,109 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following'
     )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='unique_follow'
+            ),
+        )
+
+
+class FeedEntry(models.Model):
+    """Запись материализованной ленты подписок одного читателя."""
+    follower = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        indexes = (
+            models.Index(
+                fields=('follower', '-pub_date', '-post'),
+                name='feed_follower_pub_post_idx'
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('follower', 'post'),
+                name='unique_feed_entry'
+            ),
+        )
+
+
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.IntegerField('Число постов', default=0)
+    followers_count = models.IntegerField('Число подписчиков', default=0)
+    following_count = models.IntegerField('Число подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class GroupStats(models.Model):
+    """Денормализованные счётчики группы."""
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.IntegerField('Число постов', default=0)
+    last_post_date = models.DateTimeField(
+        'Дата последнего поста', null=True, blank=True
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики группы'
+        verbose_name_plural = 'Счётчики групп'
+
+
+class GroupAuthorStats(models.Model):
+    """Число постов автора в группе: по нему выбираются топ-авторы."""
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='author_stats'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='group_stats'
+    )
+    posts_count = models.IntegerField('Число постов', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики автора в группе'
+        verbose_name_plural = 'Счётчики авторов в группах'
+        indexes = (
+            models.Index(
+                fields=('group', '-posts_count'),
+                name='group_top_authors_idx'
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('group', 'author'),
+                name='unique_group_author'
+            ),
+        )
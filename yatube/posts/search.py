@@ -0,0 +1,273 @@
+"""
+Полнотекстовый поиск по постам на SQLite FTS5.
+
+В индексе два вида документов: пост (rowid = id поста, текст и
+название группы) и комментарий (rowid = -id комментария, текст
+комментария). Колонка post_id связывает документ с постом, пост
+ранжируется по лучшему из своих документов. Поэтому новый
+комментарий добавляет в индекс одну строку, а не пересобирает
+документ поста со всеми комментариями. Слова запроса ищутся в
+пределах одного документа.
+
+Индекс обновляется сигналами, целиком пересобирается командой
+rebuild_search_index. На других СУБД поиск ничего не находит.
+"""
+import base64
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Comment, Group, Post
+
+TABLE = 'posts_search'
+# Вес совпадения в тексте поста, комментарии и названии группы.
+RANK = 'bm25(10.0, 2.0, 5.0, 0.0)'
+MAX_TERMS = 8
+TOKEN = re.compile(r'\w+')
+MARK_START, MARK_END = '\x02', '\x03'
+
+CREATE_SQL = (
+    f"CREATE VIRTUAL TABLE {TABLE} USING fts5("
+    "text, comments, group_title, post_id UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+CONFIGURE_SQL = f"INSERT INTO {TABLE}({TABLE}, rank) VALUES ('rank', %s)"
+DROP_SQL = f'DROP TABLE IF EXISTS {TABLE}'
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def _index_posts(where='', params=()):
+    """Добавляет в индекс посты, подходящие под условие where."""
+    sql = (
+        'INSERT INTO {table} (rowid, text, comments, group_title, post_id) '
+        "SELECT post.id, post.text, '', COALESCE(grp.title, ''), post.id "
+        'FROM {post} post '
+        'LEFT JOIN {group} grp ON grp.id = post.group_id {where}'
+    ).format(
+        table=TABLE,
+        post=Post._meta.db_table,
+        group=Group._meta.db_table,
+        where=where,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _index_comments(where='', params=()):
+    """
+    Добавляет или заменяет в индексе комментарии, подходящие под
+    условие where.
+    """
+    sql = (
+        'INSERT OR REPLACE INTO {table} '
+        '(rowid, text, comments, group_title, post_id) '
+        "SELECT -comment.id, '', comment.text, '', comment.post_id "
+        'FROM {comment} comment {where}'
+    ).format(
+        table=TABLE, comment=Comment._meta.db_table, where=where,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def _remove(rowids):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {TABLE} WHERE rowid IN ({_placeholders(rowids)})',
+            rowids,
+        )
+
+
+def index_posts(post_ids):
+    """Переиндексирует посты после изменения их самих или группы."""
+    post_ids = list(post_ids)
+    if not post_ids or not available():
+        return
+    _remove(post_ids)
+    _index_posts(f'WHERE post.id IN ({_placeholders(post_ids)})', post_ids)
+
+
+def remove_posts(post_ids):
+    """
+    Убирает документы постов. Комментарии удаляются вместе с постом
+    и убираются из индекса своим сигналом.
+    """
+    post_ids = list(post_ids)
+    if not post_ids or not available():
+        return
+    _remove(post_ids)
+
+
+def index_comments(comment_ids):
+    comment_ids = list(comment_ids)
+    if not comment_ids or not available():
+        return
+    _index_comments(
+        f'WHERE comment.id IN ({_placeholders(comment_ids)})', comment_ids
+    )
+
+
+def index_recent_comments(post_ids, since):
+    """
+    Индексирует комментарии к постам post_ids, созданные не раньше
+    since: bulk_create на SQLite не возвращает id записанных строк.
+    """
+    post_ids = list(post_ids)
+    if not post_ids or not available():
+        return
+    _index_comments(
+        f'WHERE comment.post_id IN ({_placeholders(post_ids)}) '
+        'AND comment.created >= %s',
+        [*post_ids, since],
+    )
+
+
+def remove_comments(comment_ids):
+    comment_ids = list(comment_ids)
+    if not comment_ids or not available():
+        return
+    _remove([-comment_id for comment_id in comment_ids])
+
+
+def rebuild():
+    """Собирает индекс заново одним INSERT ... SELECT."""
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+    _index_posts()
+    _index_comments()
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+
+
+def match_expression(query):
+    """
+    Превращает пользовательский запрос в выражение FTS5: каждое слово
+    берётся в кавычки, последнее ищется по префиксу. Так спецсимволы
+    синтаксиса FTS5 из запроса не могут вызвать ошибку.
+    """
+    words = TOKEN.findall(query.lower())[:MAX_TERMS]
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def matching_ids(query):
+    """Подзапрос с id подходящих постов, например для админки."""
+    expression = match_expression(query)
+    if expression is None or not available():
+        return None
+    return RawSQL(
+        f'SELECT post_id FROM {TABLE} WHERE {TABLE} MATCH %s', [expression]
+    )
+
+
+def encode_cursor(rank, rowid):
+    raw = f'{rank!r}|{rowid}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        rank, rowid = raw.split('|')
+        return float(rank), int(rowid)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+
+def highlight(snippet):
+    """Экранирует фрагмент и выделяет найденные слова тегом <mark>."""
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+class SearchPage:
+    """Страница результатов с курсором на следующую."""
+
+    def __init__(self, object_list, next_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def _snippets(expression, rowids):
+    """Подсвеченные фрагменты найденных документов по их rowid."""
+    sql = (
+        f"SELECT rowid, snippet({TABLE}, -1, %s, %s, '…', 16) "
+        f'FROM {TABLE} WHERE {TABLE} MATCH %s '
+        f'AND rowid IN ({_placeholders(rowids)})'
+    )
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, [MARK_START, MARK_END, expression, *rowids])
+        return dict(db_cursor.fetchall())
+
+
+def search(query, cursor=None, per_page=None):
+    """
+    Посты по релевантности (bm25), у каждого атрибут snippet с
+    подсвеченным фрагментом лучшего документа поста. Страницы
+    выбираются по ключу (rank, post_id), без OFFSET.
+    """
+    per_page = per_page or settings.PAGE_CONST
+    expression = match_expression(query)
+    if expression is None or not available():
+        return SearchPage([])
+    # rowid при единственном MIN() берётся из строки с лучшим рангом.
+    sql = (
+        f'SELECT post_id, MIN(rank) AS best, rowid '
+        f'FROM {TABLE} WHERE {TABLE} MATCH %s GROUP BY post_id'
+    )
+    params = [expression]
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        sql += ' HAVING best > %s OR (best = %s AND post_id > %s)'
+        params += [position[0], position[0], position[1]]
+    sql += ' ORDER BY best, post_id LIMIT %s'
+    params.append(per_page + 1)
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        rows = db_cursor.fetchall()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    if not rows:
+        return SearchPage([])
+    snippets = _snippets(expression, [row[2] for row in rows])
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [row[0] for row in rows]
+    )
+    results = []
+    for post_id, rank, rowid in rows:
+        post = posts.get(post_id)
+        if post is not None:
+            post.snippet = highlight(snippets.get(rowid, ''))
+            results.append(post)
+    return SearchPage(results, next_cursor)
@@ -0,0 +1,222 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Subquery
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import caching, feed, search
+from .counters import shift
+from .models import (
+    Comment, Follow, Group, GroupAuthorStats, GroupStats, Post, User, UserStats
+)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        feed.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, **kwargs):
+    if created:
+        feed.backfill(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def retract_feed(sender, instance, **kwargs):
+    feed.retract(instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_group(sender, instance, **kwargs):
+    instance._old_group_id = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list('group_id', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    caching.invalidate_post(
+        instance, getattr(instance, '_old_group_id', None)
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment(sender, instance, **kwargs):
+    caching.bump(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    caching.bump(
+        'groups', f'group:{instance.slug}', f'group-info:{instance.pk}'
+    )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow(sender, instance, **kwargs):
+    caching.bump(
+        f'follow:{instance.user_id}',
+        f'profile:{instance.author.username}',
+    )
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def count_posts(sender, instance, created=None, **kwargs):
+    if created is False or instance.author_id is None:
+        return
+    shift(
+        UserStats.objects.filter(user_id=instance.author_id),
+        'posts_count', 1 if created else -1
+    )
+
+
+def _add_group_post(group_id, author_id, pub_date):
+    """Учитывает новый пост группы: число, дата последнего, автор."""
+    stats = GroupStats.objects.filter(group_id=group_id)
+    shift(stats, 'posts_count', 1)
+    stats.filter(
+        Q(last_post_date__isnull=True) | Q(last_post_date__lt=pub_date)
+    ).update(last_post_date=pub_date)
+    if author_id is not None:
+        GroupAuthorStats.objects.get_or_create(
+            group_id=group_id, author_id=author_id
+        )
+        shift(GroupAuthorStats.objects.filter(
+            group_id=group_id, author_id=author_id
+        ), 'posts_count', 1)
+
+
+def _remove_group_post(group_id, author_id, pub_date):
+    """
+    Обратное к _add_group_post. Дата последнего поста ищется заново,
+    только если ушёл самый свежий пост группы.
+    """
+    stats = GroupStats.objects.filter(group_id=group_id)
+    shift(stats, 'posts_count', -1)
+    if stats.filter(last_post_date__lte=pub_date).exists():
+        stats.update(last_post_date=Subquery(
+            Post.objects.filter(group_id=group_id)
+            .order_by('-pub_date').values('pub_date')[:1]
+        ))
+    if author_id is not None:
+        shift(GroupAuthorStats.objects.filter(
+            group_id=group_id, author_id=author_id
+        ), 'posts_count', -1)
+
+
+@receiver(post_save, sender=Group)
+def create_group_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        GroupStats.objects.get_or_create(group=instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def count_group_posts(sender, instance, created=None, **kwargs):
+    if created is None:
+        # post_delete
+        removed_from, added_to = instance.group_id, None
+    elif created:
+        removed_from, added_to = None, instance.group_id
+    else:
+        removed_from = getattr(instance, '_old_group_id', None)
+        added_to = instance.group_id
+        if removed_from == added_to:
+            return
+    if removed_from is not None:
+        _remove_group_post(
+            removed_from, instance.author_id, instance.pub_date
+        )
+    if added_to is not None:
+        _add_group_post(added_to, instance.author_id, instance.pub_date)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def count_comments(sender, instance, created=None, **kwargs):
+    if created is False:
+        return
+    shift(
+        Post.objects.filter(pk=instance.post_id),
+        'comments_count', 1 if created else -1
+    )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def count_follows(sender, instance, created=None, **kwargs):
+    if created is False:
+        return
+    delta = 1 if created else -1
+    shift(
+        UserStats.objects.filter(user_id=instance.author_id),
+        'followers_count', delta
+    )
+    shift(
+        UserStats.objects.filter(user_id=instance.user_id),
+        'following_count', delta
+    )
+    if not created and UserStats.objects.filter(
+        user_id=instance.author_id,
+        followers_count=settings.FEED_FANOUT_LIMIT,
+    ).exists():
+        # Автор перестал быть знаменитостью: его посты снова читаются
+        # только из FeedEntry. После фиксации — если подписки удаляются
+        # вместе с автором, его посты к этому времени уже удалены.
+        author_id = instance.author_id
+        transaction.on_commit(lambda: feed.fan_out_author(author_id))
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.index_posts([instance.pk])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.remove_posts([instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, **kwargs):
+    search.index_comments([instance.pk])
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    search.remove_comments([instance.pk])
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_posts(sender, instance, **kwargs):
+    instance._post_ids = list(
+        instance.group_posts.values_list('id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def index_group(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    post_ids = getattr(instance, '_post_ids', None)
+    if post_ids is None:
+        post_ids = instance.group_posts.values_list('id', flat=True)
+    search.index_posts(post_ids)
@@ -0,0 +1,37 @@
+"""
+Потоковая отдача лент.
+
+При FEED_RENDERING = 'streaming' шаблон ленты рендерится с меткой
+вместо карточек постов. Всё до метки — head, навигация и заголовок —
+уходит клиенту сразу, и браузер начинает грузить CSS, пока
+карточки рендерятся и отправляются по одной. Остаток страницы
+(пагинатор, подвал) уходит последним.
+"""
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.shortcuts import render
+from django.template.loader import render_to_string
+
+from .templatetags.post_cards import CARDS_MARKER, iter_cards
+
+
+def render_feed(request, template_name, context):
+    """render() для шаблонов лент с {% post_cards page_obj %}."""
+    if settings.FEED_RENDERING != 'streaming':
+        return render(request, template_name, context)
+    page = render_to_string(
+        template_name, {**context, 'stream_cards': True}, request
+    )
+    head, _, tail = page.partition(CARDS_MARKER)
+    return StreamingHttpResponse(stream_feed(
+        head, context['page_obj'], not context.get('group'), tail
+    ))
+
+
+def stream_feed(head, posts, show_group, tail):
+    yield head
+    for number, card in enumerate(iter_cards(posts, show_group)):
+        if number:
+            yield '<hr>'
+        yield card
+    yield tail
@@ -0,0 +1,86 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts import caching
+
+register = template.Library()
+
+CARD_KEY = 'card:{pk}:{version}:{group}'
+
+
+# Место карточек в странице, которую отдают потоком (posts/streaming.py).
+CARDS_MARKER = '<!--post-cards-->'
+
+
+def card_keys(posts, show_group):
+    """
+    Ключ карточки — версия поста и, если показана ссылка на группу,
+    id и версия группы: ссылка ведёт по slug, который может смениться,
+    а удалённая группа снимается с постов без их сигналов.
+    """
+    scopes = [f'post:{post.pk}' for post in posts]
+    groups = []
+    if show_group:
+        groups = sorted({post.group_id for post in posts} - {None})
+        scopes += [f'group-info:{group_id}' for group_id in groups]
+    versions = caching.get_versions(scopes)
+    group_versions = dict(zip(groups, versions[len(posts):]))
+    return [
+        CARD_KEY.format(
+            pk=post.pk,
+            version=version,
+            group=(
+                f'{post.group_id}.{group_versions[post.group_id]}'
+                if post.group_id in group_versions else 0
+            ),
+        )
+        for post, version in zip(posts, versions)
+    ]
+
+
+def iter_cards(posts, show_group):
+    """
+    Карточки по одной: закэшированные читаются одним запросом,
+    недостающие рендерятся по мере выдачи и кладутся в кэш в конце.
+    Карточка поста, прочитанного с реплики, в кэш не кладётся: реплика
+    может отставать от версии поста в ключе.
+    """
+    posts = list(posts)
+    keys = card_keys(posts, show_group)
+    cards = cache.get_many(keys)
+    missing = {}
+    for post, key in zip(posts, keys):
+        card = cards.get(key)
+        if card is None:
+            card = render_to_string(
+                'includes/base_post.html',
+                {'post': post, 'show_group': show_group},
+            )
+            if post._state.db == DEFAULT_DB_ALIAS:
+                missing[key] = card
+        yield mark_safe(card)
+    if missing:
+        cache.set_many(missing, settings.PAGE_CACHE_TIMEOUT)
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """
+    Карточки постов из includes/base_post.html. Карточка не зависит
+    от пользователя и кэшируется по id и версии поста, поэтому одна
+    и та же карточка переиспользуется в лентах, группах и профилях.
+    Версии и карточки страницы читаются из кэша двумя запросами.
+
+        {% post_cards page_obj as cards %}
+        {% for card in cards %}{{ card }}{% endfor %}
+
+    При потоковом рендере вместо карточек возвращается метка, а сами
+    карточки отдаёт posts.streaming.
+    """
+    if context.get('stream_cards'):
+        return [mark_safe(CARDS_MARKER)]
+    return list(iter_cards(posts, not context.get('group')))
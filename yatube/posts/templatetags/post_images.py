@@ -0,0 +1,43 @@
+from django import template
+
+from posts import images, thumbnails
+
+register = template.Library()
+
+SIZES = '(max-width: 576px) 100vw, 960px'
+
+
+@register.inclusion_tag('includes/post_image.html')
+def post_picture(post):
+    """
+    Картинка поста: <picture> с WebP и JPEG разной ширины. Пока
+    миниатюры нет, показывается загруженная картинка с размерами,
+    записанными при загрузке.
+    """
+    main = f'-{thumbnails.CARD_SIZE[0]}.jpg'
+    context = {
+        'post': post,
+        'sources': [],
+        'srcset': '',
+        'sizes': SIZES,
+        'width': post.image_width,
+        'height': post.image_height,
+    }
+    if not post.thumbnail:
+        return context
+    context['width'], context['height'] = thumbnails.CARD_SIZE
+    if not post.thumbnail.endswith(main):
+        return context
+    base = post.thumbnail[:-len(main)]
+
+    def srcset(extension):
+        return ', '.join(
+            f'{base}-{width}.{extension} {width}w'
+            for width in thumbnails.CARD_WIDTHS
+        )
+    context['srcset'] = srcset('jpg')
+    if images.WEBP_SUPPORTED:
+        context['sources'].append(
+            {'type': 'image/webp', 'srcset': srcset('webp')}
+        )
+    return context
@@ -0,0 +1,113 @@
+"""
+Замер производительности всех страниц posts, users и about.
+
+Харнесс заполняет базу командой seed_yatube, запрашивает каждый
+URL из этих приложений и сравнивает результат с бюджетом из
+perf_budget.json. Размер базы задаётся переменными окружения
+PERF_POSTS и PERF_USERS; в CI они не заданы, и база — 200 постов
+и 20 пользователей.
+
+Бюджеты откалиброваны на этой базе функцией calibrate() по
+нескольким прогонам: число запросов — ровно измеренное, peak_kb —
+наибольшее с запасом в полтора раза. db_ms и render_ms зависят от
+машины и шумят, поэтому их пределы свободные: впятеро больше
+измеренного и не меньше TIME_FLOOR_MS. Они ловят не проценты, а
+порядки — N+1 в шаблоне или запрос без индекса. После изменения
+страницы или размера базы бюджет пересчитывается:
+
+    save_budget(calibrate([measure(objects) for _ in range(5)]))
+"""
+import json
+import math
+import os
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client
+
+from core.probes import Probe
+from posts.audit import seed, url_cases  # noqa: F401
+
+BUDGET_PATH = os.path.join(os.path.dirname(__file__), 'perf_budget.json')
+METRICS = ('queries', 'db_ms', 'render_ms', 'peak_kb')
+PEAK_SLACK = 1.5
+TIME_SLACK = 5
+TIME_FLOOR_MS = {'db_ms': 10, 'render_ms': 50}
+
+
+def measure(objects):
+    """
+    Замеряет каждую страницу на холодном кэше.
+
+    Перед замером страница запрашивается один раз: загрузка шаблонов
+    и ленивые импорты случаются раз на процесс, и без прогрева они
+    достаются той странице, которая первой их затронула.
+    """
+    results = {}
+    for name, url in url_cases(objects):
+        client = Client()
+        client.force_login(objects['user'])
+        with transaction.atomic():
+            client.get(url)
+            transaction.set_rollback(True)
+        cache.clear()
+        with Probe(memory=True) as probe:
+            client.get(url)
+        results[name] = {
+            'queries': probe.queries,
+            'db_ms': round(probe.db_time * 1000, 2),
+            'render_ms': round(probe.render_time * 1000, 2),
+            'peak_kb': round(probe.peak_memory / 1024, 1),
+        }
+    return results
+
+
+def load_budget(path=BUDGET_PATH):
+    with open(path, encoding='utf-8') as budget_file:
+        return json.load(budget_file)
+
+
+def save_budget(budget, path=BUDGET_PATH):
+    with open(path, 'w', encoding='utf-8') as budget_file:
+        json.dump(budget, budget_file, indent=4, ensure_ascii=False)
+        budget_file.write('\n')
+
+
+def _round_up(value, step):
+    return math.ceil(value / step) * step
+
+
+def calibrate(runs):
+    """Бюджет по результатам нескольких прогонов measure()."""
+    budget = {}
+    for name in runs[0]:
+        worst = {
+            metric: max(run[name][metric] for run in runs)
+            for metric in METRICS
+        }
+        budget[name] = {
+            'queries': worst['queries'],
+            **{
+                metric: _round_up(max(worst[metric] * TIME_SLACK, floor), 10)
+                for metric, floor in TIME_FLOOR_MS.items()
+            },
+            'peak_kb': _round_up(worst['peak_kb'] * PEAK_SLACK, 16),
+        }
+    return budget
+
+
+def violations(results, budget):
+    """Список нарушений бюджета в человекочитаемом виде."""
+    problems = []
+    for name, measured in sorted(results.items()):
+        if name not in budget:
+            problems.append(f'{name}: нет бюджета в perf_budget.json')
+            continue
+        for metric in METRICS:
+            limit = budget[name].get(metric)
+            if limit is not None and measured[metric] > limit:
+                problems.append(
+                    f'{name}: {metric} = {measured[metric]}, '
+                    f'бюджет {limit}'
+                )
+    return problems
@@ -0,0 +1,112 @@
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(
+            title='test_title', slug='test_slug', description='description'
+        )
+        self.post = Post.objects.create(
+            author=self.author, text='test_text', group=self.group
+        )
+        self.client = Client()
+
+    def test_feeds_mirror_html_pages(self):
+        """Ленты API отдают те же посты, что и страницы"""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.author)
+        self.client.force_login(reader)
+        urls = [
+            reverse('posts:api_index'),
+            reverse('posts:api_group_list', kwargs={'slug': 'test_slug'}),
+            reverse('posts:api_profile', kwargs={'username': 'author'}),
+            reverse('posts:api_follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.client.get(url).json()
+                self.assertEqual(
+                    [post['id'] for post in data['results']], [self.post.id]
+                )
+                self.assertEqual(data['results'][0]['group'], 'test_slug')
+        self.assertEqual(
+            self.client.get(urls[1]).json()['group']['title'], 'test_title'
+        )
+
+    def test_follow_feed_requires_login(self):
+        """Лента подписок без авторизации отвечает 401"""
+        response = self.client.get(reverse('posts:api_follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_sparse_fields(self):
+        """Параметр fields ограничивает поля поста"""
+        url = reverse('posts:api_index')
+        data = self.client.get(url, {'fields': 'id,text'}).json()
+        self.assertEqual(
+            data['results'], [{'id': self.post.id, 'text': 'test_text'}]
+        )
+        response = self.client.get(url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(PAGE_CONST=2)
+    def test_keyset_cursor(self):
+        """Курсор ведёт на следующую страницу ленты"""
+        for i in range(3):
+            Post.objects.create(author=self.author, text=f'post_{i}')
+        url = reverse('posts:api_index')
+        first = self.client.get(url, {'fields': 'text'}).json()
+        self.assertEqual(
+            [post['text'] for post in first['results']], ['post_2', 'post_1']
+        )
+        second = self.client.get(
+            url, {'fields': 'text', 'cursor': first['next_cursor']}
+        ).json()
+        self.assertEqual(
+            [post['text'] for post in second['results']],
+            ['post_0', 'test_text'],
+        )
+        self.assertIsNone(second['next_cursor'])
+
+    def test_unchanged_feed_answers_not_modified(self):
+        """Неизменённая лента отвечает 304 без выборки постов"""
+        url = reverse('posts:api_index')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.post.text = 'edited'
+        self.post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_post_detail_changes_with_comments(self):
+        """ETag поста меняется с новым комментарием"""
+        url = reverse(
+            'posts:api_post_detail', kwargs={'post_id': self.post.id}
+        )
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertEqual(response.json()['post']['text'], 'test_text')
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        Comment.objects.create(
+            post=self.post, author=self.author, text='comment'
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['comments'][0]['text'], 'comment')
+        self.assertEqual(response.json()['comments_count'], 1)
@@ -1,8 +1,22 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
 from django.core.cache import cache
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.db import connection, connections
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-from ..models import Group, Post
+from ..caching import get_versions, index_scopes
+from ..models import Comment, Follow, Group, Post
+from ..templatetags.post_cards import card_keys, iter_cards
 
 User = get_user_model()
 
@@ -34,3 +48,335 @@ class CacheTest(TestCase):
         self.assertEqual(Post.objects.count(), 1)
         cache.clear()
         self.assertEqual(Post.objects.count(), 0)
+
+
+class VersionedPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='test_title',
+            slug='test_slug',
+            description='test_description',
+        )
+        cls.user = User.objects.create_user(username='test_username')
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='test_text',
+            author=self.user,
+            group=self.group,
+        )
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+            reverse('posts:profile', kwargs={'username': 'test_username'}),
+        )
+
+    def test_pages_are_served_from_cache(self):
+        """Пока данные не менялись, страница отдаётся из кэша"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                Post.objects.filter(pk=self.post.pk).update(text='silent')
+                second = self.client.get(url)
+                self.assertIsNone(second.context)
+                self.assertEqual(first.content, second.content)
+                Post.objects.filter(pk=self.post.pk).update(text='test_text')
+
+    def test_post_change_invalidates_pages(self):
+        """Изменение поста сбрасывает все зависящие от него страницы"""
+        for url in self.urls:
+            self.client.get(url)
+        self.post.text = 'changed_text'
+        self.post.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'changed_text')
+
+    @override_settings(VERSION_TIMEOUT=0.05, PAGE_CACHE_TIMEOUT=0.05)
+    def test_local_cache_entries_expire(self):
+        """В кэше процесса версии и страницы живут недолго"""
+        self.client.get(self.urls[0])
+        versions = get_versions(index_scopes(None))
+        Post.objects.filter(pk=self.post.pk).update(text='silent')
+        time.sleep(0.1)
+        self.assertNotEqual(get_versions(index_scopes(None)), versions)
+        self.assertContains(self.client.get(self.urls[0]), 'silent')
+
+    def test_pages_are_cached_per_user(self):
+        """Авторизованный пользователь не получает чужую страницу"""
+        self.client.get(self.urls[0])
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(self.urls[0])
+        self.assertContains(response, 'Пользователь: test_username')
+
+
+class PostCardCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='test_username')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='test_title',
+            slug='test_slug',
+            description='test_description',
+        )
+        self.post = Post.objects.create(
+            text='test_text',
+            author=self.user,
+            group=self.group,
+        )
+
+    def test_card_is_shared_between_pages_and_users(self):
+        """Карточка поста рендерится один раз для всех страниц"""
+        self.client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post.pk).update(text='silent')
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(
+            reverse('posts:profile', kwargs={'username': 'test_username'})
+        )
+        self.assertContains(response, 'test_text')
+        self.assertNotContains(response, 'silent')
+
+    def test_card_follows_post_version(self):
+        """Изменённый пост получает новую карточку"""
+        self.client.get(reverse('posts:index'))
+        self.post.text = 'changed_text'
+        self.post.save()
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'})
+        )
+        self.assertContains(response, 'changed_text')
+        self.assertNotContains(response, 'все записи группы')
+
+    def test_card_follows_group_slug_and_deletion(self):
+        """Ссылка на группу в карточке меняется со slug и с удалением"""
+        url = reverse('posts:index')
+        self.assertContains(self.client.get(url), '/group/test_slug/')
+        self.group.slug = 'new_slug'
+        self.group.save()
+        response = self.client.get(url)
+        self.assertContains(response, '/group/new_slug/')
+        self.assertNotContains(response, '/group/test_slug/')
+        self.group.delete()
+        response = self.client.get(url)
+        self.assertContains(response, 'test_text')
+        self.assertNotContains(response, '/group/new_slug/')
+
+    def test_user_specific_parts_are_not_shared(self):
+        """Подписка и вкладки зависят от пользователя, а не от кэша"""
+        Follow.objects.create(user=self.reader, author=self.user)
+        url = reverse('posts:profile', kwargs={'username': 'test_username'})
+        client = Client()
+        client.force_login(self.user)
+        self.assertContains(client.get(url), 'Подписаться')
+        client.force_login(self.reader)
+        self.assertContains(client.get(url), 'Отписаться')
+        response = client.get(reverse('posts:follow_index'))
+        self.assertContains(response, 'nav-link active')
+        self.assertTrue(response.context['follow'])
+
+    def test_cards_read_from_replica_are_not_cached(self):
+        """Карточка поста, прочитанного с реплики, не кэшируется"""
+        replica_post = Post.objects.get(pk=self.post.pk)
+        replica_post._state.db = 'replica1'
+        list(iter_cards([replica_post], True))
+        keys = card_keys([self.post], True)
+        self.assertEqual(cache.get_many(keys), {})
+        list(iter_cards([self.post], True))
+        self.assertEqual(list(cache.get_many(keys)), keys)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaReadsTest(TransactionTestCase):
+    """
+    Реплика — снимок тестовой базы в файле, сделанный в setUp: пост,
+    созданный после снимка, она не видит, как отставшая реплика.
+    TransactionTestCase — внутри транзакции реплики не используются.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        Post.objects.create(text='old_text', author=self.author)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        name = os.path.join(directory, 'replica.sqlite3')
+        primary = connections['default']
+        primary.ensure_connection()
+        replica = sqlite3.connect(name)
+        primary.connection.backup(replica)
+        replica.close()
+        connections.databases['replica1'] = {
+            **primary.settings_dict, 'NAME': name,
+        }
+        self.addCleanup(self.drop_replica)
+        Post.objects.create(text='new_text', author=self.author)
+
+    def drop_replica(self):
+        connections['replica1'].close()
+        delattr(connections._connections, 'replica1')
+        del connections.databases['replica1']
+
+    def get(self, client, url):
+        with CaptureQueriesContext(connections['replica1']) as queries:
+            response = client.get(url)
+        read_posts = any('posts_post' in query['sql'] for query in queries)
+        return response, read_posts
+
+    def test_feeds_read_from_replica_without_caching(self):
+        """Ленты читают с реплики, но не кэшируются и не получают ETag"""
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:api_index'),
+        ):
+            with self.subTest(url=url):
+                for _ in range(2):
+                    response, read_posts = self.get(self.client, url)
+                    self.assertTrue(read_posts)
+                    self.assertContains(response, 'old_text')
+                    self.assertNotContains(response, 'new_text')
+                    self.assertFalse(response.has_header('ETag'))
+                    self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_pinned_client_fills_cache_from_primary(self):
+        """Страница из основной базы кэшируется и отдаётся без реплики"""
+        url = reverse('posts:index')
+        pinned = Client()
+        pinned.cookies[settings.REPLICA_STICKY_COOKIE] = str(time.time() + 60)
+        response, read_posts = self.get(pinned, url)
+        self.assertFalse(read_posts)
+        self.assertContains(response, 'new_text')
+        self.assertTrue(response.has_header('ETag'))
+        response, read_posts = self.get(Client(), url)
+        self.assertFalse(read_posts)
+        self.assertContains(response, 'new_text')
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='test_title',
+            slug='test_slug',
+            description='test_description',
+        )
+        cls.user = User.objects.create_user(username='test_username')
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='test_text', author=self.user, group=self.group
+        )
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+            reverse('posts:profile', kwargs={'username': 'test_username'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('about:author'),
+        )
+
+    def test_unchanged_page_is_not_modified(self):
+        """Повторный запрос с ETag получает 304 без обращений к базе"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_new_comment_changes_validators(self):
+        """Новый комментарий меняет ETag страницы поста"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.user, text='new')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'new')
+
+    def test_new_login_changes_validators(self):
+        """После повторного входа страница с формой приходит заново"""
+        self.user.set_password('password')
+        self.user.save()
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        login = {'username': 'test_username', 'password': 'password'}
+        self.client.post(reverse('users:login'), login)
+        self.client.get(url)
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.client.post(reverse('users:logout'))
+        self.client.post(reverse('users:login'), login)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_anonymous_pages_are_public(self):
+        """Анонимам — общий кэш, пользователю — только свой"""
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+        self.assertTrue(response.has_header('Last-Modified'))
+        self.client.force_login(self.user)
+        private = self.client.get(url)
+        self.assertIn('private', private['Cache-Control'])
+        self.assertNotEqual(private['ETag'], response['ETag'])
+
+
+@override_settings(PERSONALIZATION='client')
+class ClientPersonalizationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='test_text', author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        )
+
+    def test_pages_do_not_depend_on_user(self):
+        """Гость и пользователь получают один и тот же публичный HTML"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                anonymous = self.client.get(url)
+                with CaptureQueriesContext(connection) as queries:
+                    personal = self.reader_client.get(url)
+                # Сессия и пользователь не читаются.
+                self.assertNotIn('django_session', ' '.join(
+                    query['sql'] for query in queries
+                ))
+                self.assertEqual(anonymous.content, personal.content)
+                self.assertNotContains(personal, 'reader')
+                self.assertNotIn('Cookie', personal.get('Vary', ''))
+                self.assertIn('public', personal['Cache-Control'])
+
+    def test_viewer_returns_user_bits(self):
+        """Личные части страницы приходят одним запросом"""
+        url = reverse('posts:api_viewer')
+        self.assertEqual(
+            self.client.get(url).json()['authenticated'], False
+        )
+        response = self.reader_client.get(url, {'follow': 'author,reader'})
+        data = response.json()
+        self.assertEqual(data['username'], 'reader')
+        self.assertEqual(data['following'], ['author'])
+        self.assertTrue(data['csrf_token'])
+        self.assertIn('no-store', response['Cache-Control'])
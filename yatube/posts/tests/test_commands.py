@@ -0,0 +1,166 @@
+import datetime as dt
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..management.commands.check_query_plans import FULL_SCAN, problems
+from ..models import (
+    Comment, FeedEntry, Group, GroupAuthorStats, GroupStats, Post, UserStats
+)
+
+User = get_user_model()
+
+
+class CheckQueryPlansTest(TestCase):
+    def test_view_queries_use_indexes(self):
+        """Запросы представлений не читают таблицы целиком"""
+        out = StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertIn('Все запросы используют индексы', out.getvalue())
+        self.assertFalse(Post.objects.exists())
+
+    def test_unbounded_sort_is_a_problem(self):
+        """Сортировка всей выборки — ошибка, досортировка равных — нет"""
+        plan = [
+            'SEARCH posts_post USING INDEX post_pub_date_id_idx (pub_date<?)',
+            'USE TEMP B-TREE FOR ORDER BY',
+        ]
+        self.assertEqual(
+            problems('posts:index', plan), ['USE TEMP B-TREE FOR ORDER BY']
+        )
+        plan[1] = 'USE TEMP B-TREE FOR RIGHT PART OF ORDER BY'
+        self.assertEqual(problems('posts:index', plan), [])
+        self.assertEqual(
+            problems('posts:post_create', ['SCAN posts_group']), []
+        )
+
+    def test_full_scan_detection(self):
+        """Полный просмотр отличается от прохода по индексу"""
+        self.assertTrue(FULL_SCAN.match('SCAN posts_post'))
+        self.assertTrue(FULL_SCAN.match('SCAN TABLE posts_post'))
+        self.assertFalse(
+            FULL_SCAN.match('SCAN posts_post USING INDEX post_pub_date_idx')
+        )
+        self.assertFalse(FULL_SCAN.match('SEARCH posts_post USING INDEX x'))
+        self.assertFalse(
+            FULL_SCAN.match('SCAN posts_search VIRTUAL TABLE INDEX 0:M3')
+        )
+
+
+class RecountTest(TestCase):
+    def test_recount_repairs_drift(self):
+        """Команда recount исправляет разошедшиеся счётчики"""
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(author=author, text='text')
+        Comment.objects.create(post=post, author=author, text='comment')
+        UserStats.objects.filter(user=author).update(posts_count=42)
+        Post.objects.filter(pk=post.pk).update(comments_count=-3)
+        call_command('recount', stdout=StringIO())
+        author.stats.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual(author.stats.posts_count, 1)
+        self.assertEqual(author.stats.followers_count, 0)
+        self.assertEqual(post.comments_count, 1)
+
+    def test_recount_repairs_group_drift(self):
+        """Команда recount пересчитывает счётчики групп"""
+        author = User.objects.create_user(username='author')
+        group = Group.objects.create(title='group', slug='group')
+        post = Post.objects.create(author=author, text='text', group=group)
+        GroupStats.objects.filter(group=group).update(
+            posts_count=7, last_post_date=None
+        )
+        GroupAuthorStats.objects.all().delete()
+        call_command('recount', stdout=StringIO())
+        group.stats.refresh_from_db()
+        self.assertEqual(group.stats.posts_count, 1)
+        self.assertEqual(group.stats.last_post_date, post.pub_date)
+        self.assertEqual(group.author_stats.get().author, author)
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GenerateThumbnailsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_missing_thumbnails_are_filled(self):
+        """Команда создаёт миниатюры постам, у которых их нет"""
+        author = User.objects.create_user(username='author')
+        image = SimpleUploadedFile(
+            name='old.gif',
+            content=(
+                b'\x47\x49\x46\x38\x39\x61\x02\x00'
+                b'\x01\x00\x80\x00\x00\x00\x00\x00'
+                b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+                b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+                b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+                b'\x0A\x00\x3B'
+            ),
+            content_type='image/gif',
+        )
+        post = Post.objects.create(author=author, text='old', image=image)
+        Post.objects.create(author=author, text='no image')
+        self.assertEqual(post.thumbnail, '')
+        out = StringIO()
+        call_command('generate_thumbnails', stdout=out)
+        post.refresh_from_db()
+        self.assertEqual(
+            post.thumbnail, '/media/thumbnails/card/old-960.jpg'
+        )
+        self.assertIn('Миниатюры созданы: 1', out.getvalue())
+        self.assertIn('осталось: 0', out.getvalue())
+
+
+class SeedYatubeTest(TestCase):
+    def seed(self, **options):
+        call_command(
+            'seed_yatube', users=15, groups=3, posts=60, comments=30,
+            follows=4, end=dt.date(2022, 6, 1), verbosity=0, **options
+        )
+        return list(Post.objects.order_by('pub_date', 'id').values_list(
+            'text', 'pub_date', 'author__username'
+        ))
+
+    def test_seed_creates_requested_rows(self):
+        """Команда создаёт заданное число строк и согласованные счётчики"""
+        self.seed()
+        self.assertEqual(User.objects.count(), 15)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 30)
+        self.assertEqual(
+            sum(UserStats.objects.values_list('posts_count', flat=True)), 60
+        )
+        self.assertFalse(FeedEntry.objects.exists())
+
+    def test_seed_builds_recent_feeds_on_request(self):
+        """С --feed-days ленты собираются из постов за эти дни"""
+        self.seed(feed_days=30, days=90)
+        since = dt.datetime(2022, 5, 2, tzinfo=dt.timezone.utc)
+        followed = Post.objects.filter(author__following__isnull=False)
+        self.assertEqual(
+            FeedEntry.objects.count(),
+            followed.filter(pub_date__gte=since).count(),
+        )
+        self.assertTrue(FeedEntry.objects.exists())
+        self.assertLess(FeedEntry.objects.count(), followed.count())
+
+    def test_seed_is_deterministic(self):
+        """Одинаковый seed даёт одинаковые данные"""
+        first = self.seed()
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        self.assertEqual(
+            [post[:2] for post in self.seed()], [post[:2] for post in first]
+        )
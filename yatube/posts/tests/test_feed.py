@@ -0,0 +1,123 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings,
+)
+from django.urls import reverse
+
+from ..feed import follow_feed
+from ..models import FeedEntry, Follow, Post
+
+User = get_user_model()
+
+
+class FollowFeedTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader')
+        self.author = User.objects.create_user(username='author')
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed_texts(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return [post.text for post in response.context['page_obj']]
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        """Новый пост попадает в ленту подписчика при публикации"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='new_post', author=self.author)
+        self.assertTrue(
+            FeedEntry.objects.filter(follower=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed_texts(), ['new_post'])
+
+    def test_follow_backfills_and_unfollow_retracts(self):
+        """Подписка добавляет старые посты автора, отписка убирает их"""
+        Post.objects.create(text='old_post', author=self.author)
+        self.client.get(
+            reverse('posts:profile_follow', args=(self.author.username,))
+        )
+        self.assertEqual(self.feed_texts(), ['old_post'])
+        self.client.get(
+            reverse('posts:profile_unfollow', args=(self.author.username,))
+        )
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.feed_texts(), [])
+
+    @override_settings(PAGINATION_MODE='keyset', PAGE_CONST=2)
+    def test_keyset_cursor_walks_feed_entries(self):
+        """Курсор по записям ленты проходит её без пропусков"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        for i in range(5):
+            Post.objects.create(text=f'post_{i}', author=self.author)
+        url = reverse('posts:follow_index')
+        page_obj = self.client.get(url).context['page_obj']
+        seen = [post.text for post in page_obj]
+        while page_obj.has_next():
+            page_obj = self.client.get(
+                url, {'cursor': page_obj.next_cursor()}
+            ).context['page_obj']
+            seen += [post.text for post in page_obj]
+        self.assertEqual(seen, [f'post_{i}' for i in reversed(range(5))])
+
+    def test_feed_page_is_an_index_range_scan(self):
+        """Страница ленты читается по индексу записей без сортировки"""
+        feed, key = follow_feed(self.reader)
+        sql, params = feed[:10].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.assertEqual(key, 'post_id')
+        self.assertIn('feed_follower_pub_post_idx', plan[0])
+        self.assertFalse([line for line in plan if 'TEMP B-TREE' in line])
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_popular_author_is_read_on_the_fly(self):
+        """Посты популярного автора не разносятся, но видны в ленте"""
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=fan, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(text='popular_post', author=self.author)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.feed_texts(), ['popular_post'])
+
+    def test_profile_shows_subscription_state(self):
+        """Профиль знает о подписке, не делая отдельного запроса"""
+        url = reverse('posts:profile', args=(self.author.username,))
+        self.assertFalse(self.client.get(url).context['following'])
+        Follow.objects.create(user=self.reader, author=self.author)
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertTrue(response.context['following'])
+        self.assertFalse(Client().get(url).context['following'])
+
+
+@override_settings(FEED_FANOUT_LIMIT=1)
+class CelebrityFeedTest(TransactionTestCase):
+    """Записи ленты добавляются после фиксации транзакции."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=self.fan, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.post = Post.objects.create(
+            text='popular_post', author=self.author
+        )
+
+    def test_posts_return_to_feed_when_author_stops_being_celebrity(self):
+        """Посты, написанные за время популярности, остаются в ленте"""
+        self.assertFalse(FeedEntry.objects.exists())
+        Follow.objects.get(user=self.fan, author=self.author).delete()
+        feed, key = follow_feed(self.reader)
+        self.assertEqual(key, 'post_id')
+        self.assertEqual([entry.post_id for entry in feed], [self.post.pk])
+
+    def test_deleting_celebrity_keeps_feeds_consistent(self):
+        """Удаление популярного автора не оставляет записей ленты"""
+        self.author.delete()
+        self.assertFalse(FeedEntry.objects.exists())
@@ -8,15 +8,18 @@ from django.utils import timezone
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
 from django.core.cache import cache
+import io
 import tempfile
 import shutil
+from unittest import mock
+from PIL import Image
 
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
 class TaskCreateFormTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -115,3 +118,135 @@ class TaskCreateFormTests(TestCase):
         self.assertRedirects(response,
                              '/auth/login/?next=/create/')
         self.assertEqual(Post.objects.count(), posts_count)
+
+    def test_create_post_generates_thumbnail(self):
+        """После загрузки картинки у поста появляется миниатюра"""
+        image = SimpleUploadedFile(
+            name='thumb.gif',
+            content=self.small_gif,
+            content_type='image/gif'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'with_image', 'image': image},
+        )
+        post = Post.objects.get(text='with_image')
+        self.assertEqual(
+            post.thumbnail, '/media/thumbnails/card/thumb-960.jpg'
+        )
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        self.assertContains(response, post.thumbnail)
+
+    @override_settings(THUMBNAIL_WORKERS=1)
+    def test_thumbnail_is_generated_after_commit(self):
+        """С фоновыми потоками миниатюра создаётся после коммита"""
+        image = SimpleUploadedFile(
+            name='later.gif',
+            content=self.small_gif,
+            content_type='image/gif'
+        )
+        with mock.patch('posts.thumbnails._get_executor') as executor:
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                data={'text': 'later', 'image': image},
+            )
+            post = Post.objects.get(text='later')
+            self.assertEqual(post.thumbnail, '')
+            executor.assert_not_called()
+            self.assertContains(
+                self.authorized_client.get(
+                    reverse('posts:post_detail', kwargs={'post_id': post.id})
+                ),
+                f'src="{post.image.url}" width="2" height="1"'
+            )
+
+    @override_settings(POST_IMAGE_MAX_SIZE=(40, 40))
+    def test_upload_is_resized_and_stripped(self):
+        """Большая картинка уменьшается и теряет EXIF"""
+        buffer = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = 'test_camera'
+        Image.new('RGBA', (100, 50), (255, 0, 0, 128)).save(
+            buffer, 'PNG', exif=exif
+        )
+        image = SimpleUploadedFile(
+            name='big.png',
+            content=buffer.getvalue(),
+            content_type='image/png'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'big_image', 'image': image},
+        )
+        post = Post.objects.get(text='big_image')
+        self.assertEqual(post.image.name, 'posts/big.jpg')
+        self.assertEqual((post.image_width, post.image_height), (40, 20))
+        with Image.open(post.image) as stored:
+            self.assertEqual(stored.format, 'JPEG')
+            self.assertEqual(stored.size, (40, 20))
+            self.assertFalse(stored.getexif())
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        self.assertContains(response, 'big-480.jpg 480w')
+        self.assertContains(response, 'width="960" height="339"')
+        api = self.authorized_client.get(
+            reverse('posts:api_post_detail', kwargs={'post_id': post.id}),
+            {'fields': 'image_width,image_height'},
+        )
+        self.assertEqual(
+            api.json()['post'], {'image_width': 40, 'image_height': 20}
+        )
+
+    @override_settings(POST_IMAGE_MAX_SIZE=(40, 40))
+    def test_large_gif_keeps_first_frame(self):
+        """От GIF больше предела остаётся уменьшенный первый кадр"""
+        buffer = io.BytesIO()
+        frames = [
+            Image.new('RGB', (100, 50), color)
+            for color in ((255, 0, 0), (0, 0, 255))
+        ]
+        frames[0].save(
+            buffer, 'GIF', save_all=True, append_images=frames[1:],
+            comment=b'secret',
+        )
+        image = SimpleUploadedFile(
+            name='wide.gif',
+            content=buffer.getvalue(),
+            content_type='image/gif'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'wide_gif', 'image': image},
+        )
+        post = Post.objects.get(text='wide_gif')
+        self.assertEqual(post.image.name, 'posts/wide.jpg')
+        self.assertEqual((post.image_width, post.image_height), (40, 20))
+        with Image.open(post.image) as stored:
+            self.assertEqual(stored.format, 'JPEG')
+            self.assertEqual(stored.size, (40, 20))
+            red, green, blue = stored.getpixel((20, 10))
+            self.assertGreater(red, blue)
+        post.image.open('rb')
+        with post.image:
+            self.assertNotIn(b'secret', post.image.read())
+
+    @override_settings(POST_IMAGE_MAX_BYTES=10)
+    def test_too_large_upload_is_rejected(self):
+        """Слишком тяжёлый файл не принимается"""
+        image = SimpleUploadedFile(
+            name='heavy.gif',
+            content=self.small_gif,
+            content_type='image/gif'
+        )
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'heavy', 'image': image},
+        )
+        self.assertFormError(
+            response, 'form', 'image',
+            'Картинка не должна быть больше 10\xa0байт'
+        )
+        self.assertFalse(Post.objects.filter(text='heavy').exists())
@@ -0,0 +1,110 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import checks, ingestion, search
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENT_INGESTION='batched')
+class BatchedCommentsTest(TestCase):
+    def setUp(self):
+        # Пакеты записываются вручную через flush_pending.
+        flusher = mock.patch('posts.ingestion._start_flusher')
+        flusher.start()
+        self.addCleanup(flusher.stop)
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=self.author, text='text')
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.url = reverse(
+            'posts:add_comment', kwargs={'post_id': self.post.id}
+        )
+        self.detail = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}
+        )
+
+    def tearDown(self):
+        ingestion.flush_pending()
+
+    def test_comment_is_queued_without_touching_posts(self):
+        """Комментарий ставится в очередь без запросов к постам"""
+        with self.assertNumQueries(2):
+            response = self.client.post(self.url, {'text': 'queued'})
+        self.assertRedirects(response, self.detail)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_author_sees_own_pending_comment(self):
+        """Автор сразу видит свой комментарий, другие — после записи"""
+        self.client.post(self.url, {'text': 'pending_text'})
+        self.assertContains(self.client.get(self.detail), 'pending_text')
+        reader = Client()
+        reader.force_login(User.objects.create_user(username='reader'))
+        self.assertNotContains(reader.get(self.detail), 'pending_text')
+        ingestion.flush_pending()
+        self.assertContains(reader.get(self.detail), 'pending_text')
+        self.assertContains(
+            self.client.get(self.detail), 'pending_text', count=1
+        )
+
+    def test_concurrent_submits_keep_each_other(self):
+        """Параллельный комментарий автора не затирает ожидающий"""
+        real_set = cache.set
+        calls = []
+
+        def racing_set(*args, **kwargs):
+            # Второй запрос автора приходит, пока первый пишет в кэш.
+            if not calls:
+                calls.append(args)
+                ingestion.submit(self.post.id, self.author, 'second')
+            return real_set(*args, **kwargs)
+
+        with mock.patch.object(cache, 'set', racing_set):
+            ingestion.submit(self.post.id, self.author, 'first')
+        pending = ingestion.pending_for(self.post, self.author)
+        self.assertEqual(
+            sorted(comment.text for comment in pending), ['first', 'second']
+        )
+        self.assertEqual(ingestion.pending_count(self.post.id, self.author), 2)
+
+    def test_batched_mode_requires_shared_cache(self):
+        """Без общего кэша пакетный режим не проходит проверку"""
+        with self.settings(CACHE_SHARED=False):
+            errors = checks.batched_comments_need_shared_cache(None)
+        self.assertEqual([error.id for error in errors], ['posts.E001'])
+        with self.settings(CACHE_SHARED=True):
+            self.assertEqual(
+                checks.batched_comments_need_shared_cache(None), []
+            )
+
+    def test_flush_writes_batch_and_side_effects(self):
+        """Пакет записывается вместе со счётчиками и индексом"""
+        for i in range(3):
+            self.client.post(self.url, {'text': f'comment_{i}'})
+        ingestion.flush_pending()
+        self.assertEqual(self.post.comments.count(), 3)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 3)
+        self.assertEqual(
+            [post.id for post in search.search('comment_1')], [self.post.id]
+        )
+
+    def test_comments_to_deleted_post_are_dropped(self):
+        """Комментарии к удалённому посту не ломают пакет"""
+        other = Post.objects.create(author=self.author, text='other')
+        self.client.post(self.url, {'text': 'lost'})
+        self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': other.id}),
+            {'text': 'kept'},
+        )
+        self.post.delete()
+        ingestion.flush_pending()
+        self.assertEqual(
+            list(Comment.objects.values_list('text', flat=True)), ['kept']
+        )
@@ -1,7 +1,7 @@
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -26,3 +26,68 @@ class PostModelTest(TestCase):
         self.assertEqual(str(self.post), self.post.text[:15])
         self.assertEqual(str(self.group),
                          (f'Группа: "{self.group.title}"'))
+
+
+class CountersTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+
+    def test_counters_follow_create_and_delete(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками"""
+        post = Post.objects.create(author=self.author, text='text')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='comment'
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post.refresh_from_db()
+        self.author.stats.refresh_from_db()
+        self.reader.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 1)
+        self.assertEqual(self.author.stats.followers_count, 1)
+        self.assertEqual(self.reader.stats.following_count, 1)
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        post.delete()
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 0)
+        self.assertEqual(self.author.stats.followers_count, 0)
+
+    def test_post_save_keeps_comments_count(self):
+        """Сохранение устаревшего объекта поста не затирает счётчик"""
+        post = Post.objects.create(author=self.author, text='text')
+        Comment.objects.create(post=post, author=self.reader, text='comment')
+        post.text = 'edited'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_group_counters_follow_posts(self):
+        """Счётчики группы меняются при публикации, переносе и удалении"""
+        group = Group.objects.create(title='first', slug='first')
+        other = Group.objects.create(title='second', slug='second')
+        old = Post.objects.create(author=self.author, text='old', group=group)
+        new = Post.objects.create(author=self.reader, text='new', group=group)
+        group.stats.refresh_from_db()
+        self.assertEqual(group.stats.posts_count, 2)
+        self.assertEqual(group.stats.last_post_date, new.pub_date)
+        new.group = other
+        new.save()
+        group.stats.refresh_from_db()
+        other.stats.refresh_from_db()
+        self.assertEqual(group.stats.posts_count, 1)
+        self.assertEqual(group.stats.last_post_date, old.pub_date)
+        self.assertEqual(other.stats.posts_count, 1)
+        self.assertEqual(
+            other.author_stats.get(author=self.reader).posts_count, 1
+        )
+        self.assertEqual(
+            group.author_stats.get(author=self.reader).posts_count, 0
+        )
+        old.delete()
+        group.stats.refresh_from_db()
+        self.assertEqual(group.stats.posts_count, 0)
+        self.assertIsNone(group.stats.last_post_date)
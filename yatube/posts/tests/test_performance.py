@@ -0,0 +1,33 @@
+from django.test import TestCase
+
+from . import perf
+
+
+class PerformanceBudgetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.objects = perf.seed()
+
+    def test_views_fit_budget(self):
+        """Каждая страница укладывается в бюджет запросов, времени и памяти"""
+        results = perf.measure(self.objects)
+        problems = perf.violations(results, perf.load_budget())
+        self.assertFalse(problems, '\n'.join(problems))
+
+    def test_time_limits_are_loose(self):
+        """Пределы времени свободные, но порядок роста ловят"""
+        runs = [
+            {'posts:index': {
+                'queries': 4, 'db_ms': db_ms, 'render_ms': 90, 'peak_kb': 100,
+            }}
+            for db_ms in (0.5, 3)
+        ]
+        budget = perf.calibrate(runs)
+        self.assertEqual(budget['posts:index'], {
+            'queries': 4, 'db_ms': 20, 'render_ms': 450, 'peak_kb': 160,
+        })
+        slow = {'posts:index': {**runs[0]['posts:index'], 'render_ms': 900}}
+        self.assertEqual(
+            perf.violations(slow, budget),
+            ['posts:index: render_ms = 900, бюджет 450'],
+        )
@@ -0,0 +1,128 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(
+            title='Садоводы', slug='garden', description='description'
+        )
+        self.client = Client()
+
+    def found(self, query):
+        return [post.text for post in search.search(query)]
+
+    def test_post_text_is_found_with_snippet(self):
+        """Пост находится по слову, найденное слово подсвечено"""
+        Post.objects.create(author=self.author, text='Сажаем <b>томаты</b>')
+        Post.objects.create(author=self.author, text='Про огурцы')
+        response = self.client.get(reverse('posts:search'), {'q': 'томат'})
+        posts = list(response.context['page_obj'])
+        self.assertEqual(len(posts), 1)
+        self.assertIn('<mark>томаты</mark>', posts[0].snippet)
+        self.assertIn('&lt;b&gt;', posts[0].snippet)
+
+    def test_post_text_ranks_above_comments(self):
+        """Совпадение в тексте поста важнее совпадения в комментарии"""
+        commented = Post.objects.create(author=self.author, text='Просто пост')
+        Comment.objects.create(
+            post=commented, author=self.author, text='картофель'
+        )
+        Post.objects.create(author=self.author, text='картофель растёт')
+        self.assertEqual(
+            self.found('картофель'), ['картофель растёт', 'Просто пост']
+        )
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при правке поста, группы и комментариев"""
+        post = Post.objects.create(author=self.author, text='старый текст')
+        post.text = 'новый текст'
+        post.save()
+        self.assertEqual(self.found('старый'), [])
+        self.assertEqual(self.found('новый'), ['новый текст'])
+        comment = Comment.objects.create(
+            post=post, author=self.author, text='морковь'
+        )
+        self.assertEqual(self.found('морковь'), ['новый текст'])
+        comment.delete()
+        self.assertEqual(self.found('морковь'), [])
+        post.group = self.group
+        post.save()
+        self.group.title = 'Огородники'
+        self.group.save()
+        self.assertEqual(self.found('огородники'), ['новый текст'])
+        self.assertEqual(self.found('садоводы'), [])
+        post.delete()
+        self.assertEqual(self.found('новый'), [])
+
+    def test_comment_is_indexed_as_own_document(self):
+        """Комментарий — отдельный документ, пост в выдаче один раз"""
+        post = Post.objects.create(author=self.author, text='грядка')
+        comments = [
+            Comment.objects.create(
+                post=post, author=self.author, text=f'полив {i}'
+            )
+            for i in range(3)
+        ]
+
+        def documents():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT rowid FROM {search.TABLE} WHERE post_id = %s',
+                    [post.pk],
+                )
+                return sorted(row[0] for row in cursor.fetchall())
+
+        self.assertEqual(
+            documents(),
+            sorted([post.pk] + [-comment.pk for comment in comments]),
+        )
+        results = search.search('полив')
+        self.assertEqual([found.pk for found in results], [post.pk])
+        self.assertIn('<mark>полив</mark>', results.object_list[0].snippet)
+        comments[0].delete()
+        self.assertEqual(len(documents()), 3)
+
+    def test_syntax_characters_are_harmless(self):
+        """Спецсимволы FTS5 в запросе не приводят к ошибке"""
+        Post.objects.create(author=self.author, text='кавычки и звёздочки')
+        self.assertEqual(self.found('"кавычки* AND (OR'), [])
+        self.assertEqual(self.found('***'), [])
+        self.assertEqual(self.found('звёздочки"'), ['кавычки и звёздочки'])
+
+    @override_settings(PAGE_CONST=2)
+    def test_keyset_pagination(self):
+        """Курсор ведёт на следующую страницу без повторов"""
+        for i in range(5):
+            Post.objects.create(author=self.author, text=f'рецепт {i}')
+        seen = []
+        params = {'q': 'рецепт'}
+        while True:
+            data = self.client.get(reverse('posts:search_api'), params).json()
+            seen += [result['id'] for result in data['results']]
+            if data['next_cursor'] is None:
+                break
+            params['cursor'] = data['next_cursor']
+        self.assertEqual(
+            sorted(seen), sorted(Post.objects.values_list('id', flat=True))
+        )
+
+    def test_rebuild_command(self):
+        """Команда rebuild_search_index восстанавливает индекс"""
+        Post.objects.create(author=self.author, text='забытый пост')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.TABLE}')
+        self.assertEqual(self.found('забытый'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.found('забытый'), ['забытый пост'])
@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(FEED_RENDERING='streaming')
+class StreamingFeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(
+            title='test_title', slug='test_slug', description='desc'
+        )
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(3):
+            Post.objects.create(
+                text=f'post_{number}', author=cls.author, group=cls.group
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_head_is_sent_before_cards(self):
+        """Первый кусок — шапка страницы без карточек постов"""
+        response = self.client.get(reverse('posts:index'))
+        self.assertTrue(response.streaming)
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        self.assertIn('</head>', chunks[0])
+        self.assertNotIn('post_', chunks[0])
+        cards = chunks[1:-1]
+        self.assertEqual(cards[1::2], ['<hr>', '<hr>'])
+        for card, number in zip(cards[::2], (2, 1, 0)):
+            self.assertIn(f'post_{number}', card)
+        self.assertIn('</html>', chunks[-1])
+
+    def test_all_feeds_stream_every_post(self):
+        """Все ленты отдают потоком те же посты, что и без него"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=('test_slug',)),
+            reverse('posts:profile', args=('author',)),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                content = b''.join(response.streaming_content).decode()
+                for number in range(3):
+                    self.assertIn(f'post_{number}', content)
+                self.assertNotIn('<!--post-cards-->', content)
+                self.assertEqual(len(response.context['page_obj']), 3)
+
+    def test_streamed_page_is_cached(self):
+        """Отданная потоком страница попадает в кэш страниц"""
+        url = reverse('posts:index')
+        streamed = b''.join(self.client.get(url).streaming_content)
+        with self.assertNumQueries(2):
+            cached = self.client.get(url)
+        self.assertFalse(cached.streaming)
+        self.assertEqual(cached.content, streamed)
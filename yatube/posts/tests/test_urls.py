@@ -26,6 +26,7 @@ class StaticURLTests(TestCase):
         )
         cls.public_urls = (
             (reverse('posts:index'), 'posts/index.html'),
+            (reverse('posts:group_index'), 'posts/group_index.html'),
             (reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
                 'posts/group_list.html'),
             (reverse('posts:post_detail', kwargs={'post_id': '1'}),
@@ -1,4 +1,6 @@
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
@@ -6,8 +8,9 @@ from django import forms
 from django.utils import timezone
 from django.core.files.uploadedfile import SimpleUploadedFile
 
+from ..counters import recount
 from ..forms import PostForm
-from ..models import Group, Post
+from ..models import Comment, Group, Post
 from django.conf import settings
 import tempfile
 import shutil
@@ -171,6 +174,8 @@ class PaginatorViewsTest(TestCase):
             ) for i in range(11)
         ]
         Post.objects.bulk_create(cls.posts)
+        # bulk_create не шлёт сигналы, счётчики пересчитываются явно.
+        recount()
 
     def setUp(self):
         cache.clear()
@@ -200,3 +205,227 @@ class PaginatorViewsTest(TestCase):
             with self.subTest(reverse_name=reverse_name):
                 response = self.client.get(reverse_name + '?page=2')
                 self.assertEqual(len(response.context['page_obj']), 1)
+
+
+@override_settings(PAGINATION_MODE='keyset')
+class KeysetPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_usrneme')
+        cls.group = Group.objects.create(
+            title='test_title',
+            slug='test_slug',
+            description='test_description',
+        )
+        Post.objects.bulk_create([
+            Post(
+                text=f'test_text_{i}',
+                author=cls.user,
+                group=cls.group
+            ) for i in range(25)
+        ])
+        cls.url_list = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+            reverse('posts:profile', kwargs={'username': 'test_usrneme'}),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_walks_through_all_posts(self):
+        """Курсоры проходят ленту без пропусков и повторов"""
+        for reverse_name in self.url_list:
+            with self.subTest(reverse_name=reverse_name):
+                seen = []
+                page_obj = self.client.get(reverse_name).context['page_obj']
+                seen.extend(post.id for post in page_obj)
+                while page_obj.has_next():
+                    page_obj = self.client.get(
+                        reverse_name, {'cursor': page_obj.next_cursor()}
+                    ).context['page_obj']
+                    seen.extend(post.id for post in page_obj)
+                self.assertEqual(len(page_obj), 5)
+                self.assertEqual(
+                    seen,
+                    list(Post.objects.order_by('-pub_date', '-id')
+                         .values_list('id', flat=True))
+                )
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Курсор назад возвращает ту же страницу"""
+        first = self.client.get(self.url_list[0]).context['page_obj']
+        second = self.client.get(
+            self.url_list[0], {'cursor': first.next_cursor()}
+        ).context['page_obj']
+        back = self.client.get(
+            self.url_list[0], {'cursor': second.previous_cursor()}
+        ).context['page_obj']
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_deep_page_reads_index_in_order(self):
+        """Страница по курсору не сортирует строки во временном B-дереве"""
+        for reverse_name in self.url_list:
+            with self.subTest(reverse_name=reverse_name):
+                first = self.client.get(reverse_name).context['page_obj']
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(
+                        reverse_name, {'cursor': first.next_cursor()}
+                    )
+                sql = next(
+                    query['sql'] for query in queries.captured_queries
+                    if 'FROM "posts_post"' in query['sql']
+                    and 'LIMIT' in query['sql']
+                )
+                with connection.cursor() as cursor:
+                    cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                    plan = [row[-1] for row in cursor.fetchall()]
+                self.assertFalse(
+                    [line for line in plan if 'TEMP B-TREE' in line], plan
+                )
+
+    def test_broken_cursor_shows_first_page(self):
+        """Битый курсор не ломает страницу"""
+        response = self.client.get(self.url_list[0], {'cursor': '!!!'})
+        self.assertEqual(
+            len(response.context['page_obj']), settings.PAGE_CONST
+        )
+
+
+class PostDetailQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_usrneme')
+        cls.group = Group.objects.create(
+            title='test_title',
+            slug='test_slug',
+            description='test_description',
+        )
+        cls.post = Post.objects.create(
+            text='test_text', author=cls.user, group=cls.group
+        )
+        cls.url = reverse('posts:post_detail', kwargs={'post_id': cls.post.id})
+
+    def add_comments(self, count):
+        start = Comment.objects.count()
+        for i in range(start, start + count):
+            commenter = User.objects.create_user(username=f'commenter_{i}')
+            Comment.objects.create(
+                post=self.post, author=commenter, text=f'comment_{i}'
+            )
+
+    def test_query_count_does_not_depend_on_comments(self):
+        """Страница поста: пост и комментарии, без COUNT(*) комментариев"""
+        for count in (1, 20):
+            with self.subTest(count=count):
+                self.add_comments(count)
+                with self.assertNumQueries(2):
+                    response = self.client.get(self.url)
+                self.assertContains(response, 'commenter_0')
+
+    @override_settings(COMMENTS_PER_PAGE=2)
+    def test_comments_are_paginated(self):
+        """Комментарии к посту разбиты на страницы"""
+        self.add_comments(3)
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.context['comments_page']), 2)
+        response = self.client.get(self.url, {'comments_page': 2})
+        self.assertEqual(len(response.context['comments_page']), 1)
+
+
+class GroupPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_usrneme')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='test_title',
+            slug='test_slug',
+            description='test_description',
+        )
+        for i in range(3):
+            Post.objects.create(
+                text=f'test_text_{i}', author=cls.user, group=cls.group
+            )
+        Post.objects.create(text='other', author=cls.other, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_group_index_shows_counters(self):
+        """Каталог групп: один запрос, без COUNT(*) и агрегатов по постам"""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('posts:group_index'))
+        self.assertTemplateUsed(response, 'posts/group_index.html')
+        self.assertContains(response, 'Постов: 4')
+
+    @override_settings(GROUPS_PER_PAGE=2)
+    def test_group_index_is_paginated(self):
+        """Каталог групп листается курсором по (title, id)"""
+        Group.objects.create(title='a|title', slug='a_slug')
+        Group.objects.create(title='b_title', slug='b_first')
+        Group.objects.create(title='b_title', slug='b_second')
+        url = reverse('posts:group_index')
+        pages = [self.client.get(url).context['page_obj']]
+        while pages[-1].has_next():
+            pages.append(self.client.get(
+                url, {'cursor': pages[-1].next_cursor()}
+            ).context['page_obj'])
+        self.assertEqual(
+            [[group.slug for group in page] for page in pages],
+            [['a_slug', 'b_first'], ['b_second', 'test_slug']],
+        )
+        back = self.client.get(
+            url, {'cursor': pages[1].previous_cursor()}
+        ).context['page_obj']
+        self.assertEqual(list(back), list(pages[0]))
+        self.assertContains(
+            self.client.get(url), f'?cursor={pages[0].next_cursor()}'
+        )
+
+    def test_rows_without_stats_are_counted_on_demand(self):
+        """Группа и автор из bulk_create без счётчиков не ломают страницы"""
+        Group.objects.bulk_create([
+            Group(title='bulk', slug='bulk', description='bulk')
+        ])
+        User.objects.bulk_create([User(username='bulk')])
+        group = Group.objects.get(slug='bulk')
+        author = User.objects.get(username='bulk')
+        Post.objects.bulk_create([
+            Post(text='bulk', author=author, group=group) for _ in range(2)
+        ])
+        urls = (
+            reverse('posts:group_list', kwargs={'slug': 'bulk'}),
+            reverse('posts:profile', kwargs={'username': 'bulk'}),
+            reverse('posts:api_profile', kwargs={'username': 'bulk'}),
+            reverse('posts:group_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(group.stats.posts_count, 2)
+        self.assertEqual(author.stats.posts_count, 2)
+        self.assertEqual(
+            list(group.author_stats.values_list('posts_count', flat=True)),
+            [2],
+        )
+
+    def test_group_page_uses_stored_counters(self):
+        """Страница группы не считает посты, топ-авторы взяты из счётчиков"""
+        url = reverse('posts:group_list', kwargs={'slug': 'test_slug'})
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 4)
+        top = [row.author for row in response.context['top_authors']]
+        self.assertEqual(top, [self.user, self.other])
+
+    def test_profile_uses_stored_counter(self):
+        """Профиль берёт число постов из счётчика, а не из COUNT(*)"""
+        url = reverse('posts:profile', kwargs={'username': 'test_usrneme'})
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 3)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 
 app_name = 'posts'
@@ -7,6 +7,7 @@ app_name = 'posts'
 urlpatterns = [
     path('', views.index, name='index'),
     # Тут url про группы
+    path('group/', views.group_index, name='group_index'),
     path('group/<slug:slug>/', views.group_post, name='group_list'),
     # Тут url про пользователя
     path('profile/<str:username>/', views.profile, name='profile'),
@@ -17,6 +18,17 @@ urlpatterns = [
          ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
+    # Тут url про поиск
+    path('search/', views.post_search, name='search'),
+    # Тут url про JSON API
+    path('api/v1/posts/', api.index, name='api_index'),
+    path('api/v1/posts/<int:post_id>/', api.post_detail,
+         name='api_post_detail'),
+    path('api/v1/group/<slug:slug>/', api.group_posts, name='api_group_list'),
+    path('api/v1/profile/<str:username>/', api.profile, name='api_profile'),
+    path('api/v1/follow/', api.follow_index, name='api_follow_index'),
+    path('api/v1/search/', views.search_api, name='search_api'),
+    path('api/v1/viewer/', api.viewer, name='api_viewer'),
     # Тут url про подписки
     path('follow/', views.follow_index, name='follow_index'),
     path(
@@ -1,9 +1,184 @@
-from django.core.paginator import Paginator
+import base64
+import collections.abc
+
 from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
 
+def paginate_page(request, object_list, count=None, key='id'):
+    """
+    Постраничное разбиение материалов.
 
-def paginate_page(request, object_list):
-    """Постраничное разбиение материалов"""
+    count — заранее известное число объектов (например, из
+    денормализованного счётчика): с ним пагинатор не делает COUNT(*).
+    key — поле, различающее объекты с одинаковым pub_date в курсоре.
+    """
+    if settings.PAGINATION_MODE == 'keyset':
+        paginator = KeysetPaginator(object_list, settings.PAGE_CONST, key)
+        return paginator.get_page(request.GET.get('cursor'))
     paginator = Paginator(object_list, settings.PAGE_CONST)
+    if count is not None:
+        # Paginator.count — cached_property, значение кладётся вместо него.
+        paginator.count = count
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
+
+
+def paginate_comments(request, comments, count=None):
+    """
+    Постраничное разбиение комментариев к посту.
+
+    count — как в paginate_page, обычно Post.comments_count.
+    """
+    paginator = Paginator(comments, settings.COMMENTS_PER_PAGE)
+    if count is not None:
+        paginator.count = count
+    return paginator.get_page(request.GET.get('comments_page'))
+
+
+def paginate_groups(request, groups):
+    """
+    Постраничное разбиение каталога групп по (title, id) без COUNT(*).
+    """
+    paginator = KeysetPaginator(
+        groups, settings.GROUPS_PER_PAGE, field='title', descending=False
+    )
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+def encode_cursor(direction, value, pk):
+    """Упаковывает позицию в ленте в непрозрачную строку."""
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    raw = f'{direction}|{value}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, parse=parse_datetime):
+    """
+    Распаковывает курсор. parse превращает строку в значение поля
+    сортировки. Для битого курсора возвращает None.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        # В названии группы может встретиться разделитель.
+        direction, raw = raw.split('|', 1)
+        value, pk = raw.rsplit('|', 1)
+        value = parse(value)
+        pk = int(pk)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+    if direction not in ('n', 'p') or value is None:
+        return None
+    return direction, value, pk
+
+
+class KeysetPaginator:
+    """
+    Постраничное разбиение по ключу (field, key).
+
+    Вместо OFFSET и COUNT(*) страница выбирается условием
+    «строго раньше/позже курсора», поэтому любая страница
+    стоит столько же, сколько первая. key — id объекта или,
+    для записей ленты, id поста. Ленты идут по убыванию
+    pub_date, каталог групп — по возрастанию title.
+    """
+
+    def __init__(self, object_list, per_page, key='id', field='pub_date',
+                 descending=True):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.key = key
+        self.field = field
+        self.descending = descending
+
+    def _parse(self, value):
+        if self.field == 'pub_date':
+            return parse_datetime(value)
+        return value
+
+    def _after(self, value, pk, reverse):
+        """Строки после курсора в порядке страницы или обратном."""
+        field, key = self.field, self.key
+        ascending = self.descending == reverse
+        op = 'gt' if ascending else 'lt'
+        # Условие записано как field <= X AND (field < X OR id < pk),
+        # а не как OR двух диапазонов: так SQLite идёт по индексу
+        # (field, id) от курсора и не сортирует все остальные строки
+        # во временном B-дереве.
+        queryset = self.object_list.filter(**{f'{field}__{op}e': value})
+        queryset = queryset.filter(
+            Q(**{f'{field}__{op}': value}) | Q(**{f'{key}__{op}': pk})
+        )
+        prefix = '' if ascending else '-'
+        return queryset.order_by(f'{prefix}{field}', f'{prefix}{key}')
+
+    def get_page(self, cursor=None):
+        position = decode_cursor(cursor, self._parse) if cursor else None
+        if position is None:
+            direction = 'n'
+            prefix = '-' if self.descending else ''
+            queryset = self.object_list.order_by(
+                f'{prefix}{self.field}', f'{prefix}{self.key}'
+            )
+        else:
+            direction, value, pk = position
+            queryset = self._after(value, pk, reverse=direction == 'p')
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == 'p':
+            rows.reverse()
+            return KeysetPage(rows, self, has_next=True, has_previous=has_more)
+        return KeysetPage(
+            rows, self, has_next=has_more, has_previous=position is not None
+        )
+
+
+class KeysetPage(collections.abc.Sequence):
+    """Страница ленты с курсорами на соседние страницы."""
+
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next and bool(object_list)
+        self._has_previous = has_previous and bool(object_list)
+        # Позиции краёв запоминаются сразу: object_list потом можно
+        # заменить (записи ленты — их постами, см. feed.page_posts).
+        self._edges = [
+            (getattr(item, paginator.field), getattr(item, paginator.key))
+            for item in object_list[:1] + object_list[-1:]
+        ]
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return encode_cursor('n', *self._edges[-1])
+
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return encode_cursor('p', *self._edges[0])
@@ -1,58 +1,132 @@
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from .models import Follow, Post, Group, User
 from django.contrib.auth.decorators import login_required
 from .forms import PostForm, CommentForm
-from .utils import paginate_page
-from django.views.decorators.cache import cache_page
+from .counters import group_stats, user_stats
+from .utils import paginate_comments, paginate_groups, paginate_page
+from .feed import follow_feed, page_posts
+from . import caching, ingestion, search, thumbnails
+from .streaming import render_feed
 from django.urls import reverse
+from core.http import conditional_page
 
 
-@cache_page(20)
+@conditional_page(lambda request: caching.validators(
+    caching.index_scopes(request)
+))
+@caching.versioned_cache_page(caching.index_scopes, public=True)
 def index(request):
     """Главная страница со всеми постами."""
     post_list = Post.objects.select_related('author', 'group').all()
     page_obj = paginate_page(request, post_list)
     context = {
         'page_obj': page_obj,
+        'index': True,
     }
-    return render(request, 'posts/index.html', context)
-
-
+    return render_feed(request, 'posts/index.html', context)
+
+
+@conditional_page(lambda request: caching.validators(
+    caching.group_index_scopes(request)
+))
+@caching.versioned_cache_page(caching.group_index_scopes, public=True)
+def group_index(request):
+    """Каталог групп с числом постов и датой последнего."""
+    groups = Group.objects.select_related('stats')
+    page_obj = paginate_groups(request, groups)
+    for group in page_obj:
+        group_stats(group)
+    return render(request, 'posts/group_index.html', {'page_obj': page_obj})
+
+
+@conditional_page(lambda request, slug: caching.validators(
+    caching.group_scopes(request, slug)
+))
+@caching.versioned_cache_page(caching.group_scopes, public=True)
 def group_post(request, slug):
     """Страница со всеми постами определённой группы."""
-    group = get_object_or_404(Group, slug=slug)
+    group = get_object_or_404(
+        Group.objects.select_related('stats'), slug=slug
+    )
     post_list = group.group_posts.select_related('author', 'group').all()
-    page_obj = paginate_page(request, post_list)
+    page_obj = paginate_page(
+        request, post_list, count=group_stats(group).posts_count
+    )
+    top_authors = group.author_stats.filter(
+        posts_count__gt=0
+    ).select_related('author').order_by(
+        '-posts_count'
+    )[:settings.GROUP_TOP_AUTHORS]
     context = {
         'group': group,
         'page_obj': page_obj,
+        'top_authors': top_authors,
     }
 
-    return render(request, 'posts/group_list.html', context)
+    return render_feed(request, 'posts/group_list.html', context)
 
 
+@conditional_page(lambda request, username: caching.validators(
+    caching.profile_scopes(request, username)
+))
+@caching.versioned_cache_page(caching.profile_scopes, public=True)
 def profile(request, username):
     """Страница пользователя с его постами."""
-    author = get_object_or_404(User, username=username)
+    authors = User.objects.select_related('stats')
+    hydrate = settings.PERSONALIZATION == 'client'
+    if not hydrate and request.user.is_authenticated:
+        # Подписка проверяется в том же запросе, что и поиск автора.
+        authors = authors.annotate(is_followed=Exists(Follow.objects.filter(
+            user=request.user, author=OuterRef('pk')
+        )))
+    author = get_object_or_404(authors, username=username)
     posts = author.author_posts.select_related('author', 'group').all()
-    page_obj = paginate_page(request, posts)
-    following = request.user.is_authenticated and author.following.exists()
+    page_obj = paginate_page(
+        request, posts, count=user_stats(author).posts_count
+    )
     context = {
         'author': author,
         'page_obj': page_obj,
-        'following': following,
+        'following': getattr(author, 'is_followed', False),
     }
-    return render(request, 'posts/profile.html', context)
+    return render_feed(request, 'posts/profile.html', context)
+
+
+def post_detail_validators(request, post_id):
+    # Свои ещё не записанные комментарии пользователь видит сразу.
+    pending = 0
+    if settings.PERSONALIZATION != 'client':
+        pending = ingestion.pending_count(post_id, request.user)
+    return caching.validators(caching.post_scopes(request, post_id), pending)
 
 
+@conditional_page(post_detail_validators)
 def post_detail(request, post_id):
     """Конкретная страница определённого поста."""
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id
+    )
+    if post.author is not None:
+        user_stats(post.author)
+    comments = post.comments.select_related('author').order_by('created')
     form = CommentForm(request.POST or None)
+    comments_page = paginate_comments(
+        request, comments, count=post.comments_count
+    )
     context = {
         'post': post,
+        'comments_page': comments_page,
         'form': form,
     }
+    batched = settings.COMMENT_INGESTION == 'batched'
+    hydrate = settings.PERSONALIZATION == 'client'
+    if batched and not hydrate and not comments_page.has_next():
+        context['pending_comments'] = ingestion.pending_for(
+            post, request.user
+        )
     return render(request, 'posts/post_detail.html', context)
 
 
@@ -70,6 +144,8 @@ def post_create(request):
     post = form.save(commit=False)
     post.author = request.user
     post.save()
+    if post.image:
+        thumbnails.schedule(post)
     return redirect('posts:profile', request.user)
 
 
@@ -94,13 +170,20 @@ def post_edit(request, post_id):
             context
         )
     form.save()
+    if 'image' in form.changed_data:
+        thumbnails.schedule(post)
     return redirect('posts:post_detail', post.id)
 
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
+    if settings.COMMENT_INGESTION == 'batched':
+        # Без чтения поста и записи в базу: комментарий уйдёт пакетом.
+        if form.is_valid():
+            ingestion.submit(post_id, request.user, form.cleaned_data['text'])
+        return redirect('posts:post_detail', post_id=post_id)
+    post = get_object_or_404(Post, id=post_id)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
@@ -110,22 +193,22 @@ def add_comment(request, post_id):
 
 
 @login_required
+@caching.versioned_cache_page(caching.follow_scopes)
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginate_page(request, posts)
-    return render(request, 'posts/follow.html', {'page_obj': page_obj})
+    feed, key = follow_feed(request.user)
+    page_obj = page_posts(paginate_page(request, feed, key=key))
+    context = {
+        'page_obj': page_obj,
+        'follow': True,
+    }
+    return render_feed(request, 'posts/follow.html', context)
 
 
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    if (request.user == author
-            or Follow.objects.filter(
-                user=request.user,
-                author=author).exists()):
-        return redirect(reverse('posts:profile',
-                                kwargs={'username': username}))
-    Follow.objects.create(user=request.user, author=author)
+    if request.user != author:
+        Follow.objects.get_or_create(user=request.user, author=author)
     return redirect(reverse('posts:profile', kwargs={'username': username}))
 
 
@@ -137,3 +220,36 @@ def profile_unfollow(request, username):
     if follow.exists():
         follow.delete()
     return redirect(reverse('posts:profile', kwargs={'username': username}))
+
+
+def post_search(request):
+    """Полнотекстовый поиск по постам, комментариям и группам."""
+    query = request.GET.get('q', '').strip()
+    page_obj = search.search(query, request.GET.get('cursor'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def search_api(request):
+    """Тот же поиск в JSON."""
+    query = request.GET.get('q', '').strip()
+    page_obj = search.search(query, request.GET.get('cursor'))
+    results = [
+        {
+            'id': post.id,
+            'author': post.author.username,
+            'group': post.group.slug if post.group else None,
+            'pub_date': post.pub_date.isoformat(),
+            'snippet': post.snippet,
+            'url': reverse('posts:post_detail', kwargs={'post_id': post.id}),
+        }
+        for post in page_obj
+    ]
+    return JsonResponse({
+        'query': query,
+        'results': results,
+        'next_cursor': page_obj.next_cursor,
+    })
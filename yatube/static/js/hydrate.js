@@ -0,0 +1,50 @@
+// Заполняет части страницы, которые зависят от пользователя, когда
+// сервер отдаёт одинаковый для всех HTML (PERSONALIZATION = 'client').
+// Всё нужное приходит одним запросом к /api/v1/viewer/.
+(function () {
+  'use strict';
+
+  var script = document.currentScript;
+
+  function each(selector, callback) {
+    Array.prototype.forEach.call(document.querySelectorAll(selector), callback);
+  }
+
+  function apply(viewer) {
+    each('[data-auth]', function (element) {
+      element.hidden = (element.dataset.auth === 'in') !== viewer.authenticated;
+    });
+    each('[data-username]', function (element) {
+      element.textContent = viewer.username || '';
+    });
+    each('[data-csrf]', function (element) {
+      element.value = viewer.csrf_token || '';
+    });
+    each('[data-owner]', function (element) {
+      element.hidden = element.dataset.owner !== viewer.username;
+    });
+    each('[data-follow]', function (element) {
+      var following = viewer.following.indexOf(element.dataset.follow) !== -1;
+      element.hidden = (element.dataset.following === '1') !== following;
+    });
+  }
+
+  var authors = [];
+  each('[data-follow]', function (element) {
+    if (authors.indexOf(element.dataset.follow) === -1) {
+      authors.push(element.dataset.follow);
+    }
+  });
+  var url = script.dataset.endpoint;
+  if (authors.length) {
+    url += '?follow=' + encodeURIComponent(authors.join(','));
+  }
+  fetch(url, {credentials: 'same-origin', headers: {Accept: 'application/json'}})
+    .then(function (response) {
+      return response.ok ? response.json() : Promise.reject(response.status);
+    })
+    .then(apply)
+    .catch(function () {
+      // Без ответа страница остаётся в виде для анонима.
+    });
+})();
@@ -1,9 +1,32 @@
 import os
 from dotenv import load_dotenv
+
+from core.cache.url import cache_config, cache_is_shared
+
 load_dotenv()
 
 PAGE_CONST = 10
 
+COMMENTS_PER_PAGE = 50
+
+# Сколько самых активных авторов показывать на странице группы.
+GROUP_TOP_AUTHORS = 5
+
+GROUPS_PER_PAGE = 20
+
+# 'numbered' — классические номера страниц (COUNT + OFFSET),
+# 'keyset' — курсоры по (pub_date, id) для больших таблиц.
+PAGINATION_MODE = 'numbered'
+
+# 'buffered' — ленты рендерятся целиком, 'streaming' — head и
+# навигация уходят сразу, карточки постов следом по одной
+# (см. posts/streaming.py).
+FEED_RENDERING = os.getenv('FEED_RENDERING', 'buffered')
+
+# Посты авторов, у которых подписчиков больше этого числа, не разносятся
+# по лентам при публикации, а подмешиваются в ленту при чтении.
+FEED_FANOUT_LIMIT = 1000
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
@@ -33,7 +56,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -59,6 +85,36 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загруженные картинки больше этого размера уменьшаются и перекодируются
+# в JPEG без метаданных; от GIF больше этого размера остаётся первый
+# кадр. GIF в пределах размера хранится как загружен, вместе с
+# анимацией и блоками комментариев.
+POST_IMAGE_MAX_SIZE = (1920, 1920)
+POST_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+
+# Потоки, создающие миниатюры картинок постов в фоне. При 0 миниатюра
+# создаётся в запросе сразу после сохранения. Пока миниатюры нет,
+# шаблоны показывают исходную картинку. Очередь живёт в памяти процесса:
+# задачи, потерянные при перезапуске или упавшие, и посты, загруженные
+# до появления миниатюр, дозаполняет manage.py generate_thumbnails.
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', 2))
+
+# 'sync' — каждый комментарий сразу пишется в базу,
+# 'batched' — комментарии копятся в очереди процесса и пишутся пакетами
+# раз в COMMENT_BATCH_INTERVAL секунд (см. posts/ingestion.py). Ожидающие
+# записи комментарии хранятся в кэше, поэтому 'batched' работает только
+# с общим кэшем (CACHE_SHARED), иначе manage.py check сообщит posts.E001.
+COMMENT_INGESTION = os.getenv('COMMENT_INGESTION', 'sync')
+COMMENT_BATCH_INTERVAL = 0.005
+COMMENT_BATCH_SIZE = 500
+
+# 'server' — имя пользователя, кнопки подписки и редактирования и
+# форма комментария рендерятся в HTML страницы, 'client' — публичные
+# страницы одинаковы для всех и кэшируются общими кэшами и CDN, а
+# части пользователя браузер получает одним запросом к
+# /api/v1/viewer/ (static/js/hydrate.js).
+PERSONALIZATION = os.getenv('PERSONALIZATION', 'server')
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -71,26 +127,106 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.personalization.hydrate',
             ],
         },
     },
 ]
 
+# locmem:// — свой кэш в каждом процессе (по умолчанию),
+# redis://host:6379/0 — общий кэш с пулом соединений,
+# tiered+redis://host:6379/0 — локальный LRU перед общим кэшем
+# с инвалидацией через pub/sub, memcached://host:11211 — нужен pylibmc.
+# Для проверки без сервера: python manage.py cacheserver.
+CACHE_URL = os.getenv('CACHE_URL', 'locmem://')
 CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    'default': cache_config(CACHE_URL),
 }
 
+# Страницы лент и карточки постов сбрасываются сигналами через версии
+# областей в кэше (posts/caching.py), поэтому в общем кэше их можно
+# хранить долго. В кэше процесса (locmem://) bump() в одном процессе
+# сервера не доходит до остальных: там страницы, карточки и сами
+# версии живут не дольше 20 секунд.
+CACHE_SHARED = cache_is_shared(CACHE_URL)
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24 if CACHE_SHARED else 20
+VERSION_TIMEOUT = None if CACHE_SHARED else PAGE_CACHE_TIMEOUT
+
+# Сколько секунд браузеры и CDN могут показывать страницу анониму
+# без проверки ETag (core/http.py).
+PUBLIC_PAGE_MAX_AGE = 60
+
+# Доля запросов, которые замеряет core.middleware.MetricsMiddleware;
+# 0 — замеры выключены. Результаты: /metrics/ (формат Prometheus)
+# и python manage.py metrics_report.
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', 0))
+# /metrics/ и /metrics/slow-queries/ отдаются только с заголовком
+# Authorization: Bearer <METRICS_TOKEN>; без токена адреса не работают.
+# Адрес клиента не проверяется: за прокси на том же сервере все
+# запросы приходят с 127.0.0.1.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Запросы дольше SLOW_QUERY_MS (0 — журнал выключен) и запросы,
+# повторённые за одну страницу SLOW_QUERY_REPEAT раз, пишутся в
+# логгер core.slowlog. Сводка: /metrics/slow-queries/ и
+# python manage.py slow_queries.
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 0))
+SLOW_QUERY_REPEAT = 10
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Профили соединения с SQLite (core/backends/sqlite3). 'tuned' включает
+# WAL, чтобы чтение не ждало записи, ослабляет fsync до границ WAL,
+# отображает файл в память и ждёт занятую базу вместо ошибки
+# «database is locked». 'plain' — настройки SQLite по умолчанию.
+SQLITE_PROFILES = {
+    'plain': {},
+    'tuned': {
+        'pragmas': {
+            'journal_mode': 'wal',
+            'synchronous': 'normal',
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -64 * 1024,
+            'busy_timeout': 5000,
+            'temp_store': 'memory',
+        },
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 5,
+    },
+}
+SQLITE_PROFILE = os.getenv('SQLITE_PROFILE', 'tuned')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение переживает запрос и переиспользуется потоком.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'OPTIONS': SQLITE_PROFILES[SQLITE_PROFILE],
     }
 }
 
+# Реплики только для чтения: DATABASE_REPLICAS=/data/r1.sqlite3,...
+# Безопасные запросы читают с них (core/routers.py), запись и чтение
+# в течение REPLICA_STICKY_SECONDS после записи идут в основную базу.
+# В тестах реплики — зеркала основной базы.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), start=1
+):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'NAME': name.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_STICKY_COOKIE = 'primary_until'
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+# Изменения данных этих приложений отмечают версии кэша (posts.caching).
+# Страница, прочитавшая их с реплики, не кэшируется и не получает ETag.
+REPLICA_VERSIONED_APPS = ['posts']
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -119,3 +255,16 @@ USE_L10N = True
 USE_TZ = True
 
 STATIC_URL = '/static/'
+
+# python manage.py collectstatic кладёт сюда файлы с хэшем содержимого
+# в имени и их сжатые копии .gz и .br (brotli ставится отдельно) —
+# core/staticfiles.py.
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+
+# Без обратного прокси (SERVE_FILES=1) STATIC_ROOT и MEDIA_ROOT отдаёт
+# сам процесс через sendfile, не заходя в Django (core/files.py).
+# Файлы с хэшем в имени кэшируются навсегда, остальные — FILES_MAX_AGE
+# секунд с проверкой ETag.
+SERVE_FILES = os.getenv('SERVE_FILES') == '1'
+FILES_MAX_AGE = 60 * 60
@@ -3,6 +3,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import metrics, slow_queries
+
 
 handler404 = 'core.views.page_not_found'
 handler500 = 'core.views.page_error'
@@ -14,6 +16,8 @@ urlpatterns = [
     path('about/', include('about.urls', namespace='about')),
     path('auth/', include('users.urls', namespace='auth')),
     path('auth/', include('django.contrib.auth.urls')),
+    path('metrics/', metrics, name='metrics'),
+    path('metrics/slow-queries/', slow_queries, name='slow_queries'),
 ]
 
 if settings.DEBUG: